@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+generate.py — Seeded synthetic Airbnb reviews in the raw schema clean.py expects.
+
+Usage:
+    python benchmarks/generate.py --rows 1000000 --output benchmarks/data/raw_1M.csv --seed 42
+
+Columns: ds, message, topics, subtopics, Trustpilot: language, Google Play: language,
+source, sentiment, score. Rows are written in chunks, so 10M rows need little memory.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+SOURCES = np.array(["Google Play", "App Store", "Trustpilot"])
+SOURCE_P = [0.45, 0.25, 0.30]
+LANGUAGES = np.array(["es", "en", "pt", "fr", "it", "de", "nl", "ko", "tr", "ru"])
+LANGUAGE_P = [0.32, 0.30, 0.14, 0.07, 0.05, 0.04, 0.03, 0.02, 0.02, 0.01]
+SCORES = np.array([1, 2, 3, 4, 5])
+SCORE_P = [0.18, 0.05, 0.05, 0.08, 0.64]
+
+WORDS = {
+    "positive": "great easy love excellent amazing host stay super fácil buena excelente ótimo "
+                "recommend perfect clean comfortable app nice beautiful".split(),
+    "negative": "refund support booking issue money cancel terrible never waited charged scam "
+                "problem reembolso cancelación dinero app host account".split(),
+    "neutral": "ok fine average app booking stay host place price time".split(),
+}
+FILLER = "the a and to it was is de que la el o e com para muito very".split()
+TOPICS = ["app", "booking", "customer service", "refund", "host", "payment", "cancellation",
+          "listing", "price", "account", "safety", "cleanliness"]
+SUBTOPICS = ["crash", "login", "delay", "fees", "communication", "search", "reviews", "photos"]
+
+
+def _lists(rng: np.random.Generator, n: int, vocab, max_len: int, p_missing: float) -> np.ndarray:
+    # Few distinct values repeated many times, like the real export
+    pool = [str(sorted({str(v) for v in rng.choice(vocab, k)})) for k in rng.integers(0, max_len + 1, 200)]
+    out = np.asarray(pool, dtype=object)[rng.integers(0, len(pool), n)]
+    out[rng.random(n) < p_missing] = None
+    return out
+
+
+def _message_pool(rng: np.random.Generator, sentiment: str, mean_words: float, size: int = 5000) -> np.ndarray:
+    vocab, filler = np.asarray(WORDS[sentiment]), np.asarray(FILLER)
+    out = np.empty(size, dtype=object)
+    for i, k in enumerate(np.clip(rng.gamma(2.0, mean_words / 2, size), 1, 400).astype(int)):
+        words = np.where(rng.random(k) < 0.6, vocab[rng.integers(0, len(vocab), k)],
+                         filler[rng.integers(0, len(filler), k)])
+        out[i] = " ".join(words).capitalize() + rng.choice([".", "!", "!!", " 10/10", ""])
+    return out
+
+
+def _messages(rng: np.random.Generator, pools: dict, sentiment: np.ndarray, score: np.ndarray) -> np.ndarray:
+    # Low scores get longer reviews; a trailing word pair keeps most messages distinct, and a few
+    # carry URLs or emails
+    n = len(sentiment)
+    out = np.empty(n, dtype=object)
+    for (s, long), pool in pools.items():
+        idx = np.flatnonzero((sentiment == s) & ((score <= 2) == long))
+        out[idx] = pool[rng.integers(0, len(pool), len(idx))]
+    filler = np.asarray(FILLER + sum(WORDS.values(), []), dtype=object)
+    out = out + " " + filler[rng.integers(0, len(filler), n)] + " " + filler[rng.integers(0, len(filler), n)]
+    extras = rng.random(n)
+    out[extras < 0.01] += " https://airbnb.com/help"
+    out[(extras >= 0.01) & (extras < 0.015)] += " me@mail.com"
+    out[rng.random(n) < 0.005] = None
+    return out
+
+
+def generate_chunk(rng: np.random.Generator, pools: dict, n: int, start: pd.Timestamp, days: int) -> pd.DataFrame:
+    """One chunk of n synthetic raw rows."""
+    source = rng.choice(SOURCES, n, p=SOURCE_P)
+    score = rng.choice(SCORES, n, p=SCORE_P)
+    sentiment = np.where(score >= 4, "positive", np.where(score <= 2, "negative", "neutral"))
+    flip = rng.random(n) < 0.08
+    sentiment[flip] = rng.choice(["positive", "negative", "neutral"], flip.sum())
+    language = rng.choice(LANGUAGES, n, p=LANGUAGE_P).astype(object)
+    ds = (start + pd.to_timedelta(rng.integers(0, days, n), unit="D")).strftime("%Y-%m-%d")
+
+    return pd.DataFrame({
+        "ds": ds,
+        "message": _messages(rng, pools, sentiment, score),
+        "topics": _lists(rng, n, TOPICS, 3, 0.2),
+        "subtopics": _lists(rng, n, SUBTOPICS, 2, 0.4),
+        "Trustpilot: language": np.where(source == "Trustpilot", language, None),
+        "Google Play: language": np.where(source == "Google Play", language, None),
+        "source": source,
+        "sentiment": sentiment,
+        "score": np.where(rng.random(n) < 0.02, np.nan, score.astype(float)),
+    })
+
+
+def generate(rows: int, output: str, seed: int = 42, chunksize: int = 500_000,
+             start: str = "2023-01-01", days: int = 650) -> str:
+    """Write `rows` synthetic raw reviews to output (CSV); the same seed gives the same file."""
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    rng = np.random.default_rng(seed)
+    start_ts = pd.Timestamp(start)
+    pools = {(s, long): _message_pool(rng, s, 36 if long else 12) for s in WORDS for long in (False, True)}
+    for i, offset in enumerate(range(0, rows, chunksize)):
+        chunk = generate_chunk(rng, pools, min(chunksize, rows - offset), start_ts, days)
+        chunk.to_csv(output, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    return output
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, required=True, help="Number of reviews to generate")
+    ap.add_argument("--output", required=True, help="Path to write the raw CSV")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    generate(args.rows, args.output, args.seed)
+    print(f"[OK] Wrote {args.rows} synthetic reviews to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
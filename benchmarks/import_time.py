@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+import_time.py — Cold import cost of airbnb_analysis.plots and the libraries it draws with.
+
+Usage:
+    python benchmarks/import_time.py                 # 5 fresh interpreters per module
+    python benchmarks/import_time.py --repeat 10 --out benchmarks/results/import.json
+
+Every module is imported in a fresh interpreter and the median wall time is reported, along
+with which heavy plotting libraries the import pulled in. airbnb_analysis.plots should pull in
+none: they are loaded by the plot functions on first use.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+MODULES = ["pandas", "duckdb", "plotly.express", "matplotlib.pyplot", "seaborn", "wordcloud",
+           "airbnb_analysis.plots"]
+HEAVY = ["plotly.express", "matplotlib.pyplot", "seaborn", "wordcloud"]
+
+SNIPPET = """
+import importlib, json, sys, time
+t = time.perf_counter()
+importlib.import_module({module!r})
+print(json.dumps([time.perf_counter() - t, [m for m in {heavy!r} if m in sys.modules]]))
+"""
+
+
+def import_time(module: str, repeat: int = 5) -> dict:
+    """Median cold import time of module over repeat fresh interpreters."""
+    env = {**os.environ, "MPLBACKEND": "Agg"}
+    times, loaded = [], []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", SNIPPET.format(module=module, heavy=HEAVY)],
+                             capture_output=True, text=True, check=True, env=env).stdout
+        seconds, loaded = json.loads(out.strip().splitlines()[-1])
+        times.append(seconds)
+    return {"module": module, "median_s": round(statistics.median(times), 4),
+            "min_s": round(min(times), 4), "heavy_loaded": loaded}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--modules", nargs="+", default=MODULES)
+    ap.add_argument("--out", default=None, help="Optional results JSON")
+    args = ap.parse_args()
+
+    results = []
+    for module in args.modules:
+        r = import_time(module, args.repeat)
+        results.append(r)
+        print(f"     {module:<24} {r['median_s']:>8.3f}s  loads: {', '.join(r['heavy_loaded']) or '-'}")
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"[OK] Saved import times to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
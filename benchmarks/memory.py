@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+memory.py — In-memory size of the cleaned dataset, per column, with and without the compact dtypes.
+
+Usage:
+    PYTHONPATH=src python benchmarks/memory.py data/processed/airbnb_reviews_clean.parquet
+    PYTHONPATH=src python benchmarks/memory.py data/processed/airbnb_reviews_clean.csv --out benchmarks/results/memory.json
+
+Loads the file twice with load_clean (compact=False, then the default compact=True) and reports
+memory_usage(deep=True) of every column, so the per-column saving of clean.CLEAN_DTYPES is visible.
+"""
+import argparse
+import json
+import os
+
+from airbnb_analysis.data import load_clean
+
+
+def column_memory(path: str, compact: bool) -> dict:
+    """{column: (dtype, bytes)} of load_clean(path, compact=compact)."""
+    df = load_clean(path, compact=compact)
+    usage = df.memory_usage(deep=True, index=False)
+    return {c: (str(df[c].dtype), int(usage[c])) for c in df.columns}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("path", help="Cleaned dataset (.parquet, .duckdb or .csv)")
+    ap.add_argument("--out", default=None, help="Optional results JSON")
+    args = ap.parse_args()
+
+    before = column_memory(args.path, compact=False)
+    after = column_memory(args.path, compact=True)
+    rows = []
+    for c, (dtype, size) in before.items():
+        new_dtype, new_size = after.get(c, (dtype, size))
+        rows.append({"column": c, "dtype_before": dtype, "dtype_after": new_dtype,
+                     "bytes_before": size, "bytes_after": new_size})
+        print(f"     {c:<20} {dtype:>16} {size / 1e6:>10.2f} MB  ->  {new_dtype:>16} {new_size / 1e6:>10.2f} MB")
+    total_before = sum(r["bytes_before"] for r in rows)
+    total_after = sum(r["bytes_after"] for r in rows)
+    print(f"     {'total':<20} {'':>16} {total_before / 1e6:>10.2f} MB  ->  {'':>16} {total_after / 1e6:>10.2f} MB"
+          f"  ({1 - total_after / max(total_before, 1):.0%} smaller)")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump({"path": args.path, "columns": rows,
+                       "total_bytes_before": total_before, "total_bytes_after": total_after}, f, indent=2)
+        print(f"[OK] Saved memory usage to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
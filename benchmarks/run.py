@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+run.py — Benchmark clean.py stages and plots.plot_* functions on synthetic reviews.
+
+Usage:
+    python benchmarks/run.py                          # 10k, 1M and 10M rows
+    python benchmarks/run.py --sizes 10k 1M --out benchmarks/results/my_change.json
+
+For each size, a seeded raw CSV is generated once (cached under benchmarks/data/), then every
+cleaning stage and every plot function is timed. Wall time, CPU time, peak traced memory
+(Python/NumPy allocations) and the growth of the process's peak RSS are written per step to a
+JSON results file, so runs before and after a change can be compared.
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import matplotlib.pyplot as plt
+
+from airbnb_analysis import clean, figcache, plots
+from airbnb_analysis.data import load_clean
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from generate import generate  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SUFFIXES = {"k": 1_000, "M": 1_000_000}
+
+
+def parse_size(s: str) -> int:
+    return int(float(s[:-1]) * SUFFIXES[s[-1]]) if s[-1] in SUFFIXES else int(s)
+
+
+def _max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+def measure(fn, *args, **kwargs):
+    """Run fn once; return (result, metrics dict)."""
+    rss_before = _max_rss_mb()
+    tracemalloc.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = fn(*args, **kwargs)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "peak_traced_mb": round(peak / 2**20, 2),
+        "rss_growth_mb": round(_max_rss_mb() - rss_before, 2),
+    }
+
+
+def bench_clean(raw_path: str, work_dir: str) -> list:
+    """Time each clean.py stage on the raw file, then each output format and the DuckDB engine."""
+    out = []
+
+    def step(name, fn, *args, **kwargs):
+        result, m = measure(fn, *args, **kwargs)
+        out.append({"group": "clean", "name": name, **m})
+        return result
+
+    df = step("load", clean.read_raw, raw_path)
+    step("dates", clean.add_dates, df)
+    step("language", clean.add_language, df)
+    step("scores", clean.add_scores, df)
+    step("text_stats", clean.add_text_stats, df)
+    step("topics", clean.add_topics, df)
+    clean_df = step("select", clean.select_clean, df)
+    del df
+    step("save_csv", clean.save_clean, clean_df, os.path.join(work_dir, "clean.csv"), "csv")
+    step("save_parquet", clean.save_clean, clean_df, os.path.join(work_dir, "clean.parquet"), "parquet")
+    del clean_df
+    step("engine_duckdb_parquet", clean.clean_duckdb, raw_path, os.path.join(work_dir, "clean_duckdb.parquet"),
+         "parquet")
+    return out
+
+
+def bench_plots(clean_path: str) -> list:
+    """Time loading the cleaned data and every plots.plot_* function on it, cold and from the figure cache."""
+    out = []
+    figcache.configure(cache_dir=None)
+    figcache.clear()
+    df, m = measure(load_clean, clean_path)
+    out.append({"group": "plots", "name": "load_clean", **m})
+    for name, fn in inspect.getmembers(plots, inspect.isfunction):
+        if not name.startswith("plot_"):
+            continue
+        fig, m = measure(fn, df)
+        if hasattr(fig, "to_json"):
+            m["payload_bytes"] = len(fig.to_json())
+        plt.close("all")
+        out.append({"group": "plots", "name": name, **m})
+        _, m = measure(fn, df)
+        plt.close("all")
+        out.append({"group": "plots", "name": f"{name}[cached]", **m})
+    return out
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", nargs="+", default=["10k", "1M", "10M"], help="Row counts, e.g. 10k 1M 10M")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--data-dir", default=os.path.join(HERE, "data"), help="Where generated inputs are cached")
+    ap.add_argument("--out", default=None, help="Results JSON (default: benchmarks/results/<timestamp>.json)")
+    args = ap.parse_args()
+
+    started = datetime.now(timezone.utc)
+    out_path = args.out or os.path.join(HERE, "results", started.strftime("bench-%Y%m%dT%H%M%SZ.json"))
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    results = []
+    for size in args.sizes:
+        rows = parse_size(size)
+        raw_path = os.path.join(args.data_dir, f"raw_{size}_seed{args.seed}.csv")
+        if not os.path.exists(raw_path):
+            print(f"[..] Generating {rows} rows -> {raw_path}")
+            generate(rows, raw_path, args.seed)
+        work_dir = os.path.join(args.data_dir, f"work_{size}")
+        os.makedirs(work_dir, exist_ok=True)
+
+        print(f"[..] Benchmarking {rows} rows")
+        for r in bench_clean(raw_path, work_dir) + bench_plots(os.path.join(work_dir, "clean.parquet")):
+            results.append({"rows": rows, **r})
+            print(f"     {r['group']:>5} {r['name']:<32} {r['wall_s']:>9.3f}s  peak {r['peak_traced_mb']:>9.1f} MB")
+
+    report = {
+        "meta": {
+            "started_utc": started.isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[OK] Saved benchmark results to: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
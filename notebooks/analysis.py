@@ -27,6 +27,7 @@ def _(mo):
        - [Average Score by Source](#average-score-by-source)
        - [Review Length vs Score](#review-length-vs-score)
        - [Sentiment Word Clouds](#sentiment-word-clouds)
+       - [Keyword Drill-Down](#keyword-drill-down)
     4. [Actionable Recommendations](#actionable-recommendations)
     4. [Conclusion](#conclusion)
 
@@ -49,7 +50,7 @@ def _(mo):
 
     ## Dataset Overview
 
-    The dataset used in this analysis (`airbnb_reviews_clean.csv`) contains preprocessed Airbnb review data, including:
+    The dataset used in this analysis (`airbnb_reviews_clean.parquet`) contains preprocessed Airbnb review data, including:
     - **Review text and sentiment** (Positive, Negative, or Neutral)
     - **Numeric scores** (ratings given by users)
     - **Language of review**
@@ -80,16 +81,63 @@ def _():
     from matplotlib.colors import to_rgb
 
     import airbnb_analysis.plots as plots
+    from airbnb_analysis import figcache
+    from airbnb_analysis.index import ReviewIndex
+    from airbnb_analysis.profiling import Profiler
+    from airbnb_analysis.store import ReviewStore
 
     import warnings
     warnings.filterwarnings("ignore")
-    return mo, pd, plots
+    figcache.configure(cache_dir="data/cache/figures")
+    plots.apply_style()
+    return Profiler, ReviewIndex, ReviewStore, mo, plots
 
 
 @app.cell
-def _(pd):
-    df = pd.read_csv("data/processed/airbnb_reviews_clean.csv")
-    return (df,)
+def _(Profiler, ReviewStore):
+    prof = Profiler()
+    with prof.stage("open_store"):
+        store = ReviewStore("data/processed/airbnb_reviews_clean.parquet")
+    options = store.options()
+    return options, prof, store
+
+
+@app.cell(hide_code=True)
+def _(mo, options):
+    source_filter = mo.ui.multiselect(options=options["sources"], label="Source")
+    language_filter = mo.ui.multiselect(options=options["languages"], label="Language")
+    sentiment_filter = mo.ui.multiselect(options=options["sentiments"], label="Sentiment")
+    date_filter = mo.ui.date_range(
+        start=options["start"], stop=options["end"], value=(options["start"], options["end"]), label="Dates"
+    )
+    duplicates_filter = mo.ui.checkbox(value=True, label="Include near-duplicates")
+    mo.hstack([source_filter, language_filter, sentiment_filter, date_filter, duplicates_filter], justify="start")
+    return date_filter, duplicates_filter, language_filter, sentiment_filter, source_filter
+
+
+@app.cell
+def _(Profiler, date_filter, duplicates_filter, language_filter, sentiment_filter, source_filter, store):
+    # Empty selections mean "all"; every chart below re-renders from these aggregate queries
+    filters = dict(
+        sources=source_filter.value or None,
+        languages=language_filter.value or None,
+        sentiments=sentiment_filter.value or None,
+        start=date_filter.value[0],
+        end=date_filter.value[1],
+        duplicates=duplicates_filter.value,
+    )
+    query_prof = Profiler()
+    with query_prof.stage("query"):
+        cube = store.cube(**filters)
+        rollups = store.rollups(**filters)
+        lengths = store.length_box_stats(**filters)
+    return cube, filters, lengths, query_prof, rollups
+
+
+@app.cell(hide_code=True)
+def _(cube, mo, prof, query_prof):
+    mo.md(f"`{int(cube['count'].sum())} reviews | {prof.summary()} | {query_prof.summary()}`")
+    return
 
 
 @app.cell(hide_code=True)
@@ -120,8 +168,8 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(df, plots):
-    plots.plot_sentiment_distribution(df)
+def _(cube, plots):
+    plots.plot_sentiment_distribution(cube)
     return
 
 
@@ -148,8 +196,8 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(df, plots):
-    plots.plot_score_distribution(df)
+def _(cube, plots):
+    plots.plot_score_distribution(cube)
     return
 
 
@@ -161,7 +209,7 @@ def _(mo):
 
     ### Sentiment Over Time
 
-    This visualization tracks how the volume of positive, negative, and neutral Airbnb reviews changes throughout the year.  
+    This visualization tracks how the volume of positive, negative, and neutral Airbnb reviews changes over time; pick a day, ISO week, month or quarter granularity below.  
 
     **Insights:**
     - **Positive reviews** consistently dominate across all months, peaking around midsummer — possibly reflecting increased travel activity and high guest satisfaction during peak vacation periods.  
@@ -176,8 +224,17 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(df, plots):
-    plots.plot_sentiment_over_time(df)
+def _(mo):
+    granularity = mo.ui.dropdown(
+        options=["day", "week", "month", "quarter"], value="month", label="Granularity"
+    )
+    granularity
+    return (granularity,)
+
+
+@app.cell(hide_code=True)
+def _(granularity, plots, rollups):
+    plots.plot_sentiment_over_time(rollups, granularity=granularity.value)
     return
 
 
@@ -204,8 +261,8 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(df, plots):
-    plots.plot_top_languages(df)
+def _(cube, plots):
+    plots.plot_top_languages(cube)
     return
 
 
@@ -232,8 +289,8 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(df, plots):
-    plots.plot_avg_score_by_source(df)
+def _(cube, plots):
+    plots.plot_avg_score_by_source(cube)
     return
 
 
@@ -260,8 +317,8 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(df, plots):
-    plots.plot_review_length_vs_score(df)
+def _(lengths, plots):
+    plots.plot_review_length_vs_score(lengths)
     return
 
 
@@ -287,8 +344,44 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(df, plots):
-    plots.plot_sentiment_wordclouds(df)
+def _(filters, plots, store):
+    plots.plot_sentiment_wordclouds(store.term_counts(**filters))
+    return
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    ---
+
+    ### Keyword Drill-Down
+
+    The reviews behind the word clouds: enter one or more terms (e.g. *refund support*) to count and read the reviews that contain all (or any) of them, within the source and sentiment filters above. Lookups use the inverted index written by `clean.py --index`.
+    """
+    )
+    return
+
+
+@app.cell(hide_code=True)
+def _(ReviewIndex, mo):
+    index = ReviewIndex("data/processed/airbnb_reviews_clean.parquet")
+    keyword_input = mo.ui.text(value="refund support", label="Terms")
+    keyword_mode = mo.ui.dropdown(options=["and", "or"], value="and", label="Match")
+    mo.hstack([keyword_input, keyword_mode], justify="start")
+    return index, keyword_input, keyword_mode
+
+
+@app.cell(hide_code=True)
+def _(filters, index, keyword_input, keyword_mode, mo):
+    keyword_filters = dict(sentiments=filters["sentiments"], sources=filters["sources"])
+    keyword_ids = index.lookup(keyword_input.value.split(), keyword_mode.value, **keyword_filters)
+    keyword_counts = index.counts(keyword_input.value.split(), keyword_mode.value, by="sentiment", **keyword_filters)
+    mo.vstack([
+        mo.md(f"`{len(keyword_ids)} matching reviews`"),
+        mo.ui.table(keyword_counts, selection=None),
+        mo.ui.table(index.reviews(keyword_ids[:100]), selection=None),
+    ])
     return
 
 
@@ -0,0 +1,138 @@
+"""
+boxstats.py — Server-side box-plot statistics with a capped outlier sample.
+
+Quartiles, whiskers (fences) and outliers are computed per group here, so a box plot is drawn
+from a few numbers per box instead of shipping every value to the browser. Outliers are
+reduced to a bounded, reproducible sample that always keeps each group's extremes.
+
+Usage:
+    stats = box_stats(df, "message_len_words", "score")                 # exact, vectorized pandas
+    stats = load_box_stats("data/processed/airbnb_reviews_clean.parquet",
+                           "message_len_words", "score")                # approximate (t-digest) in DuckDB
+    plots.plot_review_length_vs_score(stats)
+"""
+import numpy as np
+import pandas as pd
+
+from airbnb_analysis.clean import open_output
+from airbnb_analysis.cube import weighted_box_stats
+
+BOX_COLUMNS = ["n", "q1", "median", "q3", "lowerfence", "upperfence", "mean", "outliers"]
+
+
+def is_box_stats(df: pd.DataFrame) -> bool:
+    return "q1" in df.columns and "outliers" in df.columns
+
+
+def _sample_outliers(out: pd.DataFrame, value: str, by: str, max_outliers: int, seed: int) -> pd.Series:
+    """Per group: the smallest and largest outlier plus a seeded random sample, max_outliers in total."""
+    if out.empty:
+        return pd.Series(dtype=object)
+    rng = np.random.default_rng(seed)
+    out = out.assign(_key=rng.random(len(out)))
+    g = out.groupby(by, sort=False)[value]
+    # Extremes first (key -1), then random order
+    out.loc[g.idxmin().to_numpy(), "_key"] = -1.0
+    out.loc[g.idxmax().to_numpy(), "_key"] = -1.0
+    kept = out.sort_values([by, "_key"]).groupby(by, sort=False).head(max_outliers)
+    return kept.groupby(by, sort=False)[value].agg(lambda v: sorted(v.tolist()))
+
+
+def box_stats(df: pd.DataFrame, value: str, by: str, max_outliers: int = 50, seed: int = 42) -> pd.DataFrame:
+    """Exact per-group box statistics of df[value] (vectorized groupby quantiles, linear interpolation).
+
+    One row per group, sorted by group: n, q1, median, q3, lowerfence, upperfence (furthest values
+    within 1.5 IQR), mean, and outliers (a list of at most max_outliers values).
+    """
+    data = df[[by, value]].dropna()
+    if data.empty:
+        return pd.DataFrame(columns=[by] + BOX_COLUMNS)
+    g = data.groupby(by, observed=True)[value]
+    q = g.quantile([0.25, 0.5, 0.75]).unstack()
+    stats = pd.DataFrame({"n": g.size(), "q1": q[0.25], "median": q[0.5], "q3": q[0.75], "mean": g.mean()})
+
+    iqr = stats["q3"] - stats["q1"]
+    lo = data[by].map(stats["q1"] - 1.5 * iqr)
+    hi = data[by].map(stats["q3"] + 1.5 * iqr)
+    inside = (data[value] >= lo) & (data[value] <= hi)
+    fences = data[inside].groupby(by, observed=True)[value].agg(["min", "max"])
+    stats["lowerfence"] = fences["min"]
+    stats["upperfence"] = fences["max"]
+    stats["outliers"] = _sample_outliers(data[~inside], value, by, max_outliers, seed)
+    stats["outliers"] = stats["outliers"].apply(lambda v: v if isinstance(v, list) else [])
+    return stats.reset_index()[[by] + BOX_COLUMNS]
+
+
+def box_stats_from_counts(counts: pd.DataFrame, value: str, by: str, max_outliers: int = 50,
+                          seed: int = 42) -> pd.DataFrame:
+    """box_stats from a (by, value, count) frame of value frequencies; same quartiles as box_stats.
+
+    Outliers are the distinct outlying values, capped like box_stats (extremes always kept).
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for key, g in counts.groupby(by, sort=True):
+        s = weighted_box_stats(g[value], g["count"])
+        if not s:
+            continue
+        out = np.sort(s["outliers"])
+        if len(out) > max_outliers:
+            inner = rng.choice(out[1:-1], size=max(max_outliers - 2, 0), replace=False)
+            out = np.sort(np.concatenate([out[:1], inner, out[-1:]]))
+        rows.append({by: key, **{k: s[k] for k in BOX_COLUMNS if k != "outliers"}, "outliers": out.tolist()})
+    return pd.DataFrame(rows, columns=[by] + BOX_COLUMNS)
+
+
+BOX_STATS_SQL = """
+WITH data AS (
+    SELECT "{by}" AS grp, CAST("{value}" AS DOUBLE) AS v FROM {source}
+    WHERE "{by}" IS NOT NULL AND "{value}" IS NOT NULL
+),
+q AS (
+    SELECT grp, count(*) AS n, avg(v) AS mean, {quantile}(v, [0.25, 0.5, 0.75]) AS qs FROM data GROUP BY grp
+),
+flagged AS (
+    SELECT data.grp, data.v, v < qs[1] - 1.5 * (qs[3] - qs[1]) OR v > qs[3] + 1.5 * (qs[3] - qs[1]) AS outlier
+    FROM data JOIN q USING (grp)
+),
+fences AS (
+    SELECT grp, min(v) AS lowerfence, max(v) AS upperfence FROM flagged WHERE NOT outlier GROUP BY grp
+),
+ranked AS (
+    SELECT grp, v,
+           row_number() OVER (PARTITION BY grp ORDER BY v) AS lo_rank,
+           row_number() OVER (PARTITION BY grp ORDER BY v DESC) AS hi_rank,
+           row_number() OVER (PARTITION BY grp ORDER BY hash(v, {seed}), v) AS rnd_rank
+    FROM flagged WHERE outlier
+),
+sampled AS (
+    SELECT grp, list_sort(list(v)) AS outliers FROM (
+        SELECT grp, v, row_number() OVER (
+            PARTITION BY grp ORDER BY CASE WHEN lo_rank = 1 OR hi_rank = 1 THEN 0 ELSE rnd_rank END, v
+        ) AS k
+        FROM ranked
+    ) WHERE k <= {max_outliers} GROUP BY grp
+)
+SELECT q.grp AS "{by}", n, qs[1] AS q1, qs[2] AS median, qs[3] AS q3, lowerfence, upperfence, mean,
+       coalesce(outliers, []) AS outliers
+FROM q LEFT JOIN fences USING (grp) LEFT JOIN sampled USING (grp)
+ORDER BY q.grp
+"""
+
+
+def load_box_stats(path: str, value: str, by: str, approx: bool = True, max_outliers: int = 50,
+                   seed: int = 42, table: str = "reviews", duplicates: bool = True) -> pd.DataFrame:
+    """box_stats computed inside DuckDB from a cleaned .parquet/.duckdb/.csv file or `--partition` directory.
+
+    approx=True uses DuckDB's t-digest approx_quantile (one streaming pass, bounded memory);
+    approx=False uses exact quantile_cont. duplicates=False: see clean.open_output.
+    """
+    con, source = open_output(path, table, duplicates)
+    try:
+        sql = BOX_STATS_SQL.format(by=by, value=value, source=source, seed=int(seed), max_outliers=int(max_outliers),
+                                   quantile="approx_quantile" if approx else "quantile_cont")
+        stats = con.execute(sql).df()
+    finally:
+        con.close()
+    stats["outliers"] = stats["outliers"].apply(list)
+    return stats
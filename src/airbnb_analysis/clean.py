@@ -4,37 +4,300 @@ clean.py — Preprocess Airbnb reviews data.
 
 Usage:
     python clean.py --input /path/to/airbnb_reviews.csv --output /path/to/airbnb_reviews_clean.csv
+    python clean.py --input ... --output ... --chunksize 500000   # stream large dumps in batches
+    python clean.py --source "Google Play=gp.csv" --source "App Store=as.csv" --source "Trustpilot=tp.csv" --output ...
+    python clean.py --input ... --output airbnb_reviews_clean.parquet --format parquet
+    python clean.py --input ... --output airbnb_reviews_clean --format parquet --partition   # source=/year=/month= dirs
+    python clean.py --input march.csv --output airbnb_reviews_clean --format parquet --partition --replace-partitions
+    python clean.py --input ... --output airbnb_reviews_clean.duckdb --format duckdb --incremental
+    python clean.py --input ... --output ... --workers 8   # spread the cleaning over 8 processes
+    python clean.py --input ... --output ... --engine duckdb   # one out-of-core SQL query instead of pandas
+    python clean.py --input ... --output ... --terms   # also store per-sentiment term counts for word clouds
+    python clean.py --input ... --output ... --stopwords   # drop stopwords of each row's language from clean_message
+    python clean.py --input ... --output ... --index   # also store an inverted index of clean_message
+    python clean.py --input ... --output ... --topics   # also store the integer-coded topic table
+    python clean.py --input ... --output ... --dedup   # add a near-duplicate cluster id (dup_cluster)
+    python clean.py --input ... --output ... --profile   # per-stage time/memory report (<output>.profile.json)
 
 What it does:
-1) Reads raw CSV
+1) Reads raw CSV: one merged export, or per-source exports with their own columns (--source, read concurrently)
 2) Normalizes/combines language columns
 3) Parses dates (ds) and adds year, month, day, week, quarter
-4) Cleans review text (message) into clean_message, adds message_len_chars and message_len_words
-5) Parses topics/subtopics to Python lists (when possible)
+4) Cleans review text (message) into clean_message (optionally without the stopwords of the row's
+   language_final, --stopwords), adds message_len_chars and message_len_words
+5) Parses topics/subtopics to Python lists (when possible), kept as topics_parsed / subtopics_parsed
 6) Keeps a compact set of useful columns
+7) Writes CSV, or typed Parquet / DuckDB (real dates, small ints, list<string> topics); Parquet optionally as a
+   directory partitioned by source, year and month (--partition), replacing only the input's partitions
+   (--replace-partitions)
+8) Optionally stores per-sentiment term counts from the same tokenization pass (--terms)
+9) With --incremental, keeps day/week/month/quarter rollups (<table>_rollups) in step with the table
+10) Optionally stores an inverted index (term -> row ids) of clean_message for keyword lookups (--index)
+11) Optionally stores a normalized topic table, (row_id, topic_id, subtopic_id) plus a dictionary (--topics)
+12) Optionally finds near-duplicate reviews by MinHash/LSH and adds their cluster id, dup_cluster (--dedup)
 """
 import argparse
 import ast
+import json
+import os
 import re
-from typing import List, Optional
+import shutil
+import unicodedata
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache, partial
+from typing import Collection, Dict, List, Optional, Union
 
+import duckdb
 import numpy as np
 import pandas as pd
+import regex
+from pandas.tseries.api import guess_datetime_format
+
+try:
+    from airbnb_analysis.dedup import rebuild_duplicates
+    from airbnb_analysis.index import INDEX_TABLE, drop_index, rebuild_index, rows_sql
+    from airbnb_analysis.profiling import NULL_PROFILER, Profiler, file_size
+    from airbnb_analysis.rollups import apply_rollups, rollup_table_for
+    from airbnb_analysis.sql import sql_str
+    from airbnb_analysis.stopwords import stopword_sets
+    from airbnb_analysis.topics import TOPIC_DICT_TABLE, TOPICS_TABLE, drop_topics, rebuild_topics
+except ImportError:  # run as a plain script: python src/airbnb_analysis/clean.py
+    from dedup import rebuild_duplicates
+    from index import INDEX_TABLE, drop_index, rebuild_index, rows_sql
+    from profiling import NULL_PROFILER, Profiler, file_size
+    from rollups import apply_rollups, rollup_table_for
+    from sql import sql_str
+    from stopwords import stopword_sets
+    from topics import TOPIC_DICT_TABLE, TOPICS_TABLE, drop_topics, rebuild_topics
 
 # ---------- Text utilities ----------
+URL_EMAIL_RE = re.compile(r"(https?://\S+)|(\S+@\S+)")
+# Runs of anything but Unicode letters, marks (accents, vowel signs, viramas) and apostrophes: the
+# same classes as _clean_text_sql's [^\pL\pM'], which re's \w cannot express
+NON_LETTER_RE = regex.compile(r"[^\p{L}\p{M}']+")
+# str.lower() uses the full case mappings, DuckDB's lower() the simple one-to-one ones; they only
+# differ for these two (U+0130 -> "i" + U+0307, and sigma -> final sigma at the end of a word)
+SIMPLE_LOWER = str.maketrans({"\u0130": "i", "\u03a3": "\u03c3"})
+
 
-def clean_text(s: Optional[str]) -> str:
-    """Lowercase, remove punctuation/numbers, collapse whitespace; optional stopword removal."""
+def clean_text(s: Optional[str], stopwords: Optional[Collection[str]] = None) -> str:
+    """Lowercase, remove URLs/emails, punctuation and numbers, collapse whitespace. Keeps accented letters
+    and the marks of other scripts; gives the same text as clean_text_batch.
+
+    Words in stopwords (e.g. stopword_sets()[language]) are dropped from the result, as the batch
+    cleaning's --stopwords does (see _stopword_pattern).
+    """
     if not isinstance(s, str):
         return ""
-    x = s.lower()
-    x = re.sub(r"(https?://\S+)|(\S+@\S+)", " ", x)
-    x = re.sub(r"[^a-z\s']", " ", x)
-    x = re.sub(r"\s+", " ", x).strip()
+    x = unicodedata.normalize("NFC", s).translate(SIMPLE_LOWER).lower()
+    x = URL_EMAIL_RE.sub(" ", x)
+    x = NON_LETTER_RE.sub(" ", x).strip()
+    pattern = _stopword_pattern(frozenset(stopwords)) if stopwords else None
+    if pattern:
+        x = re.sub(pattern, " ", f" {x} ").strip()
 
     return x
 
 
+# Python's str.split()/\\s whitespace as an RE2 character class body
+PY_SPACE_CLASS = r"\t-\r\x{1c}-\x{20}\x{85}\pZ"
+
+
+# Python's whitespace minus the plain space: any of these, or a space at either end or next to
+# another, means a row's words are not simply its single-space separated pieces
+ODD_SPACE_CLASS = r"\t-\r\x{1c}-\x{1f}\x{85}\x{a0}\x{1680}\x{2000}-\x{200a}\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}"
+
+
+def _nfc_unsafe_class() -> str:
+    """RE2 character class body of the characters a string must contain for NFC to change it.
+
+    Those NFC maps to something else, those that compose with the character before them, and
+    those with a nonzero combining class (which NFC may reorder): the Unicode quick check. The big
+    ideograph and Hangul syllable blocks hold none of them and are not scanned.
+    """
+    blocks = [(0x0, 0x3400), (0xA000, 0xAC00), (0xD7A4, 0xD800), (0xE000, 0x20000), (0x2F800, 0x2FA20)]
+    cps = [cp for lo, hi in blocks for cp in range(lo, hi)]
+    second = {int(d.split()[1], 16) for d in map(unicodedata.decomposition, map(chr, cps))
+              if d and not d.startswith("<") and " " in d}
+    second.update(range(0x1161, 0x1176), range(0x11A8, 0x11C3))  # Hangul vowel and trailing jamo
+    unsafe = sorted(second.union(cp for cp in cps if unicodedata.combining(chr(cp))
+                                 or not unicodedata.is_normalized("NFC", chr(cp))))
+    ranges: List[List[int]] = []
+    for cp in unsafe:
+        if ranges and ranges[-1][1] == cp - 1:
+            ranges[-1][1] = cp
+        else:
+            ranges.append([cp, cp])
+    return "".join(rf"\x{{{lo:x}}}" + (rf"-\x{{{hi:x}}}" if hi > lo else "") for lo, hi in ranges)
+
+
+NFC_UNSAFE_CLASS = _nfc_unsafe_class()
+
+
+def _normalized_text_sql(m: str) -> str:
+    """SQL: NFC-normalize and lowercase the VARCHAR column m.
+
+    nfc_normalize is skipped for values it would leave as they are (pure ASCII, or no character
+    in NFC_UNSAFE_CLASS): most rows, and the slowest step of the query otherwise.
+    """
+    return (f"lower(CASE WHEN strlen({m}) = length({m}) OR NOT regexp_matches({m}, '[{NFC_UNSAFE_CLASS}]') "
+            f"THEN {m} ELSE nfc_normalize({m}) END)")
+
+
+def _clean_text_sql(x: str) -> str:
+    """SQL: clean_text's rules applied to x, the output of _normalized_text_sql.
+
+    The last pattern turns every run of non-letters into one space and leaves single spaces between
+    words alone, so most rows need no rewrite.
+    """
+    return rf"""trim(regexp_replace(
+        CASE WHEN contains({x}, '@') OR contains({x}, '://')
+             THEN regexp_replace({x}, 'https?://[^{PY_SPACE_CLASS}]+|[^{PY_SPACE_CLASS}]+@[^{PY_SPACE_CLASS}]+', ' ', 'g')
+             ELSE {x} END,
+        ' *[^\pL\pM'' ][^\pL\pM'']*| {{2,}}', ' ', 'g'))"""
+
+
+# Same rules as clean_text, written for DuckDB's RE2 engine
+CLEAN_TEXT_SQL = f"""
+SELECT {_clean_text_sql("x")} AS clean_message
+FROM (
+    SELECT {_normalized_text_sql("m")} AS x
+    FROM (SELECT coalesce(CAST(message AS VARCHAR), '') AS m FROM messages)
+)
+"""
+
+
+def _word_count_sql(m: str) -> str:
+    """SQL: number of whitespace-separated words in m, like len(m.split()).
+
+    Rows whose words are separated by single plain spaces (most) count their spaces instead of
+    extracting the words.
+    """
+    return (f"CASE WHEN {m} = '' THEN 0 "
+            f"WHEN NOT regexp_matches({m}, '^ | $|  |[{ODD_SPACE_CLASS}]') "
+            f"THEN strlen({m}) - strlen(replace({m}, ' ', '')) + 1 "
+            f"ELSE length(regexp_extract_all({m}, '[^{PY_SPACE_CLASS}]+')) END")
+
+
+@lru_cache(maxsize=None)
+def _stopword_pattern(words: frozenset, language: str = "") -> Optional[str]:
+    """RE2 (and re) pattern matching a run of stopwords between single spaces: ' (?:(?:w1|w2|...) )+'.
+
+    Words are cleaned like the text first, so they match what clean_text makes of them in a review
+    (a word it splits, e.g. at a zero-width joiner, matches as that run of words). Words with nothing
+    left (numbers, punctuation) are left out with a warning; None if no word is left.
+    """
+    cleaned = {w: clean_text(w) for w in words}
+    empty = sorted(w for w, c in cleaned.items() if not c)
+    if empty:
+        warnings.warn(f"{len(empty)} {language + ' ' if language else ''}stopword(s) are empty once cleaned "
+                      f"and never match: {empty}", stacklevel=2)
+    words = sorted({c for c in cleaned.values() if c})
+    return " (?:(?:" + "|".join(re.escape(w) for w in words) + ") )+" if words else None
+
+
+def _drop_stopwords_sql(text: str, language: str, stopwords: Dict[str, Collection[str]]) -> str:
+    """SQL: text (words separated by single spaces) without the stopwords of the row's language.
+
+    One CASE branch, with its own constant (compiled once) pattern, per language; rows in other
+    languages keep their text.
+    """
+    patterns = {lang: _stopword_pattern(frozenset(words), lang) for lang, words in sorted(stopwords.items())}
+    cases = "".join(
+        f" WHEN {sql_str(lang)} THEN trim(regexp_replace(' ' || {text} || ' ', {sql_str(pattern)}, ' ', 'g'))"
+        for lang, pattern in patterns.items() if pattern
+    )
+    return f"CASE lower(CAST({language} AS VARCHAR)){cases} ELSE {text} END" if cases else text
+
+
+# Per-row text stats in one pass: cleaned text plus raw char/word counts (and sentiment for term
+# counts, language for stopword removal)
+TEXT_STATS_SQL = f"""
+SELECT {_clean_text_sql("x")} AS clean_message,
+       length(m) AS message_len_chars,
+       {_word_count_sql("m")} AS message_len_words,
+       sentiment, language
+FROM (
+    SELECT m, {_normalized_text_sql("m")} AS x, sentiment, language
+    FROM (SELECT coalesce(CAST(message AS VARCHAR), '') AS m, CAST(sentiment AS VARCHAR) AS sentiment,
+                 CAST(language AS VARCHAR) AS language FROM messages)
+)
+"""
+
+# Per-sentiment term frequencies from cleaned text (tokens are single-space separated)
+TERM_COUNTS_SQL = """
+SELECT lower(sentiment) AS sentiment, term, CAST(count(*) AS INTEGER) AS count
+FROM (SELECT sentiment, unnest(string_split(clean_message, ' ')) AS term FROM {source})
+WHERE term <> '' AND sentiment IS NOT NULL
+GROUP BY ALL
+ORDER BY sentiment, count DESC, term
+"""
+
+
+def clean_text_batch(col: pd.Series) -> pd.Series:
+    """Vectorized clean_text over a whole Series, run in DuckDB (multi-threaded, no per-row Python)."""
+    if not isinstance(col.dtype, pd.StringDtype):
+        col = col.where(col.map(lambda v: isinstance(v, str)), None)
+    con = duckdb.connect()
+    try:
+        con.execute("SET enable_progress_bar = false")
+        con.register("messages", pd.DataFrame({"message": col.to_numpy(dtype=object)}))
+        out = con.execute(CLEAN_TEXT_SQL).df()["clean_message"]
+    finally:
+        con.close()
+    return pd.Series(out.to_numpy(), index=col.index, name=col.name)
+
+
+def text_stats_batch(message: pd.Series, sentiment: Optional[pd.Series] = None, term_counts: bool = False,
+                     language: Optional[pd.Series] = None, stopwords: Optional[Dict[str, Collection[str]]] = None,
+                     threads: Optional[int] = None):
+    """Tokenize a Series of messages once, in DuckDB.
+
+    Returns a frame with clean_message, message_len_chars and message_len_words (same index as
+    message), and, if term_counts, also a (sentiment, term, count) frame built from the same tokens.
+    With stopwords ({language code: words}), each row's clean_message drops the stopwords of its
+    language (rows are matched to their language's pattern in the query, not looped over in Python).
+    threads caps DuckDB's threads (pool workers use 1: the pool already has one process per core).
+    """
+    if not isinstance(message.dtype, pd.StringDtype):
+        message = message.where(message.map(lambda v: isinstance(v, str)), None)
+    frame = pd.DataFrame({
+        "message": message.to_numpy(dtype=object),
+        "sentiment": sentiment.to_numpy(dtype=object) if sentiment is not None else None,
+        "language": language.to_numpy(dtype=object) if language is not None else None,
+    })
+    query = TEXT_STATS_SQL
+    if stopwords:
+        query = (f"SELECT * REPLACE ({_drop_stopwords_sql('clean_message', 'language', stopwords)} AS clean_message) "
+                 f"FROM ({TEXT_STATS_SQL})")
+    con = duckdb.connect()
+    try:
+        con.execute("SET enable_progress_bar = false")
+        if threads:
+            con.execute(f"SET threads = {int(threads)}")
+        con.register("messages", frame)
+        con.execute(f"CREATE TEMP TABLE stats AS {query}")
+        stats = con.execute("SELECT clean_message, message_len_chars, message_len_words FROM stats").df()
+        terms = con.execute(TERM_COUNTS_SQL.format(source="stats")).df() if term_counts else None
+    finally:
+        con.close()
+    stats.index = message.index
+    stats["clean_message"] = stats["clean_message"].to_numpy(dtype=object)
+    return (stats, terms) if term_counts else stats
+
+
+def merge_term_counts(parts: List[pd.DataFrame]) -> pd.DataFrame:
+    """Sum (sentiment, term, count) frames, e.g. from several chunks or workers."""
+    parts = [p for p in parts if p is not None]
+    if not parts:
+        return pd.DataFrame({"sentiment": [], "term": [], "count": []})
+    out = pd.concat(parts).groupby(["sentiment", "term"], as_index=False)["count"].sum()
+    return out.sort_values(["sentiment", "count", "term"], ascending=[True, False, True], ignore_index=True)
+
+
 # ---------- Column helpers ----------
 def coalesce_series(*series: pd.Series) -> pd.Series:
     """Return the first non-null value across multiple series (like SQL COALESCE)."""
@@ -44,72 +307,1008 @@ def coalesce_series(*series: pd.Series) -> pd.Series:
     return out
 
 
+# "['a', "b", ...]" with plain quoted strings only: parsed without literal_eval. Like literal_eval,
+# items cannot hold raw line breaks or NUL, and only Python's own whitespace may separate them.
+_ITEM = r"""(?:'[^'\\\n\r\x00]*'|"[^"\\\n\r\x00]*")"""
+_WS = r"[ \t\f\r\n]*"
+SIMPLE_LIST_RE = re.compile(rf"\[{_WS}(?:{_ITEM}{_WS}(?:,{_WS}{_ITEM}{_WS})*,?{_WS})?\]")
+QUOTED_RE = re.compile(r"'([^'\\]*)'" r'|"([^"\\]*)"')
+
+
+@lru_cache(maxsize=65536)
+def _parse_list_literal(x: str) -> Optional[tuple]:
+    """Parse one stringified list/tuple; None if it is not one. Cached, since topic strings repeat a lot."""
+    x_strip = x.strip()
+    if SIMPLE_LIST_RE.fullmatch(x_strip):
+        return tuple(a or b for a, b in QUOTED_RE.findall(x_strip))
+    if len(x_strip) >= 2 and x_strip[0] in "[(" and x_strip[-1] in ")]":
+        try:
+            v = ast.literal_eval(x_strip)
+            if isinstance(v, (list, tuple)):
+                return tuple(v)
+        except Exception:
+            return None
+    return None
+
+
 def parse_maybe_list(col: pd.Series) -> pd.Series:
-    """Convert stringified list (e.g., "['a','b']") to Python list where possible; else keep NaN/None."""
+    """Convert stringified list (e.g., "['a','b']") to Python list where possible; else keep NaN/None.
+
+    Only distinct values are parsed and mapped back, so rows with the same input share one list object.
+    """
     def _parse(x):
         if isinstance(x, list):
             return x
-        if pd.isna(x):
-            return None
+        if isinstance(x, tuple):
+            return list(x)
         if isinstance(x, str):
-            x_strip = x.strip()
-            if len(x_strip) >= 2 and x_strip[0] in "[(" and x_strip[-1] in ")]":
-                try:
-                    v = ast.literal_eval(x_strip)
-                    if isinstance(v, (list, tuple)):
-                        return list(v)
-                except Exception:
-                    return None
+            v = _parse_list_literal(x)
+            return list(v) if v is not None else None
         return None
-    return col.apply(_parse)
 
+    try:
+        codes, uniques = pd.factorize(col, use_na_sentinel=True)
+    except TypeError:  # unhashable values (e.g. lists already parsed)
+        return col.apply(_parse)
+    parsed = np.empty(len(uniques) + 1, dtype=object)
+    parsed[:-1] = [_parse(u) for u in uniques]
+    parsed[-1] = None  # code -1: missing values
+    return pd.Series(parsed[codes], index=col.index, name=col.name, dtype=object)
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--input", required=True, help="Path to input airbnb_reviews.csv")
-    ap.add_argument("--output", required=True, help="Path to save cleaned CSV")
-    args = ap.parse_args()
 
-    # --- Load ---
-    df = pd.read_csv(args.input)
-
-    # --- Dates ---
-    df["ds"] = pd.to_datetime(df["ds"], errors="coerce")
-    df["year"] = df["ds"].dt.year
-    df["month"] = df["ds"].dt.month
-    df["day"] = df["ds"].dt.day
-    df["week"] = df["ds"].dt.isocalendar().week.astype("Int64")
-    df["quarter"] = df["ds"].dt.quarter
-
-    # --- Language unification ---
-    df["language_final"] = coalesce_series(
-        df["Trustpilot: language"],
-        df["Google Play: language"]
-    )
+# ---------- Pipeline ----------
+RAW_COLS = [
+    "ds", "message", "topics", "subtopics",
+    "Trustpilot: language", "Google Play: language",
+    "source", "sentiment", "score",
+]
+
+KEEP_COLS = [
+    "ds","year","month","day","week","quarter",
+    "source","language_final","sentiment","score",
+    "message","clean_message","message_len_chars","message_len_words",
+    "topics_parsed","subtopics_parsed"
+]
+LIST_COLS = ["topics_parsed", "subtopics_parsed"]
+
+# Declared in-memory dtypes of the cleaned columns (CLEAN_SCHEMA below is the storage side):
+# low-cardinality strings are categorical, date parts and lengths the smallest nullable ints
+CATEGORY_COLS = ["source", "language_final", "sentiment"]
+CLEAN_DTYPES = {
+    "year": "Int16", "month": "Int8", "day": "Int8", "week": "Int8", "quarter": "Int8",
+    "source": "category", "language_final": "category", "sentiment": "category",
+    "score": "float32",
+    "message_len_chars": "Int32", "message_len_words": "Int32",
+    "dup_cluster": "Int32",
+    "row_hash": "uint64",
+}
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast the columns of df that CLEAN_DTYPES declares (in place) and return df.
+
+    Categoricals come out unordered whatever the reader: DuckDB ENUMs arrive ordered, read_csv's
+    "category" does not, and the two only concatenate or compare alike once they match.
+    """
+    for col, dtype in CLEAN_DTYPES.items():
+        if col not in df.columns:
+            continue
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and dtype == "category":
+            if df[col].dtype.ordered:
+                df[col] = df[col].cat.as_unordered()
+        elif df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def guess_ds_format(ds: pd.Series) -> Optional[str]:
+    """The format pandas.to_datetime infers from the first non-null ds: "mixed" (every value parsed
+    on its own) if none can be guessed, None if ds has no text values."""
+    first = ds.dropna().head(1)
+    if len(first) == 0 or not isinstance(first.iloc[0], str):
+        return None
+    return guess_datetime_format(first.iloc[0]) or "mixed"
+
+
+def read_ds_format(path: str) -> Optional[str]:
+    """guess_ds_format of the raw CSV at path, from its first non-null ds (the rest is not read)."""
+    con = duckdb.connect()
+    try:
+        first = con.execute(f"SELECT ds FROM {_raw_csv_sql(path)} WHERE ds IS NOT NULL LIMIT 1").fetchone()
+    finally:
+        con.close()
+    return guess_ds_format(pd.Series([first[0]] if first else [], dtype=object))
+
+
+def add_dates(df: pd.DataFrame, ds_format: Optional[str] = None):
+    """Parse ds and add year, month, day, week and quarter.
+
+    ds_format is the format of the whole input (see guess_ds_format); a chunk or partition of it
+    must not guess its own from its first value, or rows in another format become NaT in one
+    part but not in the others. Default: guessed from df.
+    """
+    df["ds"] = pd.to_datetime(df["ds"], errors="coerce", format=ds_format or guess_ds_format(df["ds"]))
+    df["year"] = df["ds"].dt.year.astype(CLEAN_DTYPES["year"])
+    df["month"] = df["ds"].dt.month.astype(CLEAN_DTYPES["month"])
+    df["day"] = df["ds"].dt.day.astype(CLEAN_DTYPES["day"])
+    df["week"] = df["ds"].dt.isocalendar().week.astype(CLEAN_DTYPES["week"])
+    df["quarter"] = df["ds"].dt.quarter.astype(CLEAN_DTYPES["quarter"])
+
+
+# Language columns of the raw input: one per source in the merged export, a single one with --source
+LANGUAGE_COLS = ["language", "Trustpilot: language", "Google Play: language"]
+
+
+def add_language(df: pd.DataFrame):
+    """Unify the per-source language columns into language_final."""
+    df["language_final"] = coalesce_series(*(df[c] for c in LANGUAGE_COLS if c in df.columns))
+
+
+def add_scores(df: pd.DataFrame):
+    """Make score numeric (float32, NaN when missing or malformed)."""
+    if "score" in df.columns:
+        df["score"] = pd.to_numeric(df["score"], errors="coerce").astype(CLEAN_DTYPES["score"])
+
 
-    # --- Message cleaning ---
-    df["clean_message"] = df["message"].apply(lambda x: clean_text(x))
-    df["message_len_chars"] = df["message"].fillna("").astype(str).str.len()
-    df["message_len_words"] = df["message"].fillna("").astype(str).str.split().apply(len)
+def add_text_stats(df: pd.DataFrame, term_counts: bool = False, stopwords: bool = False,
+                   threads: Optional[int] = None) -> Optional[pd.DataFrame]:
+    """Add clean_message and length stats in one tokenization pass; returns term counts if asked.
 
-    # --- Topics/Subtopics parsing ---
+    stopwords drops the stopwords of each row's language_final from clean_message; threads caps
+    DuckDB's threads (see text_stats_batch).
+    """
+    stats = text_stats_batch(df["message"], df.get("sentiment"), term_counts=term_counts,
+                             language=df.get("language_final"), stopwords=stopword_sets() if stopwords else None,
+                             threads=threads)
+    terms = None
+    if term_counts:
+        stats, terms = stats
+    df[["clean_message", "message_len_chars", "message_len_words"]] = stats
+    return terms
+
+
+def add_topics(df: pd.DataFrame):
+    """Parse topics/subtopics into lists."""
     df["topics_parsed"] = parse_maybe_list(df["topics"])
     df["subtopics_parsed"] = parse_maybe_list(df["subtopics"])
 
-    # --- Keep a compact set of useful columns ---
-    keep_cols = [
-        "ds","year","month","day","week","quarter",
-        "source","language_final","sentiment","score",
-        "message","clean_message","message_len_chars","message_len_words",
-        "topics_parsed"
-    ]
-    keep_cols = [c for c in keep_cols if c in df.columns]
-    clean_df = df[keep_cols].copy()
-
-    # --- Save cleaned CSV ---
-    clean_df.to_csv(args.output, index=False)
+
+def select_clean(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep a compact set of useful columns (plus row_hash in incremental mode), cast to CLEAN_DTYPES."""
+    keep_cols = [c for c in KEEP_COLS + ["row_hash"] if c in df.columns]
+    return apply_schema(df[keep_cols].copy())
+
+
+def clean_frame(df: pd.DataFrame, term_counts: bool = False, profiler: Optional[Profiler] = None,
+                stopwords: bool = False, ds_format: Optional[str] = None, threads: Optional[int] = None):
+    """Apply the cleaning steps to a raw frame (or one chunk of it) and return the compact columns.
+
+    Dtypes are fixed per column so a chunk serializes the same way as the whole file; a chunk
+    also needs the whole input's ds_format (see add_dates), and a pool worker threads=1 (see
+    text_stats_batch).
+    With term_counts=True, returns (clean_df, terms): per-sentiment term frequencies from the same
+    tokenization pass. With stopwords=True, clean_message leaves out the stopwords of the row's
+    language. Each step is recorded as a stage of profiler, if given.
+    """
+    prof = profiler or NULL_PROFILER
+    n = len(df)
+    with prof.stage("dates", rows_in=n):
+        add_dates(df, ds_format)
+    with prof.stage("language", rows_in=n):
+        add_language(df)
+    with prof.stage("scores", rows_in=n):
+        add_scores(df)
+    with prof.stage("text_stats", rows_in=n):
+        terms = add_text_stats(df, term_counts, stopwords, threads)
+    with prof.stage("topics", rows_in=n):
+        add_topics(df)
+    with prof.stage("select", rows_in=n) as st:
+        clean_df = select_clean(df)
+        st["rows_out"] = len(clean_df)
+    return (clean_df, terms) if term_counts else clean_df
+
+
+def clean_frame_parallel(df: pd.DataFrame, workers: int = 1, term_counts: bool = False,
+                         profiler: Optional[Profiler] = None, stopwords: bool = False,
+                         ds_format: Optional[str] = None):
+    """clean_frame over `workers` row partitions in a process pool, concatenated back in input order.
+
+    Identical to clean_frame(df, term_counts, stopwords=stopwords, ds_format=ds_format); falls back to
+    it for workers <= 1 or tiny frames. ds_format (guessed from the whole frame if not given) is resolved
+    before partitioning, and each worker's DuckDB runs single-threaded. With a pool, the profiler sees
+    one clean_parallel stage instead of the individual steps.
+    """
+    if workers <= 1 or len(df) < 2 * workers:
+        return clean_frame(df, term_counts, profiler, stopwords, ds_format)
+    ds_format = ds_format or guess_ds_format(df["ds"])
+    bounds = np.linspace(0, len(df), workers + 1).astype(int)
+    parts = [df.iloc[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+    fn = partial(clean_frame, term_counts=term_counts, stopwords=stopwords, ds_format=ds_format, threads=1)
+    with (profiler or NULL_PROFILER).stage("clean_parallel", rows_in=len(df)), \
+            ProcessPoolExecutor(max_workers=workers) as ex:
+        results = list(ex.map(fn, parts))
+    # Partitions can have different categories, which concat turns back into strings
+    if term_counts:
+        return apply_schema(pd.concat([r[0] for r in results])), merge_term_counts([r[1] for r in results])
+    return apply_schema(pd.concat(results))
+
+
+def _imap_ordered(ex: ProcessPoolExecutor, fn, items, window: int):
+    """Like ex.map, but keeps at most `window` items in flight so a streaming input is not read ahead."""
+    pending = deque()
+    for item in items:
+        pending.append(ex.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def read_raw(path: str, chunksize: Optional[int] = None):
+    """Read only the raw columns the pipeline uses, as text; returns a frame, or an iterator of frames if chunksize is set.
+
+    Reading everything as str keeps values (and their hashes) independent of per-file dtype inference;
+    clean_frame converts dates and scores itself.
+    """
+    return pd.read_csv(path, usecols=lambda c: c in RAW_COLS, dtype=str, chunksize=chunksize)
+
+
+# ---------- Multi-source input ----------
+# Columns of the separate per-source exports read with --source instead of one merged export:
+# {source: {raw column: column of that export}}, after the usual scraper exports. Raw columns a
+# source does not have are NULL and source is the export's name. --source-columns replaces entries.
+# An entry may also give the export's "ds_format" (a strptime format); otherwise it is guessed from
+# that export's first ds, as pandas.to_datetime would for it alone.
+SOURCE_RAW_COLS = ["ds", "message", "topics", "subtopics", "language", "source", "sentiment", "score"]
+_LABEL_COLS = {"topics": "topics", "subtopics": "subtopics", "sentiment": "sentiment"}
+SOURCE_COLUMNS = {
+    "Google Play": {"ds": "at", "message": "content", "score": "score", "language": "language", **_LABEL_COLS},
+    "App Store": {"ds": "date", "message": "review", "score": "rating", **_LABEL_COLS},
+    "Trustpilot": {"ds": "date", "message": "text", "score": "rating", "language": "language", **_LABEL_COLS},
+}
+
+
+def _ds_sql(ds: str, fmt: Optional[str]) -> str:
+    """SQL parsing the text column ds with a guess_ds_format format (TRY_CAST if None or "mixed")."""
+    return f"try_strptime({ds}, {sql_str(fmt)})" if fmt and fmt != "mixed" else f"TRY_CAST({ds} AS TIMESTAMP)"
+
+
+def source_sql(con: duckdb.DuckDBPyConnection, name: str, path: str, mapping: Dict[str, str]) -> str:
+    """SELECT of the SOURCE_RAW_COLS of source name's export at path, columns renamed by mapping.
+
+    ds is parsed here, with the export's own format, and passed on as ISO text: the exports' date
+    formats differ, and one format inferred for the union would turn the other sources' dates to NaT.
+    """
+    raw = _raw_csv_sql(path)
+    columns = {r[0] for r in con.execute(f"DESCRIBE SELECT * FROM {raw}").fetchall()}
+    for c in ("ds", "message"):
+        if mapping.get(c) not in columns:
+            raise ValueError(f"{path}: no {mapping.get(c)!r} column for the {c} of {name} (see --source-columns)")
+
+    def expr(c):
+        if mapping.get(c) in columns:
+            return '"' + mapping[c].replace('"', '""') + '"'
+        return sql_str(name) if c == "source" else "CAST(NULL AS VARCHAR)"
+
+    exprs = {c: expr(c) for c in SOURCE_RAW_COLS}
+    fmt = mapping.get("ds_format")
+    if fmt is None:
+        first = con.execute(f"SELECT {exprs['ds']} FROM {raw} WHERE {exprs['ds']} IS NOT NULL LIMIT 1").fetchone()
+        fmt = guess_ds_format(pd.Series([first[0]] if first else [], dtype=object))
+    exprs["ds"] = f"strftime({_ds_sql(exprs['ds'], fmt)}, '%Y-%m-%d %H:%M:%S')"
+    return "SELECT " + ", ".join(f'{e} AS "{c}"' for c, e in exprs.items()) + f" FROM {raw}"
+
+
+def sources_sql(con: duckdb.DuckDBPyConnection, inputs: Dict[str, str],
+                columns: Optional[Dict[str, Dict[str, str]]] = None) -> str:
+    """One relation of all per-source exports ({source: path}), in order."""
+    columns = columns or SOURCE_COLUMNS
+    return "(" + " UNION ALL ".join(source_sql(con, n, p, columns[n]) for n, p in inputs.items()) + ")"
+
+
+def read_sources(inputs: Dict[str, str], columns: Optional[Dict[str, Dict[str, str]]] = None) -> pd.DataFrame:
+    """Read per-source exports ({source: path}) as one raw frame of SOURCE_RAW_COLS, sources in order.
+
+    Every export is parsed by DuckDB, which releases the GIL, in its own thread and straight into the
+    shared columns: reading takes about as long as the largest export, and no wide frame with every
+    source's own columns is built. Values are text, as with read_raw.
+    """
+    columns = columns or SOURCE_COLUMNS
+    con = duckdb.connect()
+
+    def read(item):
+        name, path = item
+        cur = con.cursor()
+        try:
+            return cur.execute(source_sql(cur, name, path, columns[name])).df()
+        finally:
+            cur.close()
+
+    try:
+        con.execute("SET enable_progress_bar = false")
+        with ThreadPoolExecutor(max_workers=len(inputs)) as ex:
+            frames = list(ex.map(read, inputs.items()))
+    finally:
+        con.close()
+    df = pd.concat(frames, ignore_index=True)
+    # All-NULL columns come back as object
+    return df.astype({c: "str" for c in df.columns if df[c].dtype == object})
+
+
+def input_size(input_path: Union[str, Dict[str, str]]) -> Optional[int]:
+    """Bytes of the raw input: one file, or all per-source exports."""
+    if isinstance(input_path, dict):
+        return sum(file_size(p) or 0 for p in input_path.values())
+    return file_size(input_path)
+
+
+# ---------- Output ----------
+FORMATS = ["csv", "parquet", "duckdb"]
+
+# Column types for the columnar formats (Parquet / DuckDB)
+CLEAN_SCHEMA = {
+    "ds": "DATE",
+    "year": "SMALLINT", "month": "TINYINT", "day": "TINYINT", "week": "TINYINT", "quarter": "TINYINT",
+    "source": "VARCHAR", "language_final": "VARCHAR", "sentiment": "VARCHAR", "score": "FLOAT",
+    "message": "VARCHAR", "clean_message": "VARCHAR",
+    "message_len_chars": "INTEGER", "message_len_words": "INTEGER",
+    "topics_parsed": "VARCHAR[]", "subtopics_parsed": "VARCHAR[]",
+    "dup_cluster": "INTEGER",
+    "row_hash": "UBIGINT",
+}
+
+
+def _typed_select(columns: List[str], source: str) -> str:
+    exprs = [f'CAST("{c}" AS {CLEAN_SCHEMA.get(c, "VARCHAR")}) AS "{c}"' for c in columns]
+    return f"SELECT {', '.join(exprs)} FROM {source}"
+
+
+def _register_clean(con: duckdb.DuckDBPyConnection, clean_df: pd.DataFrame, name: str = "clean_df"):
+    """Register clean_df for a typed select; makes sure the LIST_COLS are scanned as lists of strings."""
+    con.register(name, clean_df)
+    fixed = {}
+    for col in LIST_COLS:
+        if col in clean_df.columns:
+            kind = con.execute(f'SELECT typeof("{col}") FROM {name} LIMIT 1').fetchone()
+            if kind and kind[0] != "VARCHAR[]":
+                # Mixed item types (e.g. [1, 2]) make DuckDB fall back to parsing the list's text
+                fixed[col] = clean_df[col].map(lambda v: [str(i) for i in v] if isinstance(v, list) else None)
+    if fixed:
+        con.register(name, clean_df.assign(**fixed))
+
+
+def write_duckdb(clean_df: pd.DataFrame, path: str, table: str = "reviews", append: bool = False):
+    """Write the cleaned frame to a typed DuckDB table (replacing it, or appending when append=True)."""
+    con = duckdb.connect(path)
+    try:
+        _register_clean(con, clean_df)
+        select = _typed_select(list(clean_df.columns), "clean_df")
+        if append:
+            con.execute(f"INSERT INTO {table} BY NAME {select}")
+        else:
+            con.execute(f"CREATE OR REPLACE TABLE {table} AS {select}")
+            # Rollups stored by an earlier --incremental run no longer match the table, nor do
+            # the index and topic table of its row positions
+            for stale in (rollup_table_for(table), INDEX_TABLE, TOPICS_TABLE, TOPIC_DICT_TABLE):
+                con.execute(f"DROP TABLE IF EXISTS {stale}")
+    finally:
+        con.close()
+
+
+def write_parquet(clean_df: pd.DataFrame, path: str):
+    """Write the cleaned frame to a typed Parquet file."""
+    con = duckdb.connect()
+    try:
+        _register_clean(con, clean_df)
+        con.execute(f"COPY ({_typed_select(list(clean_df.columns), 'clean_df')}) TO {sql_str(path)} (FORMAT parquet)")
+    finally:
+        con.close()
+
+
+def term_counts_path_for(output_path: str) -> str:
+    return os.path.splitext(output_path)[0] + ".terms.parquet"
+
+
+def save_term_counts(terms: pd.DataFrame, output_path: str, fmt: str = "csv", table: str = "term_counts"):
+    """Store term counts next to the cleaned data: a table in the DuckDB output, else a .terms.parquet sidecar."""
+    con = duckdb.connect(output_path if fmt == "duckdb" else ":memory:")
+    try:
+        con.register("terms", terms)
+        select = "SELECT CAST(sentiment AS VARCHAR) AS sentiment, CAST(term AS VARCHAR) AS term, " \
+                 "CAST(count AS INTEGER) AS count FROM terms"
+        if fmt == "duckdb":
+            con.execute(f"CREATE OR REPLACE TABLE {table} AS {select}")
+        else:
+            con.execute(f"COPY ({select}) TO {sql_str(term_counts_path_for(output_path))} (FORMAT parquet)")
+    finally:
+        con.close()
+
+
+def rebuild_term_counts(output_path: str, fmt: str, table: str = "reviews"):
+    """Recount terms from an existing cleaned output (used where rows were appended or deleted in place)."""
+    con = duckdb.connect(output_path if fmt == "duckdb" else ":memory:")
+    try:
+        source = {"duckdb": table, "parquet": parquet_source(output_path),
+                  "csv": f"read_csv({sql_str(output_path)}, all_varchar=true)"}[fmt]
+        terms = con.execute(TERM_COUNTS_SQL.format(source=source)).df()
+    finally:
+        con.close()
+    save_term_counts(terms, output_path, fmt)
+
+
+# ---------- Partitioned Parquet ----------
+# --partition writes <output>/source=<s>/year=<y>/month=<m>/data_0.parquet (hive layout, values URL-encoded,
+# NULL as HIVE_NULL), which DuckDB and pyarrow read back with the partition columns restored
+PARTITION_COLS = ["source", "year", "month"]
+HIVE_NULL = "__HIVE_DEFAULT_PARTITION__"
+
+
+def parquet_source(path: str, files: Optional[List[str]] = None) -> str:
+    """read_parquet of a Parquet output: one file, or a partitioned directory (only the given files of it)."""
+    if not os.path.isdir(path):
+        return f"read_parquet({sql_str(path)})"
+    paths = files if files is not None else [os.path.join(path, "**", "*.parquet")]
+    hive_types = ", ".join(f"'{c}': {CLEAN_SCHEMA[c]}" for c in PARTITION_COLS)
+    return f"read_parquet([{', '.join(map(sql_str, paths))}], hive_partitioning = true, " \
+           f"hive_types = {{{hive_types}}})"
+
+
+def open_output(path: str, table: str = "reviews", duplicates: bool = True):
+    """(in-memory connection, FROM source) for reading the cleaned output at path: table of a DuckDB
+    file (attached read-only as src), a Parquet file or `--partition` directory, or a CSV file.
+
+    duplicates=False keeps only the first review of each near-duplicate cluster (the dup_cluster
+    column of --dedup), as dedup.drop_duplicates does.
+    """
+    con = duckdb.connect()
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".duckdb", ".db"):
+        con.execute(f"ATTACH {sql_str(path)} AS src (READ_ONLY)")
+        source = f"src.{table}"
+    elif ext == ".parquet" or os.path.isdir(path):
+        source = parquet_source(path)
+    else:
+        source = f"read_csv({sql_str(path)})"
+    if not duplicates and "dup_cluster" in [r[0] for r in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()]:
+        source = (f"(SELECT * EXCLUDE (row_id) FROM ({rows_sql(path, source)}) "
+                  f"WHERE dup_cluster IS NULL OR dup_cluster = row_id)")
+    return con, source
+
+
+def _partition_dirs(root: str) -> List[str]:
+    """source=/year=/month= directories under root, relative to it."""
+    depth = len(PARTITION_COLS)
+    return sorted(os.path.relpath(d, root) for d, _, _ in os.walk(root)
+                  if len(os.path.relpath(d, root).split(os.sep)) == depth)
+
+
+def write_partitioned(flat_path: str, output_dir: str, replace_partitions: bool = False) -> int:
+    """Move the single-file Parquet output at flat_path into a partitioned directory at output_dir.
+
+    The partitions are written to a staging directory first. Without replace_partitions output_dir
+    is then replaced as a whole; with it, only the partitions flat_path has rows for are swapped in
+    and all other partitions of output_dir are kept (re-cleaning one month rewrites only its
+    partitions). Returns the number of partitions written.
+    """
+    stage_dir = output_dir + ".tmp"
+    shutil.rmtree(stage_dir, ignore_errors=True)
+    con = duckdb.connect()
+    try:
+        con.execute(f"COPY (SELECT * FROM read_parquet({sql_str(flat_path)})) TO {sql_str(stage_dir)} "
+                    f"(FORMAT parquet, PARTITION_BY ({', '.join(PARTITION_COLS)}))")
+    finally:
+        con.close()
+    os.remove(flat_path)
+    written = _partition_dirs(stage_dir)
+    if not replace_partitions or not os.path.isdir(output_dir):
+        if os.path.isdir(output_dir):
+            shutil.rmtree(output_dir)
+        elif os.path.exists(output_dir):
+            os.remove(output_dir)
+        os.replace(stage_dir, output_dir)
+        return len(written)
+    for rel in written:
+        target = os.path.join(output_dir, rel)
+        shutil.rmtree(target, ignore_errors=True)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(os.path.join(stage_dir, rel), target)
+    shutil.rmtree(stage_dir)
+    return len(written)
+
+
+def save_clean(clean_df: pd.DataFrame, path: str, fmt: str = "csv", append: bool = False):
+    """Save the cleaned frame as csv, parquet or duckdb; append adds rows to an existing csv/duckdb output."""
+    if fmt == "csv":
+        # to_csv drops the time part per block of rows whose ds are all midnight; decide once for the frame
+        ds = clean_df["ds"].dropna() if "ds" in clean_df.columns else pd.Series(dtype="datetime64[ns]")
+        dates_only = not pd.api.types.is_datetime64_any_dtype(ds) or bool((ds == ds.dt.normalize()).all())
+        clean_df.to_csv(path, mode="a" if append else "w", header=not append, index=False,
+                        date_format="%Y-%m-%d" if dates_only else "%Y-%m-%d %H:%M:%S")
+    elif fmt == "duckdb":
+        write_duckdb(clean_df, path, append=append)
+    elif fmt == "parquet":
+        if append:
+            raise ValueError("Parquet output cannot be appended to; write to duckdb first")
+        write_parquet(clean_df, path)
+    else:
+        raise ValueError(f"Unknown output format: {fmt}")
+
+
+def clean_chunked(input_path: str, output_path: str, chunksize: int, fmt: str = "csv", workers: int = 1,
+                  term_counts: bool = False, profiler: Optional[Profiler] = None, stopwords: bool = False) -> int:
+    """Stream input_path through clean_frame in batches of chunksize rows, appending each to output_path.
+
+    Peak memory is bounded by one chunk (about 2 * workers chunks with a process pool; chunks are still
+    written in input order). Every chunk parses ds with the format of the input's first date. Parquet chunks are staged in a temporary DuckDB file and copied out at the
+    end. Per-chunk term counts are summed as they arrive. Returns the number of rows written.
+    """
+    stage_path = output_path + ".tmp.duckdb" if fmt == "parquet" else output_path
+    stage_fmt = "duckdb" if fmt == "parquet" else fmt
+    prof = profiler or NULL_PROFILER
+    rows = 0
+    terms = None
+    ds_format = read_ds_format(input_path)
+    chunks = prof.iter("load", read_raw(input_path, chunksize=chunksize), bytes_read=file_size(input_path))
+    with ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext() as ex:
+        if ex:
+            fn = partial(clean_frame, term_counts=term_counts, stopwords=stopwords, ds_format=ds_format,
+                         threads=1)
+            cleaned = prof.iter("clean_parallel", _imap_ordered(ex, fn, chunks, 2 * workers))
+        else:
+            fn = partial(clean_frame, term_counts=term_counts, profiler=prof, stopwords=stopwords,
+                         ds_format=ds_format)
+            cleaned = map(fn, chunks)
+        for i, out in enumerate(cleaned):
+            if term_counts:
+                out, chunk_terms = out
+                terms = merge_term_counts([terms, chunk_terms])
+            size_before = (file_size(stage_path) or 0) if i > 0 else 0
+            with prof.stage("save", rows_in=len(out)) as st:
+                save_clean(out, stage_path, stage_fmt, append=i > 0)
+                st["bytes_written"] = (file_size(stage_path) or 0) - size_before
+            rows += len(out)
+    if term_counts:
+        with prof.stage("save_terms", rows_in=len(terms)):
+            save_term_counts(terms, output_path, fmt)
+
+    if fmt == "parquet":
+        with prof.stage("write_parquet", rows_in=rows) as st:
+            con = duckdb.connect(stage_path)
+            try:
+                con.execute(f"COPY reviews TO {sql_str(output_path)} (FORMAT parquet)")
+            finally:
+                con.close()
+            os.remove(stage_path)
+            st["bytes_written"] = file_size(output_path)
+    return rows
+
+
+# ---------- Incremental ----------
+def hash_rows(df: pd.DataFrame) -> pd.Series:
+    """64-bit content hash of each raw row (over the raw columns present)."""
+    cols = [c for c in RAW_COLS if c in df.columns]
+    return pd.util.hash_pandas_object(df[cols], index=False)
+
+
+def _hash_sum(hashes: pd.Series) -> int:
+    # Order-independent fingerprint of a multiset of row hashes (sum mod 2**64)
+    return int(hashes.to_numpy(dtype=np.uint64).sum(dtype=np.uint64))
+
+
+def manifest_path_for(output_path: str) -> str:
+    return output_path + ".manifest.json"
+
+
+def load_manifest(path: str) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(path: str, manifest: dict):
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def clean_incremental(input_path: str, output_path: str, table: str = "reviews", workers: int = 1,
+                      profiler: Optional[Profiler] = None, stopwords: bool = False) -> dict:
+    """Clean only new or changed rows of input_path into the DuckDB table at output_path.
+
+    A manifest next to the output stores the max ds already processed (the watermark) and a fingerprint
+    of every processed raw row. Rows newer than the watermark are cleaned and appended. Rows at or before
+    it are only compared by hash: if the fingerprint matches, history is unchanged and nothing else is
+    read back; otherwise late-arriving or edited rows are found by comparing hash counts with the stored
+    row_hash column, their stale versions are deleted and the current versions re-cleaned.
+    Without a manifest (or output) the whole input is cleaned, as it is when the manifest was written
+    with other cleaning options (stopwords, the ds format guessed for the input): the stored rows would
+    not match the ones cleaned now. The delta parses ds with the format of the whole input, as the
+    watermark comparison does. Returns a summary dict.
+    """
+    prof = profiler or NULL_PROFILER
+    manifest_path = manifest_path_for(output_path)
+    manifest = load_manifest(manifest_path) if os.path.exists(output_path) else None
+
+    with prof.stage("load", bytes_read=file_size(input_path)) as st:
+        df = read_raw(input_path)
+        st["rows_out"] = len(df)
+    with prof.stage("hash", rows_in=len(df)):
+        df["row_hash"] = hash_rows(df)
+        ds_format = guess_ds_format(df["ds"])
+        ds = pd.to_datetime(df["ds"], errors="coerce", format=ds_format)
+    options = {"stopwords": bool(stopwords), "ds_format": ds_format}
+    if manifest is not None and manifest.get("options") != options:
+        manifest = None
+
+    with prof.stage("diff", rows_in=len(df)) as st:
+        delta, stale = _incremental_delta(df, ds, manifest, output_path, table)
+        st["rows_out"] = len(delta)
+
+    clean_df = clean_frame_parallel(delta.copy(), workers, profiler=prof, stopwords=stopwords, ds_format=ds_format)
+    size_before = file_size(output_path) or 0
+    with prof.stage("save", rows_in=len(clean_df)) as st:
+        _write_incremental(clean_df, stale, manifest is None, output_path, table)
+        st["bytes_written"] = (file_size(output_path) or 0) - size_before
+
+    max_ds = ds.max()
+    if manifest is not None and (pd.isna(max_ds) or pd.Timestamp(manifest["watermark"]) > max_ds):
+        max_ds = pd.Timestamp(manifest["watermark"])
+    save_manifest(manifest_path, {
+        "watermark": max_ds.isoformat() if pd.notna(max_ds) else pd.Timestamp.min.isoformat(),
+        "history_rows": len(df),
+        "history_hash": _hash_sum(df["row_hash"]),
+        "options": options,
+    })
+    return {"rows_in": len(df), "rows_cleaned": len(clean_df), "stale_hashes": len(stale)}
+
+
+def _incremental_delta(df: pd.DataFrame, ds: pd.Series, manifest: Optional[dict], output_path: str, table: str):
+    """Raw rows to (re-)clean and the row hashes whose stored rows are stale."""
+    if manifest is None:
+        delta = df
+        stale = pd.Series([], dtype="uint64")
+    else:
+        watermark = pd.Timestamp(manifest["watermark"])
+        newer = ds > watermark
+        history = df.loc[~newer, "row_hash"]
+        if len(history) == manifest["history_rows"] and _hash_sum(history) == manifest["history_hash"]:
+            stale = pd.Series([], dtype="uint64")
+        else:
+            con = duckdb.connect(output_path, read_only=True)
+            try:
+                stored = con.execute(
+                    f"SELECT row_hash, count(*) AS n FROM {table} GROUP BY row_hash"
+                ).df().set_index("row_hash")["n"]
+            finally:
+                con.close()
+            incoming = history.value_counts()
+            counts = pd.concat([stored.rename("stored"), incoming.rename("incoming")], axis=1).fillna(0)
+            stale = pd.Series(counts.index[counts["stored"] != counts["incoming"]], dtype="uint64")
+        delta = df[newer | df["row_hash"].isin(stale)]
+    return delta, stale
+
+
+def _write_incremental(clean_df: pd.DataFrame, stale: pd.Series, fresh: bool, output_path: str, table: str):
+    """Apply the delta to the table and to its rollups (removed rows subtracted, new rows added)."""
+    if fresh:
+        write_duckdb(clean_df, output_path, table=table)
+        con = duckdb.connect(output_path)
+        try:
+            apply_rollups(con, f"SELECT * FROM {table}", table)
+        finally:
+            con.close()
+    else:
+        con = duckdb.connect(output_path)
+        try:
+            if len(stale):
+                con.register("stale", pd.DataFrame({"row_hash": stale}))
+                stale_rows = f"SELECT * FROM {table} WHERE row_hash IN (SELECT row_hash FROM stale)"
+                apply_rollups(con, stale_rows, table, sign=-1)
+                con.execute(f"DELETE FROM {table} WHERE row_hash IN (SELECT row_hash FROM stale)")
+            # Cluster ids of an earlier --dedup address rows by position, which the update changes
+            con.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS dup_cluster")
+            _register_clean(con, clean_df)
+            select = _typed_select(list(clean_df.columns), "clean_df")
+            # Tables written before subtopics_parsed was kept get the column (NULL for their old rows)
+            for col in LIST_COLS:
+                con.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS "{col}" {CLEAN_SCHEMA[col]}')
+            con.execute(f"INSERT INTO {table} BY NAME {select}")
+            apply_rollups(con, select, table)
+        finally:
+            con.close()
+
+
+# ---------- DuckDB engine ----------
+# pandas.read_csv's default NA strings, so both engines see the same missing values
+PANDAS_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+# Fast path for topic strings that clean_frame would write as a plain ['a', 'b'] repr: simple quoted
+# strings made of printable characters only (Python's repr escapes the rest). Other values go to a Python UDF.
+SIMPLE_LIST_SQL = (
+    r"regexp_full_match({t}, '\s*" + SIMPLE_LIST_RE.pattern.replace("'", "''") + r"\s*')"
+    r" AND NOT regexp_matches({t}, '[^\x{{20}}-\x{{7e}}\pL\pM\pN\pP\pS]')"
+)
+QUOTED_ITEMS_SQL = (
+    "list_transform(regexp_extract_all({t}, '" + QUOTED_RE.pattern.replace("'", "''") + "'), q -> q[2:-2])"
+)
+# repr() of one string item: single quotes unless the item contains one
+ITEM_REPR_SQL = """CASE WHEN NOT contains(i, '''') THEN '''' || i || ''''
+    WHEN NOT contains(i, '"') THEN '"' || i || '"'
+    ELSE '''' || replace(i, '''', '\''') || '''' END"""
+
+
+def _py_list_repr(x: Optional[str]) -> Optional[str]:
+    v = _parse_list_literal(x) if x is not None else None
+    return repr(list(v)) if v is not None else None
+
+
+def _py_list(x: Optional[str]) -> Optional[List[str]]:
+    v = _parse_list_literal(x) if x is not None else None
+    return [str(i) for i in v] if v is not None else None
+
+
+def _topics_sql(t: str, as_text: bool) -> str:
+    """SQL for a parsed list column (topics_parsed, subtopics_parsed) from the raw text t: the list repr
+    clean_frame writes to CSV (as_text), else a VARCHAR[]. Needs the py_list / py_list_repr functions."""
+    items = QUOTED_ITEMS_SQL.format(t=t)
+    if as_text:
+        fast = f"'[' || array_to_string(list_transform({items}, i -> {ITEM_REPR_SQL}), ', ') || ']'"
+        slow = f"py_list_repr({t})"
+    else:
+        fast, slow = items, f"py_list({t})"
+    return f"CASE WHEN {SIMPLE_LIST_SQL.format(t=t)} THEN {fast} ELSE {slow} END"
+
+
+def _raw_csv_sql(path: str) -> str:
+    """read_csv of a raw export as text, with pandas' missing values."""
+    nullstr = "[" + ", ".join(sql_str(v) for v in PANDAS_NA_VALUES) + "]"
+    return (f"read_csv({sql_str(path)}, header=true, all_varchar=true, delim=',', quote='\"', "
+            f"escape='\"', nullstr={nullstr})")
+
+
+def _duckdb_clean_sql(con: duckdb.DuckDBPyConnection, input_path: Union[str, Dict[str, str]], as_text: bool,
+                      stopwords: Optional[Dict[str, Collection[str]]] = None,
+                      source_columns: Optional[Dict[str, Dict[str, str]]] = None) -> str:
+    """One SELECT that reproduces clean_frame over the raw CSV at input_path, or over the per-source
+    exports of a {source: path} dict (mapped by source_columns, see sources_sql).
+
+    as_text=True gives exactly what clean_frame + to_csv would write; otherwise the typed
+    CLEAN_SCHEMA columns for Parquet/DuckDB output. stopwords ({language code: words}) are
+    dropped from clean_message as with clean_frame(stopwords=True).
+    """
+    if isinstance(input_path, dict):
+        raw = sources_sql(con, input_path, source_columns)
+    else:
+        raw = _raw_csv_sql(input_path)
+    columns = [r[0] for r in con.execute(f"DESCRIBE SELECT * FROM {raw}").fetchall()]
+
+    # pandas.to_datetime infers one format from the first value and coerces the rest to it
+    first = con.execute(f"SELECT ds FROM {raw} WHERE ds IS NOT NULL LIMIT 1").fetchone()
+    ds = _ds_sql("ds", guess_datetime_format(first[0]) if first else None)
+
+    def col(name):
+        return f'"{name}"' if name in columns else "NULL"
+
+    m = "coalesce(message, '')"
+    exprs = {
+        "ds": "ds",
+        "year": "year(ds)", "month": "month(ds)", "day": "day(ds)",
+        "week": "weekofyear(ds)", "quarter": "quarter(ds)",
+        "source": col("source"),
+        "language_final": f"coalesce({', '.join(col(c) for c in LANGUAGE_COLS)})",
+        "sentiment": col("sentiment"),
+        "score": f'TRY_CAST({col("score")} AS DOUBLE)',
+        "message": "message",
+        "clean_message": _clean_text_sql("x"),
+        "message_len_chars": f"length({m})",
+        "message_len_words": _word_count_sql(m),
+        "topics_parsed": _topics_sql(col("topics"), as_text),
+        "subtopics_parsed": _topics_sql(col("subtopics"), as_text),
+    }
+    source = f"""(
+    SELECT * REPLACE ({ds} AS ds), {_normalized_text_sql(m)} AS x
+    FROM {raw}
+)"""
+    if stopwords:
+        # Clean once in an inner query, then drop the stopwords of the row's language
+        source = f"(SELECT *, {exprs['clean_message']} AS c FROM {source})"
+        exprs["clean_message"] = _drop_stopwords_sql("c", exprs["language_final"], stopwords)
+    optional = ("source", "sentiment", "score")
+    keep = [c for c in KEEP_COLS if c not in optional or c in columns]
+
+    if as_text:
+        # Match to_csv: empty strings as bare empty fields, and no time part when every ds is midnight
+        dates_only = con.execute(
+            f"SELECT coalesce(bool_and({ds} = date_trunc('day', {ds})), true) FROM {raw}"
+        ).fetchone()[0]
+        exprs["ds"] = "strftime(ds, '%Y-%m-%d')" if dates_only else "strftime(ds, '%Y-%m-%d %H:%M:%S')"
+        for c in ("source", "language_final", "sentiment", "message", "clean_message"):
+            exprs[c] = f"NULLIF({exprs[c]}, '')"
+        select = ", ".join(f'{exprs[c]} AS "{c}"' for c in keep)
+    else:
+        select = ", ".join(f'CAST({exprs[c]} AS {CLEAN_SCHEMA[c]}) AS "{c}"' for c in keep)
+
+    return f"""
+SELECT {select}
+FROM {source}
+"""
+
+
+def clean_duckdb(input_path: Union[str, Dict[str, str]], output_path: str, fmt: str = "csv", table: str = "reviews",
+                 threads: Optional[int] = None, profiler: Optional[Profiler] = None, stopwords: bool = False,
+                 source_columns: Optional[Dict[str, Dict[str, str]]] = None):
+    """Run the whole cleaning pipeline as one DuckDB query over the raw CSV, or the per-source exports
+    of a {source: path} dict (out-of-core, multi-threaded).
+
+    Output matches the pandas engine for the same format. The profiler sees a single duckdb_query stage.
+    """
+    con = duckdb.connect()
+    st = (profiler or NULL_PROFILER).stage("duckdb_query", bytes_read=input_size(input_path))
+    try:
+        if threads:
+            con.execute(f"SET threads = {int(threads)}")
+        con.create_function("py_list_repr", _py_list_repr, ["VARCHAR"], "VARCHAR", null_handling="special")
+        con.create_function("py_list", _py_list, ["VARCHAR"], "VARCHAR[]", null_handling="special")
+        with st as rec:
+            query = _duckdb_clean_sql(con, input_path, as_text=fmt == "csv",
+                                      stopwords=stopword_sets() if stopwords else None, source_columns=source_columns)
+            if fmt == "csv":
+                con.execute(f"COPY ({query}) TO {sql_str(output_path)} (FORMAT csv, HEADER)")
+            elif fmt == "parquet":
+                con.execute(f"COPY ({query}) TO {sql_str(output_path)} (FORMAT parquet)")
+            elif fmt == "duckdb":
+                con.execute(f"ATTACH {sql_str(output_path)} AS out")
+                con.execute(f"CREATE OR REPLACE TABLE out.{table} AS {query}")
+            else:
+                raise ValueError(f"Unknown output format: {fmt}")
+            rec["rows_out"] = (con.fetchone() or [None])[0] if fmt != "duckdb" else None
+            rec["bytes_written"] = file_size(output_path)
+    finally:
+        con.close()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    inputs = ap.add_mutually_exclusive_group(required=True)
+    inputs.add_argument("--input", help="Path to input airbnb_reviews.csv")
+    inputs.add_argument("--source", action="append", metavar="NAME=PATH",
+                        help="A per-source export instead of --input, e.g. 'App Store=app_store.csv' (repeatable); "
+                             "the exports are read concurrently, each with its SOURCE_COLUMNS mapping")
+    ap.add_argument("--output", required=True, help="Path to save the cleaned dataset")
+    ap.add_argument("--source-columns", metavar="JSON",
+                    help="JSON file of {source: {raw column: export column}} mappings for --source, "
+                         "replacing the default SOURCE_COLUMNS entries; an entry's optional \"ds_format\" "
+                         "is the strptime format of that export's dates (guessed per export otherwise)")
+    ap.add_argument("--format", choices=FORMATS, default="csv",
+                    help="Output format: csv, parquet, or duckdb (table 'reviews')")
+    ap.add_argument("--chunksize", type=int, default=None,
+                    help="Stream the input in batches of this many rows to keep memory bounded")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Only clean rows newer than the last run's ds watermark, plus late or edited rows "
+                         "(requires --format duckdb)")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Clean row partitions (or chunks) in a pool of this many processes "
+                         "(DuckDB threads with --engine duckdb)")
+    ap.add_argument("--engine", choices=["pandas", "duckdb"], default="pandas",
+                    help="pandas (default) or duckdb: one out-of-core SQL query over the raw CSV")
+    ap.add_argument("--terms", action="store_true",
+                    help="Also store per-sentiment term counts (table term_counts, or a .terms.parquet sidecar)")
+    ap.add_argument("--stopwords", action="store_true",
+                    help="Drop the NLTK stopwords of each row's language_final from clean_message (corpus from "
+                         "data/cache/nltk_data or NLTK's data paths; see airbnb_analysis.stopwords)")
+    ap.add_argument("--index", action="store_true",
+                    help="Also store an inverted index of clean_message (table term_index, or a .index.parquet sidecar)")
+    ap.add_argument("--topics", action="store_true",
+                    help="Also store the topic table (tables review_topics and topic_dict, or .topics.parquet and "
+                         ".topic_dict.parquet sidecars)")
+    ap.add_argument("--dedup", action="store_true",
+                    help="Find near-duplicate reviews (MinHash/LSH over clean_message, signatures computed in "
+                         "--workers processes) and add their cluster id as column dup_cluster")
+    ap.add_argument("--partition", action="store_true",
+                    help="Write the Parquet output as a directory partitioned by source, year and month "
+                         "(<output>/source=.../year=.../month=.../), which loaders can prune")
+    ap.add_argument("--replace-partitions", action="store_true",
+                    help="With --partition, only replace the partitions the input has rows for and keep the others")
+    ap.add_argument("--profile", nargs="?", const="", default=None, metavar="REPORT_JSON",
+                    help="Record time, CPU, peak RSS, rows and bytes per stage; JSON report defaults to "
+                         "<output>.profile.json")
+    args = ap.parse_args()
+    if args.incremental and args.format != "duckdb":
+        ap.error("--incremental requires --format duckdb")
+    if args.engine == "duckdb" and (args.incremental or args.chunksize):
+        ap.error("--engine duckdb streams on its own; --incremental and --chunksize are pandas-only")
+    if args.partition and args.format != "parquet":
+        ap.error("--partition requires --format parquet")
+    if args.partition and (args.index or args.topics or args.dedup):
+        ap.error("--index, --topics and --dedup address rows by position in a single-file output; "
+                 "they cannot be combined with --partition")
+    if args.replace_partitions and not args.partition:
+        ap.error("--replace-partitions requires --partition")
+    source_columns = dict(SOURCE_COLUMNS)
+    if args.source_columns:
+        with open(args.source_columns, encoding="utf-8") as f:
+            source_columns.update(json.load(f))
+    if args.source:
+        if args.incremental or args.chunksize:
+            ap.error("--source exports are read whole; --incremental and --chunksize need one merged --input")
+        if any("=" not in s for s in args.source):
+            ap.error("--source takes NAME=PATH")
+        raw_input = dict(s.split("=", 1) for s in args.source)
+        unknown = sorted(set(raw_input) - set(source_columns))
+        if unknown:
+            ap.error(f"no column mapping for source(s) {unknown}; known: {sorted(source_columns)} "
+                     f"(add them with --source-columns)")
+    else:
+        raw_input = args.input
+
+    prof = Profiler(enabled=args.profile is not None)
+    # A partitioned output is first written as one file, then split into partitions;
+    # its term counts are recounted over all partitions at the end
+    output = args.output + ".tmp.parquet" if args.partition else args.output
+    terms = args.terms and not args.partition
+
+    if args.engine == "duckdb":
+        clean_duckdb(raw_input, output, args.format, threads=args.workers if args.workers > 1 else None,
+                     profiler=prof, stopwords=args.stopwords, source_columns=source_columns)
+        if terms:
+            with prof.stage("save_terms"):
+                rebuild_term_counts(output, args.format)
+    elif args.incremental:
+        stats = clean_incremental(args.input, args.output, workers=args.workers, profiler=prof,
+                                  stopwords=args.stopwords)
+        if args.terms:
+            with prof.stage("save_terms"):
+                rebuild_term_counts(args.output, args.format)
+        print(f"[OK] Cleaned {stats['rows_cleaned']} of {stats['rows_in']} rows incrementally")
+    elif args.chunksize:
+        clean_chunked(args.input, output, args.chunksize, args.format, args.workers, terms, prof, args.stopwords)
+    else:
+        # --- Load ---
+        with prof.stage("load", bytes_read=input_size(raw_input)) as st:
+            df = read_sources(raw_input, source_columns) if args.source else read_raw(args.input)
+            st["rows_out"] = len(df)
+        clean_df = clean_frame_parallel(df, args.workers, terms, prof, args.stopwords)
+        if terms:
+            clean_df, term_df = clean_df
+            with prof.stage("save_terms", rows_in=len(term_df)):
+                save_term_counts(term_df, output, args.format)
+
+        # --- Save ---
+        with prof.stage("save", rows_in=len(clean_df)) as st:
+            save_clean(clean_df, output, args.format)
+            st["bytes_written"] = file_size(output)
+    if args.partition:
+        with prof.stage("partition") as st:
+            st["rows_out"] = write_partitioned(output, args.output, args.replace_partitions)
+            st["bytes_written"] = file_size(args.output)
+        if args.terms:
+            with prof.stage("save_terms"):
+                rebuild_term_counts(args.output, args.format)
+    # Whatever addresses rows of an earlier output by position is stale now; rebuilt below if asked for
+    drop_index(args.output, args.format)
+    drop_topics(args.output, args.format)
+    if args.dedup:
+        with prof.stage("dedup") as st, \
+                ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else nullcontext() as ex:
+            imap = partial(_imap_ordered, ex, window=2 * args.workers) if ex else None
+            st["rows_out"] = rebuild_duplicates(args.output, args.format, imap=imap, threads=1 if ex else None)
+    if args.index:
+        with prof.stage("save_index") as st:
+            st["rows_out"] = rebuild_index(args.output, args.format)
+    if args.topics:
+        with prof.stage("save_topics") as st:
+            st["rows_out"] = rebuild_topics(args.output, args.format)
     print(f"[OK] Saved cleaned dataset to: {args.output}")
 
+    if prof.enabled:
+        report_path = args.profile or args.output + ".profile.json"
+        prof.save(report_path)
+        print(f"[PROFILE] {prof.summary()}")
+        print(f"[PROFILE] Report saved to: {report_path}")
+
 
 if __name__ == "__main__":
     main()
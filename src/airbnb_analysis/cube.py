@@ -0,0 +1,103 @@
+"""
+cube.py — Pre-aggregated review cube for plotting.
+
+One pass over the cleaned reviews builds counts and score/length sums by
+sentiment × source × language × year × month × score. The plot functions render from this
+cube, so figure size and render time do not grow with the number of reviews.
+
+Usage:
+    cube = build_cube(df)                         # from a loaded DataFrame
+    cube = load_cube("data/processed/airbnb_reviews_clean.parquet")   # straight from storage, via DuckDB
+    plots.plot_sentiment_distribution(cube)
+"""
+import numpy as np
+import pandas as pd
+
+from airbnb_analysis.clean import open_output
+
+CUBE_DIMS = ["sentiment", "source", "language_final", "year", "month", "score"]
+CUBE_MEASURES = ["count", "score_sum", "len_words_sum", "len_chars_sum"]
+
+
+def is_cube(df: pd.DataFrame) -> bool:
+    """True if df is a cube from build_cube/load_cube rather than row-level reviews."""
+    return "count" in df.columns and "message" not in df.columns
+
+
+def build_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate cleaned reviews into the cube (one groupby; missing dimension values are kept as NaN)."""
+    dims = [c for c in CUBE_DIMS if c in df.columns]
+    frame = df[dims].copy()
+    frame["count"] = 1
+    # Sums are widened so compact (float32 / Int32) columns cannot lose precision or overflow
+    frame["score_sum"] = df["score"].astype("float64") if "score" in df.columns else np.nan
+    frame["len_words_sum"] = df["message_len_words"].astype("Int64") if "message_len_words" in df.columns else 0
+    frame["len_chars_sum"] = df["message_len_chars"].astype("Int64") if "message_len_chars" in df.columns else 0
+    return frame.groupby(dims, dropna=False, observed=True, sort=False, as_index=False)[CUBE_MEASURES].sum()
+
+
+CUBE_SQL = """
+SELECT sentiment, source, language_final, year, month, score,
+       count(*) AS count, sum(score) AS score_sum,
+       sum(message_len_words) AS len_words_sum, sum(message_len_chars) AS len_chars_sum
+FROM {source}
+GROUP BY ALL
+"""
+
+
+def load_cube(path: str, table: str = "reviews", duplicates: bool = True) -> pd.DataFrame:
+    """Build the cube inside DuckDB from a cleaned .parquet/.duckdb/.csv file or `--partition` directory,
+    without loading the rows (duplicates=False: one review per near-duplicate cluster, see open_output)."""
+    con, source = open_output(path, table, duplicates)
+    try:
+        return con.execute(CUBE_SQL.format(source=source)).df()
+    finally:
+        con.close()
+
+
+def as_cube(df: pd.DataFrame) -> pd.DataFrame:
+    return df if is_cube(df) else build_cube(df)
+
+
+def counts_by(cube: pd.DataFrame, dims, dropna: bool = True) -> pd.DataFrame:
+    """Review counts by some of the cube dimensions."""
+    dims = [dims] if isinstance(dims, str) else list(dims)
+    return cube.groupby(dims, dropna=dropna, observed=True, as_index=False)["count"].sum()
+
+
+def mean_score_by(cube: pd.DataFrame, dim: str) -> pd.DataFrame:
+    """Average score by one dimension, ignoring reviews without a score."""
+    scored = cube[cube["score"].notna()]
+    g = scored.groupby(dim, observed=True)[["score_sum", "count"]].sum()
+    return (g["score_sum"] / g["count"]).rename("score").reset_index()
+
+
+def weighted_box_stats(values, counts) -> dict:
+    """Box-plot statistics of values repeated counts times: linearly interpolated quartiles, fences at the
+    furthest values within 1.5 IQR, and the distinct values outside them as outliers."""
+    values = np.asarray(values, dtype=float)
+    counts = np.asarray(counts, dtype=float)
+    keep = ~np.isnan(values) & (counts > 0)
+    order = np.argsort(values[keep])
+    v, c = values[keep][order], counts[keep][order]
+    if len(v) == 0:
+        return {}
+    cum = np.cumsum(c)
+    n = cum[-1]
+
+    def quantile(p):
+        pos = p * (n - 1)
+        lo = v[np.searchsorted(cum, np.floor(pos), side="right")]
+        hi = v[np.searchsorted(cum, np.ceil(pos), side="right")]
+        return lo + (hi - lo) * (pos - np.floor(pos))
+
+    q1, median, q3 = quantile(0.25), quantile(0.5), quantile(0.75)
+    iqr = q3 - q1
+    inside = (v >= q1 - 1.5 * iqr) & (v <= q3 + 1.5 * iqr)
+    return {
+        "q1": q1, "median": median, "q3": q3,
+        "lowerfence": v[inside].min(), "upperfence": v[inside].max(),
+        "mean": float((v * c).sum() / n), "n": int(n),
+        "notchspan": 1.57 * iqr / np.sqrt(n),
+        "outliers": v[~inside],
+    }
@@ -0,0 +1,236 @@
+"""
+data.py — Load the cleaned reviews dataset written by clean.py.
+
+Parquet and DuckDB outputs come back already typed (dates, small ints, topic/subtopic lists);
+the CSV path re-parses dates and topics and is kept for older exports. Columns are loaded
+with the declared clean.CLEAN_DTYPES (categorical source/sentiment/language_final, smallest
+nullable ints, float32 score) unless compact=False.
+
+A directory written by `clean.py --partition` (source=/year=/month= subdirectories) loads like
+a Parquet file; the sources / start / end filters of load_clean then pick the partitions to
+open from the directory names, so a one-source, one-quarter query reads only those files.
+"""
+import glob
+import os
+import weakref
+from typing import List, Optional
+from urllib.parse import unquote
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from airbnb_analysis.clean import (
+    CATEGORY_COLS, CLEAN_DTYPES, HIVE_NULL, KEEP_COLS, LIST_COLS, PARTITION_COLS, apply_schema, parquet_source,
+    parse_maybe_list, term_counts_path_for,
+)
+from airbnb_analysis.sql import sql_str
+from airbnb_analysis.topics import TOPIC_DICT_TABLE, TOPICS_TABLE, topic_dict_path_for, topics_path_for
+
+
+# ---------- Dataset fingerprints ----------
+# id(frame) -> fingerprint of the file it was loaded from, for frames returned by load_clean
+_sources = {}
+
+
+def file_fingerprint(path: str) -> str:
+    """Cheap identity of a file: absolute path, mtime and size (for a partitioned directory: its
+    number of files, their latest mtime and total size)."""
+    if os.path.isdir(path):
+        stats = [os.stat(f) for f in glob.glob(os.path.join(path, "**", "*.parquet"), recursive=True)]
+        mtime = max((st.st_mtime_ns for st in stats), default=0)
+        return f"{os.path.abspath(path)}:{len(stats)}:{mtime}:{sum(st.st_size for st in stats)}"
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def _remember_source(df: pd.DataFrame, path: str, filters: Optional[dict] = None) -> pd.DataFrame:
+    key = id(df)
+    active = {k: v for k, v in (filters or {}).items() if v is not None}
+    _sources[key] = file_fingerprint(path) + (f":{active}" if active else "")
+    weakref.finalize(df, _sources.pop, key, None)
+    return df
+
+
+def _has_lists(col: pd.Series) -> bool:
+    first = col.dropna().head(1)
+    return len(first) > 0 and isinstance(first.iloc[0], (list, tuple, np.ndarray))
+
+
+def _row_hashes(frame: pd.DataFrame) -> np.ndarray:
+    """Hashes of frame's rows with their positions; list columns are exploded and each value is
+    hashed with its row position instead of being turned into text row by row."""
+    frame = frame.reset_index(drop=True)
+    lists = [c for c in frame.columns if _has_lists(frame[c])]
+    plain = frame.drop(columns=lists)
+    hashes = [pd.util.hash_pandas_object(plain, index=True).to_numpy()] if len(plain.columns) else []
+    hashes += [pd.util.hash_pandas_object(frame[c].explode(), index=True).to_numpy() for c in lists]
+    return np.concatenate(hashes) if hashes else np.zeros(0, dtype="uint64")
+
+
+def has_file_fingerprint(data) -> bool:
+    """True if dataset_fingerprint of data is cheap: a path, or a frame returned unchanged by load_clean."""
+    return isinstance(data, (str, os.PathLike)) or id(data) in _sources
+
+
+def dataset_fingerprint(data, columns=None) -> str:
+    """Identity of a dataset, used as a cache key.
+
+    Paths and frames returned unchanged by load_clean use the file's path/mtime/size (modifying
+    such a frame in place is not detected); any other frame is hashed by content over the given
+    columns that it has (default: all columns).
+    """
+    if has_file_fingerprint(data):
+        return file_fingerprint(data) if isinstance(data, (str, os.PathLike)) else _sources[id(data)]
+    names = [c for c in (columns or data.columns) if c in data.columns]
+    h = _row_hashes(data[names])
+    return (f"{len(data)}:{','.join(map(str, names))}:{int(h.sum(dtype='uint64')):016x}:"
+            f"{int((h * 0x9E3779B97F4A7C15).sum(dtype='uint64')):016x}")
+
+
+# ---------- Partitions ----------
+def _partition_values(path: str, root: str) -> dict:
+    """{source, year, month} of a partition file, from its directory names (None for HIVE_NULL)."""
+    values = {}
+    for part in os.path.relpath(os.path.dirname(path), root).split(os.sep):
+        key, _, value = part.partition("=")
+        values[key] = None if value == HIVE_NULL else unquote(value)
+    return values
+
+
+def partition_files(path: str, sources: Optional[List[str]] = None, start=None, end=None) -> List[str]:
+    """Files of a partitioned output whose partition can hold reviews of the given sources and
+    ds range (None means no filter); reviews without a date are only in unfiltered ranges."""
+    first = pd.Timestamp(start).to_period("M") if start is not None else None
+    last = pd.Timestamp(end).to_period("M") if end is not None else None
+    files = []
+    for f in sorted(glob.glob(os.path.join(path, *(f"{c}=*" for c in PARTITION_COLS), "*.parquet"))):
+        values = _partition_values(f, path)
+        if sources and values["source"] not in sources:
+            continue
+        if first is not None or last is not None:
+            if values["year"] is None or values["month"] is None:
+                continue
+            month = pd.Period(year=int(values["year"]), month=int(values["month"]), freq="M")
+            if (first is not None and month < first) or (last is not None and month > last):
+                continue
+        files.append(f)
+    return files
+
+
+def _filter_sql(sources: Optional[List[str]], start, end) -> str:
+    conds = []
+    if sources:
+        conds.append("CAST(source AS VARCHAR) IN (" + ", ".join(map(sql_str, sources)) + ")")
+    if start is not None:
+        conds.append(f"CAST(ds AS DATE) >= DATE '{pd.Timestamp(start).date()}'")
+    if end is not None:
+        conds.append(f"CAST(ds AS DATE) <= DATE '{pd.Timestamp(end).date()}'")
+    return " WHERE " + " AND ".join(conds) if conds else ""
+
+
+# ---------- Loaders ----------
+def _read_compact(con: duckdb.DuckDBPyConnection, source: str) -> pd.DataFrame:
+    """SELECT * FROM source with CATEGORY_COLS cast to ENUMs, which arrive in pandas as categoricals
+    (no per-row Python strings), then the remaining CLEAN_DTYPES applied."""
+    columns = [r[0] for r in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()]
+    exprs = []
+    for c in columns:
+        values = []
+        if c in CATEGORY_COLS:
+            values = [v for (v,) in con.execute(
+                f'SELECT DISTINCT "{c}" FROM {source} WHERE "{c}" IS NOT NULL ORDER BY 1').fetchall()]
+        if values:
+            enum = "ENUM(" + ", ".join(map(sql_str, values)) + ")"
+            exprs.append(f'CAST("{c}" AS {enum}) AS "{c}"')
+        else:
+            exprs.append(f'"{c}"')
+    return apply_schema(con.execute(f"SELECT {', '.join(exprs)} FROM {source}").df())
+
+
+def load_clean(path: str, table: str = "reviews", compact: bool = True, columns=None,
+               sources: Optional[List[str]] = None, start=None, end=None) -> pd.DataFrame:
+    """Load a cleaned dataset from .parquet, .duckdb or .csv, picked by file extension, or from a
+    directory written by `clean.py --partition`.
+
+    compact=False keeps the dtypes the reader infers (plain strings, int64 from CSV); columns
+    loads only those columns. sources and the inclusive ds range start / end keep only matching
+    reviews; for a partitioned directory they also decide which partition files are opened.
+    """
+    filters = dict(sources=sources, start=start, end=end)
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".parquet", ".duckdb", ".db") or os.path.isdir(path):
+        db = ext in (".duckdb", ".db")
+        con = duckdb.connect(path, read_only=True) if db else duckdb.connect()
+        if db or not os.path.isdir(path):
+            source = table if db else parquet_source(path)
+        else:
+            files = partition_files(path, sources, start, end)
+            # No partition matches: keep the schema of the whole dataset, without rows
+            source = parquet_source(path, files) if files else f"(SELECT * FROM {parquet_source(path)} LIMIT 0)"
+        names = [r[0] for r in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()]
+        # Partition columns come back last; put them back in their place
+        names = [c for c in KEEP_COLS if c in names] + [c for c in names if c not in KEEP_COLS]
+        wanted = [c for c in names if columns is None or c in columns]
+        source = "(SELECT " + ", ".join(f'"{c}"' for c in wanted) + f" FROM {source}{_filter_sql(sources, start, end)})"
+        try:
+            df = _read_compact(con, source) if compact else con.execute(f"SELECT * FROM {source}").df()
+        finally:
+            con.close()
+        return _remember_source(df, path, filters)
+
+    dtypes = {c: t for c, t in CLEAN_DTYPES.items() if compact}
+    filtered = bool(sources) or start is not None or end is not None
+    usecols = columns
+    if columns is not None and filtered:
+        usecols = list(dict.fromkeys([*columns, "source", "ds"]))
+    dates = ["ds"] if usecols is None or "ds" in usecols else []
+    df = pd.read_csv(path, parse_dates=dates, dtype=dtypes, usecols=usecols)
+    if filtered:
+        keep = np.ones(len(df), dtype=bool)
+        if sources:
+            keep &= df["source"].isin(sources).to_numpy()
+        day = df["ds"].dt.normalize()
+        if start is not None:
+            keep &= (day >= pd.Timestamp(start).normalize()).to_numpy()
+        if end is not None:
+            keep &= (day <= pd.Timestamp(end).normalize()).to_numpy()
+        df = df.loc[keep, [c for c in df.columns if columns is None or c in columns]].reset_index(drop=True)
+    for col in LIST_COLS:
+        if col in df.columns:
+            df[col] = parse_maybe_list(df[col])
+    return _remember_source(df, path, filters)
+
+
+def load_term_counts(path: str, table: str = "term_counts") -> pd.DataFrame:
+    """Load the per-sentiment term counts stored by `clean.py --terms` for the cleaned dataset at path."""
+    if os.path.splitext(path)[1].lower() in (".duckdb", ".db"):
+        con = duckdb.connect(path, read_only=True)
+        try:
+            return con.table(table).df()
+        finally:
+            con.close()
+    return duckdb.read_parquet(term_counts_path_for(path)).df()
+
+
+def load_topics(path: str, table: str = TOPICS_TABLE, dict_table: str = TOPIC_DICT_TABLE) -> pd.DataFrame:
+    """Load the topic table stored by `clean.py --topics` for the cleaned dataset at path.
+
+    One row per (review row_id, topic or subtopic); topic and subtopic are categoricals whose
+    codes are the stored topic_id / subtopic_id over the dictionary's names.
+    """
+    if os.path.splitext(path)[1].lower() in (".duckdb", ".db"):
+        con = duckdb.connect(path, read_only=True)
+        try:
+            ids, names = con.table(table).df(), con.table(dict_table).df()
+        finally:
+            con.close()
+    else:
+        ids = duckdb.read_parquet(topics_path_for(path)).df()
+        names = duckdb.read_parquet(topic_dict_path_for(path)).df()
+    out = pd.DataFrame({"row_id": ids["row_id"].to_numpy(dtype=np.int32)})
+    for kind in ("topic", "subtopic"):
+        categories = names.loc[names["kind"] == kind].sort_values("id")["name"].to_numpy(dtype=object)
+        codes = ids[f"{kind}_id"].fillna(-1).to_numpy(dtype=np.int16)
+        out[kind] = pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype="str"))
+    return out
@@ -0,0 +1,226 @@
+"""
+dedup.py — Near-duplicate reviews (cross-posted complaints, copy-pasted spam) by MinHash and LSH.
+
+`clean.py --dedup` gives every review of a near-duplicate cluster a dup_cluster column: the
+row_id of the cluster's first review (NULL for reviews without duplicates). Each clean_message
+of at least MIN_WORDS words is reduced to NUM_PERM MinHash values of its SHINGLE_WORDS-word
+shingles, in batches (spread over a process pool by clean.py --workers); the signature is cut
+into BANDS bands and reviews that agree on a whole band are candidates. Buckets are found by
+sorting each band's keys, so the whole pass is near-linear, never pairwise. Reviews whose
+shingle sets have Jaccard similarity s become candidates with probability 1 - (1 - s^r)^BANDS
+(r = NUM_PERM / BANDS): about 0.9 at s = 0.85 and 0.03 at s = 0.5. Candidates are joined
+transitively into clusters.
+
+Row ids are row positions in the cleaned output (see index.rows_sql); clean.py rewrites the
+output with the column, keeping the row order. A rewrite without --dedup has no dup_cluster: a
+full one writes a new output, and an incremental update (which moves rows) drops the column.
+
+Usage:
+    keep = drop_duplicates(load_clean("data/processed/airbnb_reviews_clean.parquet"))
+    ReviewStore("data/processed/airbnb_reviews_clean.parquet").cube(duplicates=False)
+"""
+import os
+from functools import partial
+from typing import Callable, Optional
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+try:
+    from airbnb_analysis.index import CHUNK_ROWS, rows_sql
+    from airbnb_analysis.sql import sql_str
+except ImportError:  # imported by clean.py run as a plain script
+    from index import CHUNK_ROWS, rows_sql
+    from sql import sql_str
+
+NUM_PERM = 64
+BANDS = 8
+SHINGLE_WORDS = 2
+MIN_WORDS = 5
+SEED = 42
+BLOCK_SHINGLES = 1 << 14
+
+# Universal hash family h -> (a * h + b) >> 32 over 64-bit words, one (a, b) per permutation
+_rng = np.random.default_rng(SEED)
+PERM_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+PERM_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+
+# 64-bit hash of every word of the batch's messages of at least {min_words} words; unnest keeps each
+# message's words together and in order (and DuckDB keeps the batch's row order)
+WORDS_SQL = """
+SELECT row_id, hash(unnest(words)) AS h
+FROM (SELECT row_id, string_split(clean_message, ' ') AS words FROM batch)
+WHERE len(words) >= {min_words}
+"""
+
+
+# ---------- Signatures ----------
+def shingle_hashes(row_id: np.ndarray, h: np.ndarray, k: int = SHINGLE_WORDS):
+    """(row id, hash) of every k-word window from word hashes grouped by row, in order; every
+    row needs at least k words."""
+    n = len(h) - k + 1
+    if n <= 0:
+        return row_id[:0], h[:0]
+    out = h[:n].copy()
+    for j in range(1, k):
+        out = out * np.uint64(0x100000001B3) ^ h[j:j + n]
+    same = row_id[:n] == row_id[k - 1:]
+    return row_id[:n][same], out[same]
+
+
+def minhash_signatures(row_id: np.ndarray, h: np.ndarray, num_perm: int = NUM_PERM):
+    """(row ids, uint32 signatures of shape (rows, num_perm)) from shingle hashes grouped by row.
+
+    Rows are hashed in blocks of about BLOCK_SHINGLES shingles, all permutations per block, so
+    the intermediate values stay in cache.
+    """
+    if len(row_id) == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, num_perm), dtype=np.uint32)
+    heads = np.flatnonzero(np.r_[True, row_id[1:] != row_id[:-1]])
+    sig = np.empty((len(heads), num_perm), dtype=np.uint32)
+    cuts = np.r_[np.unique(np.searchsorted(heads, np.arange(0, len(h), BLOCK_SHINGLES))), len(heads)]
+    for lo, hi in zip(cuts[:-1], cuts[1:]):
+        start, stop = heads[lo], heads[hi] if hi < len(heads) else len(h)
+        block, tmp = h[start:stop], np.empty(stop - start, dtype=np.uint64)
+        offsets = heads[lo:hi] - start
+        for j in range(num_perm):
+            np.multiply(block, PERM_A[j], out=tmp)
+            np.add(tmp, PERM_B[j], out=tmp)
+            np.right_shift(tmp, np.uint64(32), out=tmp)
+            sig[lo:hi, j] = np.minimum.reduceat(tmp, offsets)
+    return row_id[heads], sig
+
+
+def band_keys(sig: np.ndarray, bands: int = BANDS) -> np.ndarray:
+    """64-bit key of each band of each signature, shape (bands, rows)."""
+    parts = sig.reshape(len(sig), bands, -1).transpose(1, 0, 2).astype(np.uint64)
+    keys = np.full(parts.shape[:2], 0xCBF29CE484222325, dtype=np.uint64)
+    for k in range(parts.shape[2]):
+        keys = (keys ^ parts[:, :, k]) * np.uint64(0x100000001B3)
+        keys ^= keys >> np.uint64(29)
+    return keys
+
+
+def minhash_batch(batch: pd.DataFrame, shingle_words: int = SHINGLE_WORDS, min_words: int = MIN_WORDS,
+                  threads: Optional[int] = None):
+    """(row ids, band keys) of the messages of a batch with row_id and clean_message columns;
+    messages shorter than min_words words are left out. threads caps DuckDB's threads (1 in a
+    process pool)."""
+    con = duckdb.connect()
+    try:
+        con.execute("SET enable_progress_bar = false")
+        if threads:
+            con.execute(f"SET threads = {int(threads)}")
+        con.register("batch", batch[["row_id", "clean_message"]])
+        words = con.execute(WORDS_SQL.format(min_words=max(int(min_words), shingle_words))).fetchnumpy()
+    finally:
+        con.close()
+    row_id, h = shingle_hashes(np.asarray(words["row_id"], dtype=np.int64),
+                               np.asarray(words["h"], dtype=np.uint64), shingle_words)
+    ids, sig = minhash_signatures(row_id, h)
+    return ids, band_keys(sig)
+
+
+# ---------- Clusters ----------
+def _bucket_edges(keys: np.ndarray):
+    """(first, other) index pairs linking every member of a bucket of equal keys to one of them."""
+    order = np.argsort(keys)
+    k = keys[order]
+    head = np.r_[True, k[1:] != k[:-1]]
+    first = order[head][np.cumsum(head) - 1]
+    linked = first != order
+    return first[linked], order[linked]
+
+
+def _link(parent: np.ndarray, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Union-find by hooking and pointer jumping: merge the components of the pairs (u, v) into
+    parent, which maps every node to the smallest node of its component (and is returned)."""
+    while True:
+        pu, pv = parent[u], parent[v]
+        differ = pu != pv
+        if not differ.any():
+            return parent
+        np.minimum.at(parent, np.maximum(pu, pv)[differ], np.minimum(pu, pv)[differ])
+        while True:
+            jumped = parent[parent]
+            if (jumped == parent).all():
+                break
+            parent = jumped
+
+
+def find_clusters(ids: np.ndarray, keys: np.ndarray) -> pd.DataFrame:
+    """(row_id, dup_cluster) of the rows sharing a band key with another row, directly or
+    transitively; dup_cluster is the smallest row_id of the cluster. ids must be sorted and keys
+    have shape (bands, rows). Bands are merged one at a time, so only one band's pairs are held."""
+    parent = np.arange(len(ids))
+    linked = np.zeros(len(ids), dtype=bool)
+    for band in keys:
+        u, v = _bucket_edges(band)
+        linked[u] = linked[v] = True
+        parent = _link(parent, u, v)
+    return pd.DataFrame({"row_id": ids[linked], "dup_cluster": ids[parent[linked]]})
+
+
+def drop_duplicates(df: pd.DataFrame) -> pd.DataFrame:
+    """df with only the first review (in df's order) of each dup_cluster; unchanged without the column."""
+    if "dup_cluster" not in df.columns:
+        return df
+    dup = df["dup_cluster"]
+    return df[dup.isna().to_numpy() | ~dup.duplicated().to_numpy()]
+
+
+# ---------- Output ----------
+def _batches(con: duckdb.DuckDBPyConnection, chunk_rows: int):
+    """DataFrames of about chunk_rows rows of the pending result of con."""
+    while True:
+        batch = con.fetch_df_chunk(max(chunk_rows // 2048, 1))
+        if batch.empty:
+            return
+        yield batch
+
+
+def rebuild_duplicates(output_path: str, fmt: str, table: str = "reviews", chunk_rows: int = CHUNK_ROWS,
+                       imap: Optional[Callable] = None, threads: Optional[int] = None) -> int:
+    """Find the near-duplicate clusters of an existing cleaned output and rewrite it, rows in the
+    same order, with a dup_cluster column (replacing an older one).
+
+    imap is a map-like function used for the per-batch signatures, e.g. a windowed process pool
+    map (default: map), and threads the DuckDB threads of each batch (see minhash_batch). Returns
+    the number of reviews in a cluster.
+    """
+    con = duckdb.connect(output_path if fmt == "duckdb" else ":memory:")
+    try:
+        con.execute("SET enable_progress_bar = false")
+        rows = rows_sql(output_path, table)
+        con.execute(f"SELECT row_id, clean_message FROM ({rows})")
+        parts = list((imap or map)(partial(minhash_batch, threads=threads), _batches(con, chunk_rows)))
+        ids = np.concatenate([p[0] for p in parts]) if parts else np.empty(0, dtype=np.int64)
+        keys = np.concatenate([p[1] for p in parts], axis=1) if parts else np.empty((BANDS, 0), dtype=np.uint64)
+        del parts
+        clusters = find_clusters(ids, keys)
+
+        n = con.execute(f"SELECT count(*) FROM ({rows})").fetchone()[0]
+        dup = np.zeros(n, dtype=np.int32)
+        dup[clusters["row_id"].to_numpy()] = clusters["dup_cluster"].to_numpy()
+        missing = np.ones(n, dtype=bool)
+        missing[clusters["row_id"].to_numpy()] = False
+        con.register("dups", pd.DataFrame({"dup_cluster": pd.arrays.IntegerArray(dup, missing)}))
+
+        # The column is attached by position, so the output streams through in its own order
+        source = {"duckdb": table, "parquet": "read_parquet({p})", "csv": "read_csv({p}, all_varchar = true)"}[fmt]
+        source = source.format(p=sql_str(output_path))
+        columns = [r[0] for r in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()]
+        keep = "r.* EXCLUDE (dup_cluster)" if "dup_cluster" in columns else "r.*"
+        select = f"SELECT {keep}, d.dup_cluster FROM {source} r POSITIONAL JOIN dups d"
+        if fmt == "duckdb":
+            con.execute(f"CREATE OR REPLACE TABLE {table} AS {select}")
+        else:
+            # CSV text (dates, scores, lists) is copied as is
+            tmp = output_path + ".tmp"
+            options = "FORMAT csv, HEADER" if fmt == "csv" else "FORMAT parquet"
+            con.execute(f"COPY ({select}) TO {sql_str(tmp)} ({options})")
+            os.replace(tmp, output_path)
+        return len(clusters)
+    finally:
+        con.close()
@@ -0,0 +1,229 @@
+"""
+figcache.py — Memoization for the plots.plot_* functions.
+
+A figure is keyed on the dataset fingerprint (data.dataset_fingerprint: path/mtime/size for
+files and frames from load_clean, otherwise a content hash of the columns the plot reads) plus the
+function name, a hash of the package's source (so editing plots.py or the cube, rollups, box-stat
+and term modules it draws from invalidates the store) and its other arguments. Hits come from an
+in-memory LRU, then from an optional on-disk store (Plotly figures as JSON, matplotlib figures as
+PNG) that is evicted oldest-first by total size. A plot whose content hash took longer than
+drawing it is no longer cached for content-hashed frames.
+
+Usage:
+    figcache.configure(cache_dir="data/cache/figures", max_bytes=200_000_000)   # enable the disk store
+    fig = plots.plot_top_languages(df, top_n=10)    # cached on the second call
+    figcache.clear(disk=True)
+"""
+import functools
+import glob
+import hashlib
+import io
+import os
+import pickle
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import pandas as pd
+
+from airbnb_analysis.data import dataset_fingerprint, has_file_fingerprint
+
+MEMORY_SIZE = 64
+MAX_BYTES = 200_000_000
+
+_memory: "OrderedDict[str, object]" = OrderedDict()
+# Plot functions whose content hash took longer than the plot itself
+_uncached = set()
+_settings = {
+    "enabled": True,
+    "memory_size": MEMORY_SIZE,
+    "cache_dir": os.environ.get("AIRBNB_FIGURE_CACHE") or None,
+    "max_bytes": MAX_BYTES,
+}
+
+
+def configure(cache_dir: Optional[str] = None, max_bytes: int = MAX_BYTES, memory_size: int = MEMORY_SIZE,
+              enabled: bool = True):
+    """Set the on-disk store (None = memory only), its size limit and the in-memory LRU size."""
+    _settings.update(enabled=enabled, cache_dir=cache_dir, max_bytes=max_bytes, memory_size=memory_size)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    while len(_memory) > memory_size:
+        _memory.popitem(last=False)
+
+
+def clear(disk: bool = False):
+    """Empty the in-memory LRU, and the on-disk store too if disk."""
+    _memory.clear()
+    _uncached.clear()
+    if disk and _settings["cache_dir"] and os.path.isdir(_settings["cache_dir"]):
+        for name, _, _ in _disk_entries():
+            os.remove(os.path.join(_settings["cache_dir"], name))
+
+
+# ---------- Keys ----------
+def _arg_key(value, columns=None) -> str:
+    if isinstance(value, pd.DataFrame):
+        return "data:" + dataset_fingerprint(value, columns)
+    return repr(value)
+
+
+@functools.lru_cache(maxsize=None)
+def source_hash(module: str) -> str:
+    """sha1 of the source files of a module's package (its directory), "" if it has none."""
+    path = getattr(sys.modules.get(module), "__file__", None)
+    if not path or not os.path.exists(path):
+        return ""
+    h = hashlib.sha1()
+    for f in sorted(glob.glob(os.path.join(os.path.dirname(path), "*.py"))):
+        with open(f, "rb") as fh:
+            h.update(os.path.basename(f).encode("utf-8") + b"\0" + fh.read())
+    return h.hexdigest()
+
+
+def figure_key(fn, args, kwargs) -> str:
+    """sha1 of the function name, its package's source hash, the dataset fingerprint(s) over the
+    columns the function reads and the other arguments."""
+    columns = getattr(fn, "columns", None)
+    parts = [f"{fn.__module__}.{fn.__qualname__}", source_hash(fn.__module__)]
+    parts += [_arg_key(a, columns) for a in args]
+    parts += [f"{k}={_arg_key(v, columns)}" for k, v in sorted(kwargs.items())]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+# ---------- Figure (de)serialization ----------
+def _is_plotly(fig) -> bool:
+    return hasattr(fig, "to_plotly_json")
+
+
+def _freeze(fig):
+    """What the in-memory LRU keeps: Plotly figures as they are, matplotlib figures pickled, so
+    closing or drawing on a returned figure cannot touch the cached one."""
+    return fig if _is_plotly(fig) else pickle.dumps(fig)
+
+
+def _thaw(frozen):
+    """A new figure from a _freeze result."""
+    if isinstance(frozen, bytes):
+        return pickle.loads(frozen)
+    import plotly.graph_objects as go
+    return go.Figure(frozen)
+
+
+def _dump(fig):
+    """(extension, bytes) for the disk store, or None if the figure type is not supported."""
+    if _is_plotly(fig):
+        return ".json", fig.to_json().encode("utf-8")
+    if hasattr(fig, "savefig"):
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", facecolor=fig.get_facecolor(), dpi=fig.dpi)
+        return ".png", buf.getvalue()
+    return None
+
+
+def _load(path: str):
+    if path.endswith(".json"):
+        import plotly.io as pio
+        with open(path, encoding="utf-8") as f:
+            return pio.from_json(f.read())
+    import matplotlib.image as mpimg
+    import matplotlib.pyplot as plt
+    img = mpimg.imread(path)
+    dpi = 100
+    fig = plt.figure(figsize=(img.shape[1] / dpi, img.shape[0] / dpi), dpi=dpi)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.imshow(img)
+    ax.axis("off")
+    return fig
+
+
+# ---------- Disk store ----------
+def _disk_entries():
+    """(name, size, last use) of the files in the disk store."""
+    entries = []
+    with os.scandir(_settings["cache_dir"]) as it:
+        for e in it:
+            if e.is_file() and e.name.endswith((".json", ".png")):
+                st = e.stat()
+                entries.append((e.name, st.st_size, st.st_mtime))
+    return entries
+
+
+def _disk_get(key: str):
+    d = _settings["cache_dir"]
+    if not d:
+        return None
+    for ext in (".json", ".png"):
+        path = os.path.join(d, key + ext)
+        if os.path.exists(path):
+            try:
+                fig = _load(path)
+            except Exception:
+                return None
+            os.utime(path)
+            return fig
+    return None
+
+
+def _disk_put(key: str, fig):
+    d = _settings["cache_dir"]
+    dumped = _dump(fig) if d else None
+    if dumped is None:
+        return
+    ext, data = dumped
+    os.makedirs(d, exist_ok=True)
+    tmp = os.path.join(d, f".{key}{ext}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, os.path.join(d, key + ext))
+    _evict()
+
+
+def _evict():
+    """Remove least recently used files until the store fits in max_bytes."""
+    entries = sorted(_disk_entries(), key=lambda e: e[2])
+    total = sum(size for _, size, _ in entries)
+    for name, size, _ in entries:
+        if total <= _settings["max_bytes"]:
+            break
+        os.remove(os.path.join(_settings["cache_dir"], name))
+        total -= size
+
+
+# ---------- Decorator ----------
+def cached_figure(fn=None, *, columns=None):
+    """Memoize a plot function on (dataset fingerprint, arguments); columns are the only ones of a
+    content-hashed frame that the function reads (default: all)."""
+    if fn is None:
+        return functools.partial(cached_figure, columns=columns)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _settings["enabled"]:
+            return fn(*args, **kwargs)
+        hashed = any(isinstance(a, pd.DataFrame) and not has_file_fingerprint(a)
+                     for a in (*args, *kwargs.values()))
+        if hashed and wrapper in _uncached:
+            return fn(*args, **kwargs)
+        start = time.perf_counter()
+        key = figure_key(wrapper, args, kwargs)
+        hash_seconds = time.perf_counter() - start
+        if key in _memory:
+            _memory.move_to_end(key)
+            return _thaw(_memory[key])
+        fig = _disk_get(key)
+        if fig is None:
+            start = time.perf_counter()
+            fig = fn(*args, **kwargs)
+            if hashed and hash_seconds > time.perf_counter() - start:
+                _uncached.add(wrapper)
+            if fig is None:
+                return None
+            _disk_put(key, fig)
+        _memory[key] = _freeze(fig)
+        while len(_memory) > _settings["memory_size"]:
+            _memory.popitem(last=False)
+        return _thaw(fig) if _is_plotly(fig) else fig
+    wrapper.columns = columns
+    return wrapper
@@ -0,0 +1,330 @@
+"""
+index.py — Inverted index over clean_message for keyword drill-down.
+
+`clean.py --index` stores, next to the cleaned data, the sorted ids of the rows whose
+clean_message contains each term, delta- and varint-encoded per chunk of CHUNK_ROWS rows.
+Sentiment and source values get posting lists too, so a filtered lookup is a few sorted-array
+intersections instead of a str.contains scan over every message.
+
+Row ids are row positions in the cleaned output, i.e. the order load_clean returns rows in, so an
+index only fits the output it was built from: every clean.py run drops the stored index after
+writing the output (full rewrite or incremental update) and builds a new one only with --index.
+
+Usage:
+    index = ReviewIndex("data/processed/airbnb_reviews_clean.parquet")
+    ids = index.lookup(["refund", "support"], sentiments=["negative"])     # rows with both terms
+    ids = index.lookup(["refund", "booking"], mode="or", sources=["Trustpilot"])
+    index.counts(["refund"], by="sentiment")
+    index.reviews(ids[:50])                                                # the matching rows
+"""
+import os
+from collections import OrderedDict
+from typing import List, Optional
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+try:
+    from airbnb_analysis.sql import sql_str
+except ImportError:  # imported by clean.py run as a plain script
+    from sql import sql_str
+
+CHUNK_ROWS = 1 << 20
+INDEX_TABLE = "term_index"
+CACHE_SIZE = 64
+FACETS = ["sentiment", "source"]
+INDEX_COLUMNS = ["field", "value", "start", "n", "postings"]
+REVIEW_COLUMNS = ["ds", "source", "sentiment", "score", "message"]
+
+# (field, value, row_id) for every distinct term of a chunk's clean_message and every facet value
+PAIRS_SQL = """
+CREATE TEMP TABLE pairs AS
+SELECT DISTINCT 'term' AS field, term AS value, row_id
+FROM (SELECT row_id, unnest(string_split(clean_message, ' ')) AS term FROM chunk)
+WHERE term <> ''
+UNION ALL
+SELECT 'sentiment', CAST(sentiment AS VARCHAR), row_id FROM chunk WHERE sentiment IS NOT NULL
+UNION ALL
+SELECT 'source', CAST(source AS VARCHAR), row_id FROM chunk WHERE source IS NOT NULL
+"""
+# Pairs come back as (integer key, row_id): fetching one Python string per pair costs far more than the join
+KEYS_SQL = """
+CREATE TEMP TABLE keys AS
+SELECT row_number() OVER (ORDER BY field, value) - 1 AS key, field, value
+FROM (SELECT DISTINCT field, value FROM pairs)
+"""
+
+
+def index_path_for(output_path: str) -> str:
+    return os.path.splitext(output_path)[0] + ".index.parquet"
+
+
+def rows_sql(path: str, table: str = "reviews") -> str:
+    """SELECT of a cleaned output with its row_id column (the position load_clean returns the row at)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        return f"SELECT file_row_number AS row_id, * EXCLUDE (file_row_number) " \
+               f"FROM read_parquet({sql_str(path)}, file_row_number = true)"
+    # DuckDB rowids keep gaps after deletes, so number the rows in scan order instead
+    source = table if ext in (".duckdb", ".db") else f"read_csv({sql_str(path)})"
+    return f"SELECT row_number() OVER () - 1 AS row_id, * FROM {source}"
+
+
+# ---------- Encoding ----------
+def _varint(values: np.ndarray):
+    """LEB128 bytes of non-negative ints (7 bits per byte, high bit = more bytes follow), and the
+    end offset of each value in them."""
+    v = values.astype(np.uint64)
+    nbytes = np.ones(len(v), dtype=np.int64)
+    for k in range(1, 10):
+        nbytes += v >= np.uint64(1 << (7 * k))
+    ends = np.cumsum(nbytes)
+    starts = ends - nbytes
+    out = np.empty(int(ends[-1]) if len(v) else 0, dtype=np.uint8)
+    for k in range(int(nbytes.max()) if len(v) else 0):
+        m = nbytes > k
+        low = (v[m] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        out[starts[m] + k] = low.astype(np.uint8) | np.where(nbytes[m] > k + 1, 0x80, 0).astype(np.uint8)
+    return out, ends
+
+
+def encode_postings(ids: np.ndarray, start: int = 0) -> bytes:
+    """Sorted row ids (all >= start) as varint deltas from start."""
+    ids = np.asarray(ids, dtype=np.int64)
+    out, _ = _varint(np.diff(ids, prepend=start))
+    return out.tobytes()
+
+
+def decode_postings(blob: bytes, start: int = 0) -> np.ndarray:
+    """Inverse of encode_postings: the sorted row ids."""
+    b = np.frombuffer(blob, dtype=np.uint8)
+    if len(b) == 0:
+        return np.empty(0, dtype=np.int64)
+    last = b < 0x80
+    first = np.flatnonzero(np.r_[True, last[:-1]])
+    value_of = np.cumsum(last) - last
+    shift = (np.arange(len(b)) - first[value_of]) * 7
+    deltas = np.add.reduceat((b & 0x7F).astype(np.int64) << shift, first)
+    return start + np.cumsum(deltas)
+
+
+def _encode_groups(keys: dict, key: np.ndarray, row_id: np.ndarray, start: int) -> pd.DataFrame:
+    """One encoded posting list per key run of pairs sorted by key, row_id; keys holds the
+    field and value arrays indexed by key."""
+    if len(row_id) == 0:
+        return pd.DataFrame({c: [] for c in INDEX_COLUMNS})
+    heads = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    deltas = np.diff(row_id, prepend=start)
+    deltas[heads] = row_id[heads] - start
+    out, ends = _varint(deltas)
+    byte_ends = ends[np.r_[heads[1:], len(row_id)] - 1]
+    return pd.DataFrame({
+        "field": np.asarray(keys["field"], dtype=object)[key[heads]],
+        "value": np.asarray(keys["value"], dtype=object)[key[heads]],
+        "start": start,
+        "n": np.diff(np.r_[heads, len(row_id)]),
+        "postings": [p.tobytes() for p in np.split(out, byte_ends[:-1])],
+    })
+
+
+# ---------- Build ----------
+def build_index_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Posting lists of one chunk with row_id, sentiment, source and clean_message columns."""
+    con = duckdb.connect()
+    try:
+        con.execute("SET enable_progress_bar = false")
+        con.register("chunk", chunk[["row_id", "sentiment", "source", "clean_message"]])
+        con.execute(PAIRS_SQL)
+        con.execute(KEYS_SQL)
+        keys = con.execute("SELECT field, value FROM keys ORDER BY key").fetchnumpy()
+        pairs = con.execute("SELECT key, row_id FROM pairs JOIN keys USING (field, value) ORDER BY key, row_id").fetchnumpy()
+    finally:
+        con.close()
+    start = int(chunk["row_id"].min()) if len(chunk) else 0
+    return _encode_groups(keys, np.asarray(pairs["key"], dtype=np.int64), np.asarray(pairs["row_id"], dtype=np.int64),
+                          start)
+
+
+def build_index(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """Index of a cleaned frame; row ids are positions in df."""
+    parts = []
+    for start in range(0, len(df), chunk_rows):
+        chunk = df[["sentiment", "source", "clean_message"]].iloc[start:start + chunk_rows]
+        parts.append(build_index_chunk(chunk.assign(row_id=np.arange(start, start + len(chunk)))))
+    return _sorted(parts)
+
+
+def _sorted(parts: List[pd.DataFrame]) -> pd.DataFrame:
+    if not parts:
+        return pd.DataFrame({c: [] for c in INDEX_COLUMNS})
+    return pd.concat(parts, ignore_index=True).sort_values(["field", "value", "start"], ignore_index=True)
+
+
+def save_index(index: pd.DataFrame, output_path: str, fmt: str = "csv", table: str = INDEX_TABLE):
+    """Store the index next to the cleaned data: a table in the DuckDB output, else a .index.parquet sidecar.
+
+    Rows are sorted by field and value, so a lookup reads only the row groups holding its terms.
+    """
+    con = duckdb.connect(output_path if fmt == "duckdb" else ":memory:")
+    try:
+        con.register("idx", index)
+        select = "SELECT CAST(field AS VARCHAR) AS field, CAST(value AS VARCHAR) AS value, " \
+                 "CAST(start AS BIGINT) AS start, CAST(n AS INTEGER) AS n, CAST(postings AS BLOB) AS postings " \
+                 "FROM idx ORDER BY field, value, start"
+        if fmt == "duckdb":
+            con.execute(f"CREATE OR REPLACE TABLE {table} AS {select}")
+        else:
+            con.execute(f"COPY ({select}) TO {sql_str(index_path_for(output_path))} "
+                        f"(FORMAT parquet, ROW_GROUP_SIZE 16384)")
+    finally:
+        con.close()
+
+
+def rebuild_index(output_path: str, fmt: str, table: str = "reviews", chunk_rows: int = CHUNK_ROWS) -> int:
+    """Build and store the index of an existing cleaned output, streaming it chunk by chunk.
+
+    Returns the number of posting lists.
+    """
+    con = duckdb.connect(output_path if fmt == "duckdb" else ":memory:", read_only=fmt == "duckdb")
+    parts = []
+    try:
+        con.execute("SET enable_progress_bar = false")
+        con.execute(f"SELECT row_id, sentiment, source, clean_message FROM ({rows_sql(output_path, table)})")
+        while True:
+            chunk = con.fetch_df_chunk(max(chunk_rows // 2048, 1))
+            if chunk.empty:
+                break
+            parts.append(build_index_chunk(chunk))
+    finally:
+        con.close()
+    index = _sorted(parts)
+    save_index(index, output_path, fmt)
+    return len(index)
+
+
+def drop_index(output_path: str, fmt: str, table: str = INDEX_TABLE):
+    """Remove the stored index of a cleaned output (its row ids no longer match once the output is rewritten)."""
+    if fmt == "duckdb":
+        if os.path.exists(output_path):
+            con = duckdb.connect(output_path)
+            try:
+                con.execute(f"DROP TABLE IF EXISTS {table}")
+            finally:
+                con.close()
+    elif os.path.exists(index_path_for(output_path)):
+        os.remove(index_path_for(output_path))
+
+
+# ---------- Query ----------
+def _intersect(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Ids in both sorted unique arrays; binary search of the shorter in the longer."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) == 0:
+        return a
+    pos = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return a[b[pos] == a]
+
+
+def _union(lists: List[np.ndarray]) -> np.ndarray:
+    """Sorted unique ids in any of the sorted arrays."""
+    if len(lists) <= 1:
+        return lists[0] if lists else np.empty(0, dtype=np.int64)
+    ids = np.sort(np.concatenate(lists))
+    return ids[np.r_[True, ids[1:] != ids[:-1]]]
+
+
+def normalize_terms(terms) -> List[str]:
+    """Query terms tokenized like clean_message ("Refund!" -> "refund"), duplicates dropped."""
+    from airbnb_analysis.clean import clean_text
+
+    terms = [terms] if isinstance(terms, str) else list(terms)
+    return list(dict.fromkeys(t for term in terms for t in clean_text(term).split()))
+
+
+class ReviewIndex:
+    """Term and sentiment/source posting lists of a cleaned dataset, written by `clean.py --index`."""
+
+    def __init__(self, path: str, table: str = "reviews", index_table: str = INDEX_TABLE):
+        self.path, self.table = path, table
+        self.con = duckdb.connect()
+        self.con.execute("SET enable_progress_bar = false")
+        if os.path.splitext(path)[1].lower() in (".duckdb", ".db"):
+            self.con.execute(f"ATTACH {sql_str(path)} AS src (READ_ONLY)")
+            self.con.execute("USE src")
+            self.con.execute(f"CREATE TEMP VIEW idx AS SELECT * FROM {index_table}")
+        else:
+            self.con.execute(f"CREATE TEMP VIEW idx AS SELECT * FROM read_parquet({sql_str(index_path_for(path))})")
+        self._cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+
+    def close(self):
+        self.con.close()
+
+    def _postings(self, field: str, values: List[str]) -> dict:
+        """{value: sorted row ids} for values of field (facet values compared case-insensitively)."""
+        keys = [(field, v.lower() if field in FACETS else v) for v in values]
+        missing = [v for (_, v) in keys if (field, v) not in self._cache]
+        if missing:
+            col = "lower(value)" if field in FACETS else "value"
+            marks = ", ".join("?" * len(missing))
+            rows = self.con.execute(
+                f"SELECT {col} AS key, start, postings FROM idx WHERE field = ? AND {col} IN ({marks}) "
+                f"ORDER BY key, start", [field] + missing).fetchall()
+            found = {v: [] for v in missing}
+            for key, start, blob in rows:
+                found[key].append(decode_postings(blob, start))
+            for v, parts in found.items():
+                self._cache[(field, v)] = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        for key in keys:
+            self._cache.move_to_end(key)
+        out = {v: self._cache[(field, k)] for v, (_, k) in zip(values, keys)}
+        while len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return out
+
+    def values(self, field: str) -> List[str]:
+        """Distinct values of a facet (sentiment/source), for filter widgets."""
+        rows = self.con.execute("SELECT DISTINCT value FROM idx WHERE field = ? ORDER BY 1", [field]).fetchall()
+        return [r[0] for r in rows]
+
+    def lookup(self, terms, mode: str = "and", sentiments: Optional[List[str]] = None,
+               sources: Optional[List[str]] = None) -> np.ndarray:
+        """Sorted row ids containing all (mode="and") or any (mode="or") of terms, within the
+        given sentiments and sources (None or empty: no filter)."""
+        if mode not in ("and", "or"):
+            raise ValueError(f"mode must be 'and' or 'or', got {mode!r}")
+        terms = normalize_terms(terms)
+        lists = list(self._postings("term", terms).values())
+        if not lists:
+            return np.empty(0, dtype=np.int64)
+        if mode == "or":
+            ids = _union(lists)
+        else:
+            ids = lists[0]
+            for other in sorted(lists[1:], key=len):
+                ids = _intersect(ids, other)
+        for field, values in (("sentiment", sentiments), ("source", sources)):
+            if values and len(ids):
+                ids = _union([_intersect(ids, other) for other in self._postings(field, list(values)).values()])
+        return ids
+
+    def counts(self, terms, mode: str = "and", by: str = "sentiment", **filters) -> pd.DataFrame:
+        """Number of matching rows per value of a facet (sentiment or source)."""
+        ids = self.lookup(terms, mode, **filters)
+        values = self.values(by)
+        lists = self._postings(by, values)
+        return pd.DataFrame({by: values, "count": [len(_intersect(ids, lists[v])) for v in values]})
+
+    def reviews(self, ids, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """The cleaned rows with the given ids, in id order (reads only the requested columns)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        cols = ", ".join(f'"{c}"' for c in (columns or REVIEW_COLUMNS))
+        source = rows_sql(self.path, self.table)
+        self.con.register("wanted", pd.DataFrame({"row_id": ids}))
+        try:
+            return self.con.execute(
+                f"SELECT row_id, {cols} FROM ({source}) WHERE row_id IN (SELECT row_id FROM wanted) ORDER BY row_id"
+            ).df()
+        finally:
+            self.con.unregister("wanted")
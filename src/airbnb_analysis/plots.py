@@ -1,22 +1,36 @@
-import pandas as pd 
-import matplotlib.pyplot as plt 
-import seaborn as sns
-import plotly.express as px
-import matplotlib.pyplot as plt
-import matplotlib as mpl
-from matplotlib.colors import to_rgb
-from wordcloud import WordCloud
-import numpy as np
-
-sns.set(style="whitegrid")
+from airbnb_analysis.boxstats import BOX_COLUMNS, box_stats, is_box_stats
+from airbnb_analysis.cube import as_cube, counts_by, mean_score_by, weighted_box_stats
+from airbnb_analysis.figcache import cached_figure
+from airbnb_analysis.rollups import ROLLUP_COLUMNS, build_rollups, is_rollups, query_rollups
+from airbnb_analysis.terms import term_frequencies
+
+# Plotting libraries are imported inside each function on first use, so importing this module stays
+# cheap and has no side effects; call apply_style() for the seaborn theme on matplotlib figures.
+# Every plot_* is memoized by airbnb_analysis.figcache on the dataset fingerprint (over the columns it
+# reads, cube/rollup/box-stat columns included) and arguments.
+# Plots 1 and 3 take either the cleaned reviews or a cube from airbnb_analysis.cube (built here if needed),
+# plot 2 the reviews or rollups from airbnb_analysis.rollups: only aggregated counts reach the figure,
+# whatever the number of reviews.
+
+def apply_style(style="whitegrid"):
+    """Apply the seaborn theme to matplotlib (used to happen on import)."""
+    import seaborn as sns
+    sns.set_theme(style=style)
+
 
 # ========== 1. Sentiment & Rating Distribution ==========
+@cached_figure(columns=["sentiment", "count"])
 def plot_sentiment_distribution(df):
+    import plotly.express as px
+
+    counts = counts_by(as_cube(df), "sentiment").sort_values("count", ascending=False)
     fig = px.histogram(
-        df,
+        counts,
         x="sentiment",
+        y="count",
+        histfunc="sum",
         color="sentiment",
-        category_orders={"sentiment": df["sentiment"].value_counts().index},
+        category_orders={"sentiment": list(counts["sentiment"])},
         color_discrete_sequence=px.colors.qualitative.Set2,
         title="Sentiment Distribution",
     )
@@ -29,15 +43,29 @@ def plot_sentiment_distribution(df):
     )
     return fig
 
+@cached_figure(columns=["score", "count"])
 def plot_score_distribution(df):
+    import plotly.express as px
+
+    counts = counts_by(as_cube(df), "score")
     fig = px.histogram(
-        df,
+        counts,
         x="score",
+        y="count",
+        histfunc="sum",
         nbins=5,
         marginal="box",
         color_discrete_sequence=["#636EFA"],
         title="Score Distribution",
     )
+    # The marginal box is drawn from exact statistics of the score counts instead of every review
+    stats = weighted_box_stats(counts["score"], counts["count"])
+    if stats:
+        fig.data[1].update(
+            x=[list(stats["outliers"])], q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+            lowerfence=[stats["lowerfence"]], upperfence=[stats["upperfence"]],
+            notchspan=[stats["notchspan"]], boxpoints="outliers",
+        )
 
     fig.update_layout(
         xaxis_title="Review Score",
@@ -51,12 +79,14 @@ def plot_score_distribution(df):
 
 
 # ========== 2. Sentiment Over Time ==========
-def plot_sentiment_over_time(df):
-    monthly_counts = (
-        df.groupby(["month", "sentiment"])
-        .size()
-        .reset_index(name="count")
-    )
+@cached_figure(columns=["ds", "sentiment", "source", "score"] + ROLLUP_COLUMNS)
+def plot_sentiment_over_time(df, granularity="month", start=None, end=None):
+    import plotly.express as px
+
+    # df is the cleaned reviews or rollups from airbnb_analysis.rollups; periods are real ds buckets
+    # (day, ISO week, month or quarter), so different years are no longer merged
+    rollups = df if is_rollups(df) else build_rollups(df)
+    counts = query_rollups(rollups, granularity, start=start, end=end, by="sentiment")
 
     sentiment_colors = {
         "positive": "#2ECC71",
@@ -65,8 +95,8 @@ def plot_sentiment_over_time(df):
     }
 
     fig = px.line(
-        monthly_counts,
-        x="month",
+        counts,
+        x="period",
         y="count",
         color="sentiment",
         color_discrete_map=sentiment_colors,
@@ -75,7 +105,7 @@ def plot_sentiment_over_time(df):
     )
 
     fig.update_layout(
-        xaxis_title="Month",
+        xaxis_title=granularity.capitalize(),
         yaxis_title="Number of Reviews",
         legend_title="Sentiment",
         height=500,
@@ -86,10 +116,16 @@ def plot_sentiment_over_time(df):
     return fig
 
 # ========== 3. Language and Source ==========
+@cached_figure(columns=["language_final", "count"])
 def plot_top_languages(df, top_n=10):
-    lang_counts = df["language_final"].dropna().value_counts().head(top_n)
-    lang_df = lang_counts.reset_index()
-    lang_df.columns = ["language", "count"]
+    import plotly.express as px
+
+    lang_df = (
+        counts_by(as_cube(df), "language_final")
+        .sort_values("count", ascending=False)
+        .head(top_n)
+        .rename(columns={"language_final": "language"})
+    )
 
     fig = px.bar(
         lang_df,
@@ -112,12 +148,14 @@ def plot_top_languages(df, top_n=10):
 
     return fig
 
+@cached_figure(columns=["source", "score", "score_sum", "count"])
 def plot_avg_score_by_source(df):
+    import plotly.express as px
+
     avg_scores = (
-        df.groupby("source")["score"]
-        .mean()
-        .sort_values(ascending=False)
-        .reset_index()
+        mean_score_by(as_cube(df), "source")
+        .sort_values("score", ascending=False)
+        .reset_index(drop=True)
     )
 
     fig = px.bar(
@@ -143,16 +181,31 @@ def plot_avg_score_by_source(df):
 
 
 # ========== 4. Text Behavior ==========
-def plot_review_length_vs_score(df):
+@cached_figure(columns=["message_len_words", "score"] + BOX_COLUMNS)
+def plot_review_length_vs_score(df, max_outliers=50, seed=42):
+    import plotly.express as px
+
+    # Accepts the cleaned reviews or precomputed stats from airbnb_analysis.boxstats (load_box_stats):
+    # each box is drawn from its quartiles/fences and a capped, seeded sample of its outliers.
+    if is_box_stats(df):
+        stats = df
+    else:
+        stats = box_stats(df, "message_len_words", "score", max_outliers=max_outliers, seed=seed)
     fig = px.box(
-        df,
+        stats,
         x="score",
-        y="message_len_words",
+        y="median",
         color="score",
+        labels={"median": "message_len_words"},
         color_discrete_sequence=px.colors.sequential.Sunset,
         title="Review Length vs. Score",
         points="outliers",
     )
+    for trace, row in zip(fig.data, stats.itertuples(index=False)):
+        trace.update(
+            x=[row.score], y=[list(row.outliers)], q1=[row.q1], median=[row.median], q3=[row.q3],
+            lowerfence=[row.lowerfence], upperfence=[row.upperfence],
+        )
 
     fig.update_layout(
         xaxis_title="Score",
@@ -166,32 +219,45 @@ def plot_review_length_vs_score(df):
     return fig
 
 
+def resolve_theme(theme="auto"):
+    """"dark" or "light": theme itself, or for "auto" the OS setting (darkdetect) or else the
+    brightness of matplotlib's figure.facecolor."""
+    if theme != "auto":
+        return "dark" if theme == "dark" else "light"
+    import matplotlib as mpl
+    from matplotlib.colors import to_rgb
+
+    dark = None
+    try:
+        import darkdetect
+        dark = bool(darkdetect.isDark())
+    except Exception:
+        pass
+    if dark is None:
+        r, g, b = to_rgb(mpl.rcParams.get("figure.facecolor", "white"))
+        dark = (0.2126*r + 0.7152*g + 0.0722*b) < 0.5
+    return "dark" if dark else "light"
+
+
 def plot_sentiment_wordclouds(df, theme="auto"):
-    def _is_dark_from_rc():
-        fc = mpl.rcParams.get("figure.facecolor", "white")
-        r, g, b = to_rgb(fc)
-        return (0.2126*r + 0.7152*g + 0.0722*b) < 0.5
-
-    if theme == "auto":
-        dark = None
-        try:
-            import darkdetect
-            dark = bool(darkdetect.isDark())
-        except Exception:
-            pass
-        if dark is None:
-            dark = _is_dark_from_rc()
-    elif theme == "dark":
-        dark = True
-    else:
-        dark = False
+    # "auto" is resolved before the cache lookup, so a figure drawn for one theme is not reused for the other
+    return _plot_sentiment_wordclouds(df, resolve_theme(theme))
+
 
+@cached_figure(columns=["sentiment", "clean_message", "term", "count"])
+def _plot_sentiment_wordclouds(df, theme):
+    import matplotlib.pyplot as plt
+    from wordcloud import WordCloud
+
+    dark = theme == "dark"
     bg = "#0e1117" if dark else "white"
     title_color = "#e6edf3" if dark else "#0b0f14"
 
+    # df is the cleaned reviews or a term-count table (data.load_term_counts); counts are cached
+    # per dataset and sentiment in airbnb_analysis.terms, so re-rendering does not recount.
     def make_wc(sentiment, cmap):
-        text = " ".join(df.loc[df["sentiment"].str.lower() == sentiment, "clean_message"].dropna())
-        if not text.strip():
+        freqs = term_frequencies(df, sentiment)
+        if not freqs:
             return None
         return WordCloud(
             width=800,
@@ -201,7 +267,7 @@ def plot_sentiment_wordclouds(df, theme="auto"):
             max_words=200,
             random_state=42,
             prefer_horizontal=0.9,
-        ).generate(text)
+        ).generate_from_frequencies(freqs)
 
     wc_pos = make_wc("positive", "Greens" if not dark else "Greens_r")
     wc_neg = make_wc("negative", "Reds" if not dark else "Reds_r")
@@ -220,6 +286,6 @@ def plot_sentiment_wordclouds(df, theme="auto"):
     axes[1].axis("off")
 
     plt.tight_layout()
-    plt.show()
+    return fig
 
 
@@ -0,0 +1,128 @@
+"""
+profiling.py — Lightweight per-stage timing and memory instrumentation.
+
+Usage:
+    prof = Profiler()
+    with prof.stage("load", bytes_read=os.path.getsize(path)) as st:
+        df = pd.read_csv(path)
+        st["rows_out"] = len(df)
+    print(prof.summary())
+    prof.save("profile.json")
+
+Stages with the same name (e.g. one per chunk) are summed. A disabled Profiler hands out a
+throwaway dict, so instrumented code costs next to nothing when profiling is off.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+COUNTERS = ["rows_in", "rows_out", "bytes_read", "bytes_written"]
+
+
+def max_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MB (None where unavailable)."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+def _cpu_time() -> float:
+    # This process plus finished child processes (e.g. a worker pool that has shut down)
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class Profiler:
+    """Collects wall time, CPU time, peak RSS and row/byte counters per named stage."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stages = {}
+        self._started = time.perf_counter()
+
+    def stage(self, name: str, **counters):
+        """Context manager timing one stage; yields a dict where rows_out/bytes_written etc. can be set."""
+        if not self.enabled:
+            return nullcontext({})
+        return self._stage(name, counters)
+
+    @contextmanager
+    def _stage(self, name: str, counters: dict):
+        rec = dict(counters)
+        rss_before = max_rss_mb()
+        wall, cpu = time.perf_counter(), _cpu_time()
+        try:
+            yield rec
+        finally:
+            self._add(name, time.perf_counter() - wall, _cpu_time() - cpu, rss_before, rec)
+
+    def iter(self, name: str, items: Iterable, rows: bool = True, **counters):
+        """Yield from items, timing each next() as stage `name` (e.g. reading CSV chunks).
+
+        counters (e.g. bytes_read) are recorded once, with the first item.
+        """
+        if not self.enabled:
+            yield from items
+            return
+        it = iter(items)
+        while True:
+            with self.stage(name, **counters) as rec:
+                counters = {}
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+                if rows and hasattr(item, "__len__"):
+                    rec["rows_out"] = len(item)
+            yield item
+
+    def _add(self, name: str, wall: float, cpu: float, rss_before: Optional[float], rec: dict):
+        s = self.stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+        s["calls"] += 1
+        s["wall_s"] += wall
+        s["cpu_s"] += cpu
+        rss = max_rss_mb()
+        if rss is not None:
+            s["max_rss_mb"] = rss
+            s["rss_growth_mb"] = s.get("rss_growth_mb", 0.0) + rss - rss_before
+        for k in COUNTERS:
+            if rec.get(k) is not None:
+                s[k] = s.get(k, 0) + int(rec[k])
+
+    def report(self) -> dict:
+        """All stages, in first-run order, plus totals."""
+        stages = [{"stage": name, **{k: round(v, 4) if isinstance(v, float) else v for k, v in s.items()}}
+                  for name, s in self.stages.items()]
+        return {
+            "stages": stages,
+            "total_wall_s": round(time.perf_counter() - self._started, 4),
+            "max_rss_mb": max_rss_mb(),
+        }
+
+    def summary(self) -> str:
+        """One line: wall time per stage, total and peak RSS."""
+        parts = [f"{name} {s['wall_s']:.2f}s" for name, s in self.stages.items()]
+        rss = max_rss_mb()
+        tail = f"total {time.perf_counter() - self._started:.2f}s" + (f", peak RSS {rss:.0f} MB" if rss else "")
+        return " | ".join(parts + [tail])
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+NULL_PROFILER = Profiler(enabled=False)
+
+
+def file_size(path: str) -> Optional[int]:
+    """Size of path in bytes (of all files below it for a directory), or None if it does not exist."""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+    return os.path.getsize(path) if os.path.exists(path) else None
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+render.py — Render every report chart to static files, headless and in parallel.
+
+Usage:
+    PYTHONPATH=src python -m airbnb_analysis.render --input data/processed/airbnb_reviews_clean.parquet \
+        --output reports/charts
+    PYTHONPATH=src python -m airbnb_analysis.render --input ... --output ... --formats html png svg --workers 4
+    PYTHONPATH=src python -m airbnb_analysis.render --input ... --output ... --exclude-duplicates
+
+What it does:
+1) Builds each chart's input in this process, inside DuckDB and without loading the reviews: the
+   review cube (load_cube), time rollups (load_rollups), review-length box statistics
+   (load_box_stats) and per-sentiment term counts (the table from `clean.py --terms` when present);
+   with --exclude-duplicates from one review per near-duplicate cluster (the dup_cluster column of
+   `clean.py --dedup`)
+2) Loads the cleaned rows (load_clean) only for charts that take them
+3) Renders every plots.plot_* in a process pool and writes <chart>.<format> files; workers only
+   receive those aggregates (kilobytes), never a copy of the reviews
+4) Prints per-chart render/write times and saves them to <output>/render_report.json
+
+Plotly PNG/SVG export needs the optional kaleido package; without it those files are reported
+as errors and the other formats are still written.
+"""
+import argparse
+import base64
+import inspect
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import duckdb
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from airbnb_analysis import plots
+from airbnb_analysis.boxstats import load_box_stats
+from airbnb_analysis.clean import TERM_COUNTS_SQL, open_output
+from airbnb_analysis.cube import load_cube
+from airbnb_analysis.data import load_clean, load_term_counts
+from airbnb_analysis.dedup import drop_duplicates
+from airbnb_analysis.profiling import Profiler
+from airbnb_analysis.rollups import load_rollups
+
+FORMATS = ["html", "png", "svg"]
+
+# Which prepared input each plot is rendered from; plots not listed here get the full rows
+CHART_INPUTS = {
+    "plot_sentiment_distribution": "cube",
+    "plot_score_distribution": "cube",
+    "plot_top_languages": "cube",
+    "plot_avg_score_by_source": "cube",
+    "plot_sentiment_over_time": "rollups",
+    "plot_review_length_vs_score": "box_stats",
+    "plot_sentiment_wordclouds": "terms",
+}
+CHART_KWARGS = {
+    "plot_sentiment_wordclouds": {"theme": "light"},
+}
+
+
+def chart_names() -> list:
+    return [name for name, _ in inspect.getmembers(plots, inspect.isfunction) if name.startswith("plot_")]
+
+
+def _load_terms(path: str, duplicates: bool = True):
+    if duplicates:  # the stored term counts include every duplicate
+        try:
+            return load_term_counts(path)  # stored by clean.py --terms
+        except duckdb.Error:
+            pass
+    con, source = open_output(path, duplicates=duplicates)
+    try:
+        return con.execute(TERM_COUNTS_SQL.format(source=source)).df()
+    finally:
+        con.close()
+
+
+def _load_rows(path: str, duplicates: bool = True):
+    df = load_clean(path)
+    return df if duplicates else drop_duplicates(df)
+
+
+def prepare_inputs(path: str, names: list, prof: Profiler, duplicates: bool = True) -> dict:
+    """Build the (small) inputs the requested charts need, in DuckDB; the rows are only loaded for
+    charts that take them.
+
+    duplicates=False drops all but the first review of each near-duplicate cluster.
+    """
+    builders = {
+        "cube": lambda: load_cube(path, duplicates=duplicates),
+        "rollups": lambda: load_rollups(path, duplicates=duplicates),
+        "box_stats": lambda: load_box_stats(path, "message_len_words", "score", approx=False,
+                                            duplicates=duplicates),
+        "terms": lambda: _load_terms(path, duplicates),
+        "rows": lambda: _load_rows(path, duplicates),
+    }
+    inputs = {}
+    for kind in dict.fromkeys(CHART_INPUTS.get(n, "rows") for n in names):
+        with prof.stage(f"prepare_{kind}") as st:
+            inputs[kind] = builders[kind]()
+            st["rows_out"] = len(inputs[kind])
+    return inputs
+
+
+# ---------- Writers ----------
+def _write_plotly(fig, path: str, fmt: str):
+    if fmt == "html":
+        fig.write_html(path, include_plotlyjs="cdn", full_html=True)
+    else:
+        fig.write_image(path, format=fmt)
+
+
+def _write_matplotlib(fig, path: str, fmt: str):
+    if fmt == "html":
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", facecolor=fig.get_facecolor())
+        img = base64.b64encode(buf.getvalue()).decode("ascii")
+        title = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{title}</title></head>\n"
+                    f"<body><img src=\"data:image/png;base64,{img}\" alt=\"{title}\"></body></html>\n")
+    else:
+        fig.savefig(path, format=fmt, facecolor=fig.get_facecolor())
+
+
+def render_chart(name: str, data, kwargs: dict, out_dir: str, formats: list) -> dict:
+    """Render one plot function and write it in every format; runs in a worker process."""
+    rec = {"chart": name, "files": [], "errors": {}}
+    t = time.perf_counter()
+    fig = getattr(plots, name)(data, **kwargs)
+    rec["render_s"] = round(time.perf_counter() - t, 4)
+
+    write = _write_plotly if hasattr(fig, "to_plotly_json") else _write_matplotlib
+    stem = name[len("plot_"):]
+    t = time.perf_counter()
+    for fmt in formats:
+        path = os.path.join(out_dir, f"{stem}.{fmt}")
+        try:
+            write(fig, path, fmt)
+            rec["files"].append(path)
+        except Exception as e:  # e.g. kaleido missing for Plotly PNG/SVG
+            rec["errors"][fmt] = f"{type(e).__name__}: {e}"
+    rec["write_s"] = round(time.perf_counter() - t, 4)
+    if not hasattr(fig, "to_plotly_json"):
+        import matplotlib.pyplot as plt
+        plt.close(fig)
+    return rec
+
+
+def render_all(input_path: str, out_dir: str, formats: list, workers: int = 1, charts=None,
+               prof: Profiler = None, duplicates: bool = True) -> list:
+    """Render the selected (default: all) charts of input_path into out_dir; returns one record per chart."""
+    prof = prof or Profiler()
+    names = charts or chart_names()
+    os.makedirs(out_dir, exist_ok=True)
+    inputs = prepare_inputs(input_path, names, prof, duplicates)
+    tasks = [(n, inputs[CHART_INPUTS.get(n, "rows")], CHART_KWARGS.get(n, {}), out_dir, formats) for n in names]
+    with prof.stage("render", rows_in=len(tasks)):
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                records = list(ex.map(render_chart, *zip(*tasks)))
+        else:
+            records = [render_chart(*t) for t in tasks]
+    return records
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", required=True, help="Cleaned dataset (.parquet, .duckdb or .csv)")
+    ap.add_argument("--output", required=True, help="Directory for the chart files")
+    ap.add_argument("--formats", nargs="+", choices=FORMATS, default=["html"])
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Render charts in this many processes (default: all CPUs)")
+    ap.add_argument("--charts", nargs="+", choices=chart_names(), default=None,
+                    help="Only these plot functions (default: every plots.plot_*)")
+    ap.add_argument("--exclude-duplicates", action="store_true",
+                    help="Count one review per near-duplicate cluster (needs the dup_cluster column of clean.py --dedup)")
+    args = ap.parse_args()
+
+    prof = Profiler()
+    records = render_all(args.input, args.output, args.formats, args.workers, args.charts, prof,
+                         duplicates=not args.exclude_duplicates)
+    for r in records:
+        errors = f"  errors: {', '.join(r['errors'])}" if r["errors"] else ""
+        print(f"     {r['chart']:<32} render {r['render_s']:>7.3f}s  write {r['write_s']:>7.3f}s{errors}")
+
+    report_path = os.path.join(args.output, "render_report.json")
+    with open(report_path, "w") as f:
+        json.dump({"charts": records, **prof.report()}, f, indent=2)
+    print(f"[PROFILE] {prof.summary()}")
+    failed = sum(bool(r["errors"]) for r in records)
+    print(f"[OK] Rendered {len(records)} charts to: {args.output}" + (f" ({failed} with errors)" if failed else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+rollups.py — Materialized review counts over time.
+
+Counts, scored counts and score sums by sentiment × source for every day, ISO week (starting
+Monday), month and quarter of ds, in one long table (grain, period, sentiment, source, ...).
+All measures are additive, so rollups are built once and then updated by adding new rows
+(and subtracting removed ones); a date-range query at any grain never touches raw rows.
+clean.py --incremental keeps a `<table>_rollups` table up to date in the DuckDB output.
+
+Usage:
+    rollups = load_rollups("data/processed/airbnb_reviews_clean.parquet")
+    rollups = update_rollups(rollups, new_rows)
+    weekly = query_rollups(rollups, "week", start="2024-01-01", by="sentiment")
+    plots.plot_sentiment_over_time(rollups, granularity="week")
+"""
+from typing import Optional
+
+import duckdb
+import pandas as pd
+
+GRAINS = ["day", "week", "month", "quarter"]
+ROLLUP_DIMS = ["sentiment", "source"]
+ROLLUP_MEASURES = ["count", "scored", "score_sum"]
+ROLLUP_COLUMNS = ["grain", "period"] + ROLLUP_DIMS + ROLLUP_MEASURES
+
+ROLLUP_SQL = """
+SELECT grain,
+       CAST(CASE grain WHEN 'day' THEN CAST(ds AS DATE) ELSE date_trunc(grain, CAST(ds AS DATE)) END AS DATE)
+           AS period,
+       CAST(sentiment AS VARCHAR) AS sentiment, CAST(source AS VARCHAR) AS source,
+       CAST(count(*) AS BIGINT) AS count, CAST(count(score) AS BIGINT) AS scored,
+       CAST(coalesce(sum(score), 0) AS DOUBLE) AS score_sum
+FROM {source} CROSS JOIN (SELECT unnest(['day', 'week', 'month', 'quarter']) AS grain)
+WHERE ds IS NOT NULL
+GROUP BY ALL
+"""
+
+# Add (sign = 1) or subtract (sign = -1) the rollups of the rows in {delta} to the table {table}
+APPLY_ROLLUP_SQL = """
+CREATE OR REPLACE TABLE {table} AS
+SELECT grain, period, sentiment, source,
+       CAST(sum(count) AS BIGINT) AS count, CAST(sum(scored) AS BIGINT) AS scored,
+       CAST(sum(score_sum) AS DOUBLE) AS score_sum
+FROM (
+    SELECT * FROM {table}
+    UNION ALL
+    SELECT grain, period, sentiment, source, {sign} * count, {sign} * scored, {sign} * score_sum
+    FROM ({delta})
+)
+GROUP BY ALL
+HAVING sum(count) <> 0
+ORDER BY grain, period, sentiment, source
+"""
+
+
+def rollup_table_for(table: str) -> str:
+    return f"{table}_rollups"
+
+
+def is_rollups(df: pd.DataFrame) -> bool:
+    return "grain" in df.columns and "period" in df.columns
+
+
+def _sorted(rollups: pd.DataFrame) -> pd.DataFrame:
+    return rollups.sort_values(["grain", "period"] + ROLLUP_DIMS, ignore_index=True, na_position="last")
+
+
+def build_rollups(df: pd.DataFrame) -> pd.DataFrame:
+    """Rollups of cleaned reviews (one DuckDB pass over ds, sentiment, source and score)."""
+    cols = ["ds", "sentiment", "source", "score"]
+    frame = df.reindex(columns=cols)
+    frame["ds"] = pd.to_datetime(frame["ds"], errors="coerce")
+    frame["score"] = pd.to_numeric(frame["score"], errors="coerce")
+    con = duckdb.connect()
+    try:
+        con.register("frame", frame)
+        out = con.execute(ROLLUP_SQL.format(source="frame")).df()
+    finally:
+        con.close()
+    out["period"] = pd.to_datetime(out["period"])
+    return _sorted(out[ROLLUP_COLUMNS])
+
+
+def load_rollups(path: str, table: str = "reviews", duplicates: bool = True) -> pd.DataFrame:
+    """Rollups for a cleaned .parquet/.duckdb/.csv file or `--partition` directory: the stored table if
+    clean.py wrote one, else built in DuckDB (always with duplicates=False, see clean.open_output)."""
+    from airbnb_analysis.clean import open_output  # clean.py imports this module
+
+    con, source = open_output(path, table, duplicates)
+    try:
+        stored = duplicates and con.execute(
+            "SELECT count(*) FROM duckdb_tables() WHERE database_name = 'src' AND table_name = ?",
+            [rollup_table_for(table)],
+        ).fetchone()[0]
+        sql = f"SELECT * FROM src.{rollup_table_for(table)}" if stored else ROLLUP_SQL.format(source=source)
+        out = con.execute(sql).df()
+    finally:
+        con.close()
+    out["period"] = pd.to_datetime(out["period"])
+    return _sorted(out[ROLLUP_COLUMNS])
+
+
+def update_rollups(rollups: pd.DataFrame, added: Optional[pd.DataFrame] = None,
+                   removed: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Rollups after adding the cleaned rows in added and subtracting those in removed."""
+    parts = [rollups]
+    if added is not None and len(added):
+        parts.append(build_rollups(added))
+    if removed is not None and len(removed):
+        gone = build_rollups(removed)
+        gone[ROLLUP_MEASURES] = -gone[ROLLUP_MEASURES]
+        parts.append(gone)
+    out = pd.concat(parts, ignore_index=True).groupby(
+        ["grain", "period"] + ROLLUP_DIMS, dropna=False, as_index=False
+    )[ROLLUP_MEASURES].sum()
+    return _sorted(out[out["count"] != 0])
+
+
+def apply_rollups(con: duckdb.DuckDBPyConnection, rows_sql: str, table: str = "reviews", sign: int = 1):
+    """Add (or, with sign=-1, subtract) the rows selected by rows_sql to the stored rollups of table."""
+    name = rollup_table_for(table)
+    con.execute(f"CREATE TABLE IF NOT EXISTS {name} AS {ROLLUP_SQL.format(source=table)} LIMIT 0")
+    con.execute(APPLY_ROLLUP_SQL.format(table=name, sign=int(sign), delta=ROLLUP_SQL.format(source=f"({rows_sql})")))
+
+
+def query_rollups(rollups: pd.DataFrame, grain: str = "month", start=None, end=None, by="sentiment") -> pd.DataFrame:
+    """Counts and average score per period at one grain, for periods starting in [start, end], by some dimensions."""
+    if grain not in GRAINS:
+        raise ValueError(f"grain must be one of {GRAINS}, got {grain!r}")
+    by = [by] if isinstance(by, str) else list(by or [])
+    r = rollups[rollups["grain"] == grain]
+    if start is not None:
+        r = r[r["period"] >= pd.Timestamp(start)]
+    if end is not None:
+        r = r[r["period"] <= pd.Timestamp(end)]
+    out = r.groupby(["period"] + by, as_index=False)[ROLLUP_MEASURES].sum()
+    out["score"] = out["score_sum"] / out["scored"].where(out["scored"] > 0)
+    return out.sort_values(["period"] + by, ignore_index=True)
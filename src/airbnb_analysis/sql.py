@@ -0,0 +1,11 @@
+"""
+sql.py — Helpers for writing DuckDB SQL text, shared by the cleaning, loading and index modules.
+
+Usage:
+    con.execute(f"SELECT * FROM read_parquet({sql_str(path)})")
+"""
+
+
+def sql_str(s) -> str:
+    """s as a single-quoted SQL string literal (embedded quotes doubled)."""
+    return "'" + str(s).replace("'", "''") + "'"
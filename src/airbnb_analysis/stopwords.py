@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+stopwords.py — Per-language stopword sets from the NLTK stopwords corpus, for clean.py --stopwords.
+
+Sets are keyed by language_final code ("en", "es", ...). The corpus is read from NLTK_DATA_DIR
+(data/cache/nltk_data under the repository root, or $AIRBNB_NLTK_DATA) or NLTK's usual data paths and never from the
+network, so cleaning runs offline once the corpus is there.
+
+Usage:
+    PYTHONPATH=src python -m airbnb_analysis.stopwords          # download the corpus into data/cache/nltk_data
+    sets = stopword_sets()                                      # {"en": frozenset({...}), "es": ...}
+"""
+import argparse
+import os
+import unicodedata
+from functools import lru_cache
+from typing import Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+NLTK_DATA_DIR = os.environ.get("AIRBNB_NLTK_DATA") or os.path.join(ROOT, "data", "cache", "nltk_data")
+
+# language_final code -> file of the NLTK stopwords corpus
+LANGUAGES = {
+    "ar": "arabic", "az": "azerbaijani", "da": "danish", "de": "german", "el": "greek", "en": "english",
+    "es": "spanish", "fi": "finnish", "fr": "french", "hu": "hungarian", "id": "indonesian", "it": "italian",
+    "kk": "kazakh", "ne": "nepali", "nl": "dutch", "no": "norwegian", "pt": "portuguese", "ro": "romanian",
+    "ru": "russian", "sl": "slovene", "sv": "swedish", "tg": "tajik", "tr": "turkish",
+}
+
+
+def _corpus_root(data_dir: str):
+    import nltk
+
+    data_dir = os.path.abspath(data_dir)
+    if data_dir not in nltk.data.path:
+        nltk.data.path.insert(0, data_dir)  # NLTK only reads corpora under its data paths
+    try:
+        return nltk.data.find("corpora/stopwords")
+    except LookupError:
+        raise LookupError(
+            f"NLTK stopwords corpus not found in {data_dir} or {nltk.data.path}; "
+            f"run `python -m airbnb_analysis.stopwords` once with network access"
+        ) from None
+
+
+@lru_cache(maxsize=None)
+def stopword_sets(data_dir: str = NLTK_DATA_DIR) -> Dict[str, frozenset]:
+    """{language code: lowercase NFC stopwords} for every LANGUAGES entry the corpus has."""
+    from nltk.corpus.reader import WordListCorpusReader
+
+    reader = WordListCorpusReader(_corpus_root(data_dir), r"(?!README).*")
+    available = set(reader.fileids())
+    return {
+        code: frozenset(unicodedata.normalize("NFC", w.strip()).lower() for w in reader.words(name) if w.strip())
+        for code, name in LANGUAGES.items() if name in available
+    }
+
+
+def download(data_dir: str = NLTK_DATA_DIR) -> str:
+    """Fetch the NLTK stopwords corpus into data_dir (the only step that needs the network)."""
+    import nltk
+
+    os.makedirs(data_dir, exist_ok=True)
+    if not nltk.download("stopwords", download_dir=data_dir, quiet=True):
+        raise RuntimeError(f"Could not download the NLTK stopwords corpus into {data_dir}")
+    stopword_sets.cache_clear()
+    return data_dir
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dir", default=NLTK_DATA_DIR, help="Directory to store the corpus in")
+    args = ap.parse_args()
+    download(args.dir)
+    sets = stopword_sets(args.dir)
+    print(f"[OK] Stopwords for {len(sets)} languages ({', '.join(sorted(sets))}) in: {args.dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+store.py — Filterable aggregate queries over a cleaned dataset, for interactive use.
+
+Opening a ReviewStore scans the cleaned .parquet/.duckdb/.csv (or `clean.py --partition` directory)
+once into small in-memory DuckDB tables: counts and score/length sums by day × sentiment × source ×
+language × score, and review-length frequencies by the same keys, each also rolled up by month. A
+filter change (source, language_final, sentiment, date range, and whether near-duplicate reviews
+from `clean.py --dedup` count) then only re-aggregates those tables (whole months from the monthly
+copy, the partial months at either end from the daily one) and returns the cube, rollups and box
+statistics the plots functions take, in milliseconds rather than a scan of every review. Word-cloud
+term counts come the same way from a terms table (term counts by day × sentiment × source × language,
+and by month). Tokenizing every review for it is the one expensive step, so the first term_counts
+call on a dataset persists the terms tables in a <output>.store.duckdb sidecar; later stores (a new
+notebook kernel) attach it read-only, and rebuild it only once the cleaned output changes.
+
+Usage:
+    store = ReviewStore("data/processed/airbnb_reviews_clean.parquet")
+    filters = dict(sources=["Google Play"], start="2024-01-01", end="2024-06-30")
+    plots.plot_sentiment_distribution(store.cube(**filters))
+    plots.plot_sentiment_over_time(store.rollups(**filters), granularity="week")
+    plots.plot_review_length_vs_score(store.length_box_stats(**filters))
+    store.cube(duplicates=False)   # one review per near-duplicate cluster
+"""
+import os
+from typing import List, Optional
+
+import duckdb
+import pandas as pd
+
+from airbnb_analysis.boxstats import box_stats_from_counts
+from airbnb_analysis.clean import open_output
+from airbnb_analysis.data import file_fingerprint
+from airbnb_analysis.index import rows_sql
+from airbnb_analysis.rollups import ROLLUP_COLUMNS
+from airbnb_analysis.sql import sql_str
+
+KEYS = "CAST(ds AS DATE) AS ds, sentiment, source, language_final, score, duplicate"
+
+# Daily tables; *_month copies keyed on the first day of the month answer whole months ~30x faster
+AGG_SQL = f"""
+CREATE TABLE agg AS
+SELECT {KEYS}, count(*) AS count, sum(score) AS score_sum,
+       sum(message_len_words) AS len_words_sum, sum(message_len_chars) AS len_chars_sum
+FROM reviews GROUP BY ALL ORDER BY ds
+"""
+LENGTHS_SQL = f"""
+CREATE TABLE lengths AS
+SELECT {KEYS}, message_len_words, count(*) AS count
+FROM reviews WHERE message_len_words IS NOT NULL GROUP BY ALL ORDER BY ds
+"""
+TERMS_SQL = """
+CREATE TABLE {table} AS
+SELECT CAST(ds AS DATE) AS ds, sentiment, source, language_final, duplicate, term, count(*) AS count
+FROM (SELECT ds, sentiment, source, language_final, duplicate, unnest(string_split(clean_message, ' ')) AS term
+      FROM reviews WHERE sentiment IS NOT NULL)
+WHERE term <> '' GROUP BY ALL ORDER BY ds
+"""
+MONTH_SQL = """
+CREATE TABLE {table}_month AS
+SELECT CAST(date_trunc('month', ds) AS DATE) AS ds, {keys}, {sums}
+FROM {table} GROUP BY ALL ORDER BY ds
+"""
+MONTH_TABLES = {
+    "agg": (["sentiment", "source", "language_final", "score", "duplicate"],
+            ["count", "score_sum", "len_words_sum", "len_chars_sum"]),
+    "lengths": (["sentiment", "source", "language_final", "score", "duplicate", "message_len_words"], ["count"]),
+    "terms": (["sentiment", "source", "language_final", "duplicate", "term"], ["count"]),
+}
+
+CUBE_QUERY = """
+SELECT sentiment, source, language_final, year(ds) AS year, month(ds) AS month, score,
+       sum(count) AS count, sum(score_sum) AS score_sum,
+       sum(len_words_sum) AS len_words_sum, sum(len_chars_sum) AS len_chars_sum
+FROM {source} GROUP BY ALL
+"""
+ROLLUP_QUERY = """
+WITH days AS (
+    SELECT ds, sentiment, source, sum(count) AS count,
+           coalesce(sum(count) FILTER (WHERE score IS NOT NULL), 0) AS scored,
+           coalesce(sum(score_sum), 0) AS score_sum
+    FROM {source} WHERE ds IS NOT NULL GROUP BY ALL
+)
+SELECT grain,
+       CAST(CASE grain WHEN 'day' THEN ds ELSE date_trunc(grain, ds) END AS DATE) AS period,
+       sentiment, source,
+       CAST(sum(count) AS BIGINT) AS count, CAST(sum(scored) AS BIGINT) AS scored,
+       CAST(sum(score_sum) AS DOUBLE) AS score_sum
+FROM days CROSS JOIN (SELECT unnest(['day', 'week', 'month', 'quarter']) AS grain)
+GROUP BY ALL
+ORDER BY grain, period, sentiment, source
+"""
+# Same output as clean.TERM_COUNTS_SQL over the filtered reviews
+TERMS_QUERY = """
+SELECT lower(sentiment) AS sentiment, term, CAST(sum(count) AS INTEGER) AS count
+FROM {source}
+GROUP BY ALL
+ORDER BY sentiment, count DESC, term
+"""
+LENGTHS_QUERY = """
+SELECT score, message_len_words, sum(count) AS count
+FROM {source} WHERE score IS NOT NULL
+GROUP BY ALL
+"""
+
+
+def store_cache_path_for(path: str) -> str:
+    """The sidecar DuckDB file holding a ReviewStore's terms tables for the cleaned output at path."""
+    return os.path.splitext(os.path.normpath(path))[0] + ".store.duckdb"
+
+
+class ReviewStore:
+    """In-memory aggregates of a cleaned dataset, queried per filter combination."""
+
+    def __init__(self, path: str, table: str = "reviews"):
+        self.path = path
+        self.table = table
+        self.con, source = open_output(path, table)
+        self.con.execute("SET enable_progress_bar = false")
+        columns = [r[0] for r in self.con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()]
+        if "dup_cluster" in columns:
+            # duplicate: a review of a near-duplicate cluster other than its first (clean.py --dedup)
+            rows = rows_sql(path, f"src.{table}")
+            self.con.execute(f"CREATE VIEW reviews AS SELECT * EXCLUDE (row_id), "
+                             f"coalesce(dup_cluster <> row_id, false) AS duplicate FROM ({rows})")
+        else:
+            self.con.execute(f"CREATE VIEW reviews AS SELECT *, false AS duplicate FROM {source}")
+        self.con.execute(AGG_SQL)
+        self.con.execute(LENGTHS_SQL)
+        self._month_table("agg")
+        self._month_table("lengths")
+        self._terms = None
+        self._span = [pd.Timestamp(d) if d is not None else None
+                      for d in self.con.execute("SELECT min(ds), max(ds) FROM agg").fetchone()]
+
+    def close(self):
+        self.con.close()
+
+    def _month_table(self, name: str, table: Optional[str] = None):
+        """Create <table>_month (default table: name) from the daily table, with MONTH_TABLES[name]'s keys."""
+        keys, measures = MONTH_TABLES[name]
+        sums = ", ".join(f"sum({m}) AS {m}" for m in measures)
+        self.con.execute(MONTH_SQL.format(table=table or name, keys=", ".join(keys), sums=sums))
+
+    def _terms_table(self) -> str:
+        """Name of the daily terms table (with a _month copy): the persisted sidecar, attached
+        read-only, or in-memory tables if the sidecar cannot be written."""
+        cache = store_cache_path_for(self.path)
+        key = f"{file_fingerprint(self.path)}:{self.table}"
+        if not self._attach_terms(cache, key):
+            tmp = f"{cache}.{os.getpid()}.tmp"
+            try:
+                self.con.execute(f"ATTACH {sql_str(tmp)} AS terms_build")
+                try:
+                    self.con.execute(TERMS_SQL.format(table="terms_build.terms"))
+                    self._month_table("terms", "terms_build.terms")
+                    self.con.execute("CREATE TABLE terms_build.meta AS SELECT ? AS key", [key])
+                finally:
+                    self.con.execute("DETACH terms_build")
+                os.replace(tmp, cache)
+            except (OSError, duckdb.Error):
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                self.con.execute(TERMS_SQL.format(table="terms"))
+                self._month_table("terms")
+                return "terms"
+            if not self._attach_terms(cache, key):
+                raise RuntimeError(f"{cache} was replaced while it was being written")
+        return "terms_cache.terms"
+
+    def _attach_terms(self, cache: str, key: str) -> bool:
+        """Attach the sidecar at cache as terms_cache if it was built for key."""
+        if not os.path.exists(cache):
+            return False
+        try:
+            self.con.execute(f"ATTACH {sql_str(cache)} AS terms_cache (READ_ONLY)")
+        except duckdb.Error:
+            return False
+        try:
+            fresh = self.con.execute("SELECT any_value(key) FROM terms_cache.meta").fetchone()[0] == key
+        except duckdb.Error:
+            fresh = False
+        if not fresh:
+            self.con.execute("DETACH terms_cache")
+        return fresh
+
+    def options(self) -> dict:
+        """Distinct sources, languages and sentiments, and the ds range, for building filter widgets."""
+        def distinct(col):
+            rows = self.con.execute(f"SELECT DISTINCT {col} FROM agg WHERE {col} IS NOT NULL ORDER BY 1").fetchall()
+            return [r[0] for r in rows]
+        start, end = self.con.execute("SELECT min(ds), max(ds) FROM agg").fetchone()
+        return {"sources": distinct("source"), "languages": distinct("language_final"),
+                "sentiments": distinct("sentiment"), "start": start, "end": end}
+
+    @staticmethod
+    def _dims(sources: Optional[List[str]] = None, languages: Optional[List[str]] = None,
+              sentiments: Optional[List[str]] = None, duplicates: bool = True):
+        """Conditions and parameters for the dimension filters; None (or empty) means no filter.
+
+        duplicates=False keeps only the first review of each near-duplicate cluster.
+        """
+        conds, params = [], []
+        for col, values in (("source", sources), ("language_final", languages), ("sentiment", sentiments)):
+            if values:
+                conds.append(f"list_contains(?, {col})")
+                params.append(list(values))
+        if not duplicates:
+            conds.append("NOT duplicate")
+        return conds, params
+
+    def _source(self, table: str, start=None, end=None, monthly: bool = True, **dims):
+        """FROM clause (a subquery) and parameters selecting the filtered rows of table.
+
+        Without a date range, or with monthly=False, one table is read. Otherwise whole months in
+        [start, end] come from table_month and the days before the first / after the last whole
+        month from the daily table.
+        """
+        conds, params = self._dims(**dims)
+        if start is None and end is None:
+            name = f"{table}_month" if monthly else table
+            where = "WHERE " + " AND ".join(conds) if conds else ""
+            return f"(SELECT * FROM {name} {where})", params
+
+        # Clamp the range to the data's dates
+        lo, hi = self._span
+        if lo is None:
+            return f"(SELECT * FROM {table} WHERE false)", []
+        lo = max(lo, pd.Timestamp(start).normalize()) if start is not None else lo
+        hi = min(hi, pd.Timestamp(end).normalize()) if end is not None else hi
+        first_month = lo if lo.day == 1 else lo + pd.offsets.MonthBegin(1)
+        after_months = (hi + pd.Timedelta(days=1)).to_period("M").start_time
+        if not monthly or first_month >= after_months:
+            ranges, months = [(lo, hi)], None
+        else:
+            ranges = [(lo, first_month - pd.Timedelta(days=1)), (after_months, hi)]
+            months = (first_month, after_months - pd.Timedelta(days=1))
+
+        parts, out_params = [], []
+        dim_sql = "".join(f" AND {c}" for c in conds)
+        if months is not None:
+            parts.append(f"SELECT * FROM {table}_month WHERE ds BETWEEN CAST(? AS DATE) AND CAST(? AS DATE){dim_sql}")
+            out_params += [str(months[0].date()), str(months[1].date())] + params
+        for a, b in ranges:
+            if a <= b:
+                parts.append(f"SELECT * FROM {table} WHERE ds BETWEEN CAST(? AS DATE) AND CAST(? AS DATE){dim_sql}")
+                out_params += [str(a.date()), str(b.date())] + params
+        if not parts:
+            parts.append(f"SELECT * FROM {table} WHERE false")
+        return "(" + " UNION ALL ".join(parts) + ")", out_params
+
+    def _query(self, sql: str, table: str, monthly: bool = True, **filters) -> pd.DataFrame:
+        source, params = self._source(table, monthly=monthly, **filters)
+        return self.con.execute(sql.format(source=source), params).df()
+
+    def cube(self, **filters) -> pd.DataFrame:
+        """The review cube (see airbnb_analysis.cube) of the filtered reviews."""
+        return self._query(CUBE_QUERY, "agg", **filters)
+
+    def rollups(self, **filters) -> pd.DataFrame:
+        """Day/week/month/quarter rollups (see airbnb_analysis.rollups) of the filtered reviews."""
+        out = self._query(ROLLUP_QUERY, "agg", monthly=False, **filters)
+        out["period"] = pd.to_datetime(out["period"])
+        return out[ROLLUP_COLUMNS]
+
+    def length_box_stats(self, max_outliers: int = 50, seed: int = 42, **filters) -> pd.DataFrame:
+        """Review-length box statistics by score (see airbnb_analysis.boxstats) of the filtered reviews."""
+        counts = self._query(LENGTHS_QUERY, "lengths", **filters)
+        return box_stats_from_counts(counts, "message_len_words", "score", max_outliers, seed)
+
+    def term_counts(self, **filters) -> pd.DataFrame:
+        """(sentiment, term, count) of the filtered reviews' clean_message, like clean.py --terms.
+
+        The first call attaches the persisted terms tables, or tokenizes the text once into them;
+        later calls only aggregate them.
+        """
+        if self._terms is None:
+            self._terms = self._terms_table()
+        return self._query(TERMS_QUERY, self._terms, **filters)
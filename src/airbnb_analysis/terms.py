@@ -0,0 +1,83 @@
+"""
+terms.py — Per-sentiment term frequencies for the word clouds.
+
+Counts are streamed over the cleaned messages in fixed-size chunks (memory stays bounded
+by the vocabulary, not the text) and cached per dataset fingerprint and sentiment, so a
+re-render (e.g. a theme toggle) does not recount anything. Tables written by
+`clean.py --terms` (see data.load_term_counts) can be used directly instead.
+
+Usage:
+    freqs = term_frequencies(df, "positive")
+    freqs = term_frequencies(load_term_counts("data/processed/airbnb_reviews_clean.parquet"), "positive")
+"""
+from collections import OrderedDict
+from typing import Dict
+
+import duckdb
+import pandas as pd
+
+from airbnb_analysis.clean import TERM_COUNTS_SQL, merge_term_counts
+from airbnb_analysis.data import dataset_fingerprint
+
+CHUNKSIZE = 200_000
+CACHE_SIZE = 16
+
+_cache: "OrderedDict[tuple, Dict[str, int]]" = OrderedDict()
+
+
+def is_term_counts(df: pd.DataFrame) -> bool:
+    """True if df is a (sentiment, term, count) table rather than row-level reviews."""
+    return {"sentiment", "term", "count"} <= set(df.columns) and "clean_message" not in df.columns
+
+
+def count_terms(df: pd.DataFrame, chunksize: int = CHUNKSIZE) -> pd.DataFrame:
+    """(sentiment, term, count) over df's clean_message, tokenized in DuckDB chunk by chunk."""
+    con = duckdb.connect()
+    total = None
+    try:
+        for start in range(0, len(df), chunksize):
+            chunk = df[["sentiment", "clean_message"]].iloc[start:start + chunksize]
+            con.register("chunk", chunk)
+            part = con.execute(TERM_COUNTS_SQL.format(source="chunk")).df()
+            con.unregister("chunk")
+            total = merge_term_counts([total, part])
+    finally:
+        con.close()
+    return total if total is not None else merge_term_counts([])
+
+
+def _frequencies(terms: pd.DataFrame, sentiment: str) -> Dict[str, int]:
+    from wordcloud import STOPWORDS
+
+    rows = terms[terms["sentiment"] == sentiment]
+    rows = rows[~rows["term"].isin(STOPWORDS)]
+    return dict(zip(rows["term"], rows["count"].astype(int)))
+
+
+def term_frequencies(df: pd.DataFrame, sentiment: str, chunksize: int = CHUNKSIZE) -> Dict[str, int]:
+    """{term: count} for one (lowercase) sentiment, stopwords removed.
+
+    df is either the cleaned reviews (counted once per fingerprint, all sentiments in one pass)
+    or a precomputed term-count table.
+    """
+    sentiment = sentiment.lower()
+    if is_term_counts(df):
+        terms = df.assign(sentiment=df["sentiment"].str.lower())
+        return _frequencies(terms, sentiment)
+
+    fp = dataset_fingerprint(df, columns=["sentiment", "clean_message"])
+    if (fp, sentiment) not in _cache:
+        terms = count_terms(df, chunksize)
+        for s in set(terms["sentiment"]) | {sentiment}:
+            _cache[(fp, s)] = _frequencies(terms, s)
+        _cache.move_to_end((fp, sentiment))
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end((fp, sentiment))
+    return _cache[(fp, sentiment)]
+
+
+def clear_cache():
+    """Drop all cached term frequencies."""
+    _cache.clear()
@@ -0,0 +1,155 @@
+"""
+topics.py — Topic and subtopic counts from the normalized topic table.
+
+`clean.py --topics` stores one (row_id, topic_id, subtopic_id) row per topic or subtopic of a
+review, plus the topic dictionary; data.load_topics returns it with topic / subtopic as
+categoricals over that dictionary. Counts look the review attributes up by row position (one
+array take) and group on the integer codes, instead of re-parsing and exploding per-row lists.
+Row ids are positions in the cleaned output, so every clean.py run drops the stored table after
+writing the output (drop_topics) and builds a new one (rebuild_topics) only with --topics.
+
+Usage:
+    topics = load_topics("data/processed/airbnb_reviews_clean.parquet")
+    reviews = load_clean("data/processed/airbnb_reviews_clean.parquet", columns=["ds", "sentiment", "source"])
+    topic_counts(topics, reviews, by=["sentiment"])
+    topic_counts(topics, reviews, by=["source"], kind="subtopic", freq="M")   # per source and month
+"""
+import os
+from typing import Optional, Sequence
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+try:
+    from airbnb_analysis.index import rows_sql
+    from airbnb_analysis.sql import sql_str
+except ImportError:  # imported by clean.py run as a plain script
+    from index import rows_sql
+    from sql import sql_str
+
+KINDS = ["topic", "subtopic"]
+TOPICS_TABLE = "review_topics"
+TOPIC_DICT_TABLE = "topic_dict"
+
+
+def _periods(ds, freq: str) -> pd.DatetimeIndex:
+    """Start of the freq period of each timestamp, computed once per distinct date."""
+    codes, uniques = pd.factorize(ds)
+    starts = pd.DatetimeIndex(uniques).to_period(freq).start_time
+    return starts.take(codes, allow_fill=True, fill_value=pd.NaT)
+
+
+def topic_counts(topics: pd.DataFrame, reviews: pd.DataFrame, by: Sequence[str] = ("sentiment",),
+                 kind: str = "topic", freq: Optional[str] = None) -> pd.DataFrame:
+    """Number of reviews per topic (or subtopic) and review columns by, e.g. sentiment and source.
+
+    topics comes from data.load_topics and reviews from load_clean of the same output (row_id is
+    a review's position there). freq ("W", "M", "Q", ...) adds a period column: the start of the
+    review's ds period. Reviews missing a by value are left out.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {KINDS}, got {kind!r}")
+    has = topics[kind].notna().to_numpy()
+    pos = topics["row_id"].to_numpy()[has]
+    keys = {kind: topics[kind].array[has]}
+    for col in by:
+        keys[col] = reviews[col].array.take(pos)
+    if freq is not None:
+        keys["period"] = _periods(reviews["ds"].array.take(pos), freq)
+    frame = pd.DataFrame(keys)
+    counts = frame.groupby(list(keys), observed=True).size().rename("count").reset_index()
+    return counts.astype({"count": np.int64})
+
+
+# ---------- Storage ----------
+def topics_path_for(output_path: str) -> str:
+    return os.path.splitext(output_path)[0] + ".topics.parquet"
+
+
+def topic_dict_path_for(output_path: str) -> str:
+    return os.path.splitext(output_path)[0] + ".topic_dict.parquet"
+
+
+# One row per distinct (row, topic) and (row, subtopic) of the lists table (row_id, topics, subtopics)
+TOPIC_ROWS_SQL = """
+CREATE TEMP TABLE topic_rows AS
+SELECT DISTINCT row_id, kind, name FROM (
+    SELECT row_id, 'topic' AS kind, unnest(topics) AS name FROM lists
+    UNION ALL
+    SELECT row_id, 'subtopic' AS kind, unnest(subtopics) AS name FROM lists
+)
+WHERE name IS NOT NULL
+"""
+# Topic and subtopic ids are numbered separately, in name order
+TOPIC_IDS_SQL = """
+CREATE TEMP TABLE topic_ids AS
+SELECT kind, CAST(row_number() OVER (PARTITION BY kind ORDER BY name) - 1 AS SMALLINT) AS id, name
+FROM (SELECT DISTINCT kind, name FROM topic_rows)
+ORDER BY kind DESC, id
+"""
+TOPIC_TABLE_SQL = """
+SELECT CAST(row_id AS INTEGER) AS row_id,
+       CAST(CASE WHEN kind = 'topic' THEN id END AS SMALLINT) AS topic_id,
+       CAST(CASE WHEN kind = 'subtopic' THEN id END AS SMALLINT) AS subtopic_id
+FROM topic_rows JOIN topic_ids USING (kind, name)
+ORDER BY row_id, topic_id NULLS LAST, subtopic_id
+"""
+
+
+def rebuild_topics(output_path: str, fmt: str, table: str = "reviews", topics_table: str = TOPICS_TABLE,
+                   dict_table: str = TOPIC_DICT_TABLE) -> int:
+    """Store the normalized topic table of an existing cleaned output and return its number of rows.
+
+    The table holds (row_id, topic_id, subtopic_id) with one of the two ids set per row, and row_id
+    the review's position in the output; the dictionary holds (kind, id, name). Both are tables in
+    the DuckDB output, else .topics.parquet / .topic_dict.parquet sidecars.
+    """
+    try:
+        from airbnb_analysis.clean import _py_list, _topics_sql
+    except ImportError:  # called from clean.py run as a plain script
+        from clean import _py_list, _topics_sql
+
+    con = duckdb.connect(output_path if fmt == "duckdb" else ":memory:")
+    try:
+        con.create_function("py_list", _py_list, ["VARCHAR"], "VARCHAR[]", null_handling="special")
+        rows = rows_sql(output_path, table)
+        columns = [r[0] for r in con.execute(f"DESCRIBE {rows}").fetchall()]
+
+        def as_list(col):
+            if col not in columns:
+                return "CAST(NULL AS VARCHAR[])"
+            # CSV holds the lists' text
+            return _topics_sql(f'"{col}"', as_text=False) if fmt == "csv" else f'"{col}"'
+
+        con.execute(f"CREATE TEMP TABLE lists AS SELECT row_id, {as_list('topics_parsed')} AS topics, "
+                    f"{as_list('subtopics_parsed')} AS subtopics FROM ({rows})")
+        con.execute(TOPIC_ROWS_SQL)
+        con.execute(TOPIC_IDS_SQL)
+        if fmt == "duckdb":
+            con.execute(f"CREATE OR REPLACE TABLE {dict_table} AS SELECT * FROM topic_ids")
+            con.execute(f"CREATE OR REPLACE TABLE {topics_table} AS {TOPIC_TABLE_SQL}")
+        else:
+            con.execute(f"COPY (SELECT * FROM topic_ids) TO {sql_str(topic_dict_path_for(output_path))} "
+                        f"(FORMAT parquet)")
+            con.execute(f"COPY ({TOPIC_TABLE_SQL}) TO {sql_str(topics_path_for(output_path))} (FORMAT parquet)")
+        return con.execute("SELECT count(*) FROM topic_rows").fetchone()[0]
+    finally:
+        con.close()
+
+
+def drop_topics(output_path: str, fmt: str, topics_table: str = TOPICS_TABLE, dict_table: str = TOPIC_DICT_TABLE):
+    """Remove the stored topic table and dictionary of a cleaned output (its row ids no longer match
+    once the output is rewritten)."""
+    if fmt == "duckdb":
+        if os.path.exists(output_path):
+            con = duckdb.connect(output_path)
+            try:
+                for name in (topics_table, dict_table):
+                    con.execute(f"DROP TABLE IF EXISTS {name}")
+            finally:
+                con.close()
+    else:
+        for path in (topics_path_for(output_path), topic_dict_path_for(output_path)):
+            if os.path.exists(path):
+                os.remove(path)
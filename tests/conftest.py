@@ -0,0 +1,58 @@
+import sys
+
+import pandas as pd
+import pytest
+
+from airbnb_analysis import clean
+from generate import generate
+
+
+@pytest.fixture(scope="session")
+def raw_csv(tmp_path_factory):
+    """2000 seeded synthetic raw reviews (see benchmarks/generate.py)."""
+    return generate(2000, str(tmp_path_factory.mktemp("raw") / "raw.csv"), seed=7)
+
+
+@pytest.fixture(scope="session")
+def mixed_dates_csv(raw_csv, tmp_path_factory):
+    """raw_csv with date-only ds except for one timestamp in the middle of a later chunk."""
+    df = pd.read_csv(raw_csv, dtype=str)
+    df.loc[1500, "ds"] = "2023-05-05 13:45:00"
+    path = tmp_path_factory.mktemp("mixed") / "raw.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def source_csvs(raw_csv, tmp_path_factory):
+    """raw_csv split into per-source exports ({source: path}) with the SOURCE_COLUMNS names;
+    Google Play stores timestamps, the other exports plain dates."""
+    df = pd.read_csv(raw_csv, dtype=str)
+    df["language"] = df["Google Play: language"].fillna(df["Trustpilot: language"])
+    df.loc[df["source"] == "Google Play", "ds"] += " 13:45:12"
+    root = tmp_path_factory.mktemp("sources")
+    paths = {}
+    for name, mapping in clean.SOURCE_COLUMNS.items():
+        export = df.loc[df["source"] == name, list(mapping)].rename(columns=mapping)
+        paths[name] = str(root / f"{name}.csv")
+        export.to_csv(paths[name], index=False)
+    return paths
+
+
+@pytest.fixture
+def run_clean(monkeypatch):
+    """Run the clean.py command line with the given arguments."""
+    def run(*args):
+        monkeypatch.setattr(sys, "argv", ["clean.py", *map(str, args)])
+        clean.main()
+    return run
+
+
+@pytest.fixture(scope="session")
+def clean_parquet(raw_csv, tmp_path_factory):
+    """raw_csv cleaned to Parquet with --dedup."""
+    path = str(tmp_path_factory.mktemp("clean") / "clean.parquet")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(sys, "argv", ["clean.py", "--input", raw_csv, "--output", path, "--format", "parquet", "--dedup"])
+        clean.main()
+    return path
@@ -0,0 +1,116 @@
+"""The clean.py execution modes write the same dataset."""
+import json
+
+import duckdb
+import pandas as pd
+import pytest
+
+from airbnb_analysis import clean
+from airbnb_analysis.clean import SOURCE_COLUMNS
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_chunked_matches_single_pass_with_mixed_date_formats(mixed_dates_csv, tmp_path, run_clean):
+    run_clean("--input", mixed_dates_csv, "--output", tmp_path / "single.csv")
+    run_clean("--input", mixed_dates_csv, "--output", tmp_path / "chunked.csv", "--chunksize", 500)
+    assert _read(tmp_path / "chunked.csv") == _read(tmp_path / "single.csv")
+    # The timestamp does not match the input's date-only format; every other row keeps its date
+    assert pd.read_csv(tmp_path / "single.csv")["ds"].isna().sum() == 1
+
+
+def test_workers_match_single_pass_with_mixed_date_formats(mixed_dates_csv, tmp_path, run_clean):
+    run_clean("--input", mixed_dates_csv, "--output", tmp_path / "single.csv")
+    # The timestamp is the first row of the last of 4 partitions
+    run_clean("--input", mixed_dates_csv, "--output", tmp_path / "workers.csv", "--workers", 4)
+    assert _read(tmp_path / "workers.csv") == _read(tmp_path / "single.csv")
+
+
+def _table(path, table="reviews"):
+    con = duckdb.connect(str(path), read_only=True)
+    try:
+        return con.execute(f"SELECT * FROM {table} ORDER BY ALL").df()
+    finally:
+        con.close()
+
+
+def test_incremental_matches_full_rebuild(raw_csv, tmp_path, run_clean):
+    df = pd.read_csv(raw_csv, dtype=str)
+    df.iloc[:1500].to_csv(tmp_path / "head.csv", index=False)
+    # New rows after the watermark; the first one is a timestamp, the others dates like the rest
+    df.loc[1500:, "ds"] = "2099-01-01"
+    df.loc[1500, "ds"] = "2099-01-01 12:00:00"
+    df.to_csv(tmp_path / "full.csv", index=False)
+
+    run_clean("--input", tmp_path / "head.csv", "--output", tmp_path / "inc.duckdb", "--format", "duckdb",
+              "--incremental")
+    run_clean("--input", tmp_path / "full.csv", "--output", tmp_path / "inc.duckdb", "--format", "duckdb",
+              "--incremental")
+    run_clean("--input", tmp_path / "full.csv", "--output", tmp_path / "full.duckdb", "--format", "duckdb",
+              "--incremental")
+    pd.testing.assert_frame_equal(_table(tmp_path / "inc.duckdb"), _table(tmp_path / "full.duckdb"))
+    pd.testing.assert_frame_equal(_table(tmp_path / "inc.duckdb", "reviews_rollups"),
+                                  _table(tmp_path / "full.duckdb", "reviews_rollups"))
+
+
+def test_incremental_rebuilds_when_the_options_change(raw_csv, tmp_path, run_clean, monkeypatch):
+    monkeypatch.setattr(clean, "stopword_sets", lambda: {"en": frozenset({"the", "and"}), "es": frozenset({"que"})})
+    run_clean("--input", raw_csv, "--output", tmp_path / "inc.duckdb", "--format", "duckdb", "--incremental")
+    run_clean("--input", raw_csv, "--output", tmp_path / "inc.duckdb", "--format", "duckdb", "--incremental",
+              "--stopwords")
+    run_clean("--input", raw_csv, "--output", tmp_path / "full.duckdb", "--format", "duckdb", "--incremental",
+              "--stopwords")
+    pd.testing.assert_frame_equal(_table(tmp_path / "inc.duckdb"), _table(tmp_path / "full.duckdb"))
+
+
+def test_sources_keep_their_own_date_formats(source_csvs, tmp_path, run_clean):
+    sources = [a for name, path in source_csvs.items() for a in ("--source", f"{name}={path}")]
+    run_clean(*sources, "--output", tmp_path / "pandas.csv")
+    run_clean(*sources, "--output", tmp_path / "duckdb.csv", "--engine", "duckdb")
+    assert _read(tmp_path / "duckdb.csv") == _read(tmp_path / "pandas.csv")
+    out = pd.read_csv(tmp_path / "pandas.csv")
+    assert set(out["source"]) == set(source_csvs)
+    assert out["ds"].notna().all()
+
+
+def test_source_ds_format_overrides_the_guess(source_csvs, tmp_path, run_clean):
+    export = pd.read_csv(source_csvs["App Store"], dtype=str)
+    export["date"] = ["01/02/2024", "13/02/2024"] * (len(export) // 2) + ["01/02/2024"] * (len(export) % 2)
+    export.to_csv(tmp_path / "as.csv", index=False)
+    # "01/02/2024" alone would be guessed month-first, making every "13/02/2024" NaT
+    (tmp_path / "columns.json").write_text(json.dumps({"App Store": {**SOURCE_COLUMNS["App Store"],
+                                                                     "ds_format": "%d/%m/%Y"}}))
+    run_clean("--source", f"App Store={tmp_path / 'as.csv'}", "--source-columns", tmp_path / "columns.json",
+              "--output", tmp_path / "out.csv", "--engine", "duckdb")
+    assert set(pd.read_csv(tmp_path / "out.csv")["ds"]) == {"2024-02-01", "2024-02-13"}
+
+
+MODES = {
+    "chunked": ["--chunksize", 500],
+    "workers": ["--workers", 3],
+    "chunked-workers": ["--chunksize", 500, "--workers", 2],
+    "duckdb-engine": ["--engine", "duckdb"],
+}
+
+
+def _output(path, fmt):
+    if fmt == "csv":
+        return _read(path)
+    if fmt == "duckdb":
+        return _table(path)
+    return duckdb.sql(f"SELECT * FROM read_parquet('{path}')").df()
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "duckdb"])
+@pytest.mark.parametrize("mode", list(MODES))
+def test_mode_matches_single_pass(mode, fmt, mixed_dates_csv, tmp_path, run_clean):
+    single, other = tmp_path / f"single.{fmt}", tmp_path / f"{mode}.{fmt}"
+    run_clean("--input", mixed_dates_csv, "--output", single, "--format", fmt)
+    run_clean("--input", mixed_dates_csv, "--output", other, "--format", fmt, *MODES[mode])
+    if fmt == "csv":
+        assert _output(other, fmt) == _output(single, fmt)
+    else:
+        pd.testing.assert_frame_equal(_output(other, fmt), _output(single, fmt))
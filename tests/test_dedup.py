@@ -0,0 +1,31 @@
+"""Near-duplicate clusters: the same with a process pool, and never left on rows they do not fit."""
+import duckdb
+import pandas as pd
+
+from airbnb_analysis.data import load_clean
+
+
+def _columns(path, table="reviews"):
+    con = duckdb.connect(str(path), read_only=True)
+    try:
+        return [r[0] for r in con.execute(f"DESCRIBE {table}").fetchall()]
+    finally:
+        con.close()
+
+
+def test_workers_find_the_same_clusters(raw_csv, clean_parquet, tmp_path, run_clean):
+    out = tmp_path / "workers.parquet"
+    run_clean("--input", raw_csv, "--output", out, "--format", "parquet", "--dedup", "--workers", 2)
+    serial = load_clean(clean_parquet)["dup_cluster"]
+    assert serial.notna().any()
+    pd.testing.assert_series_equal(load_clean(str(out))["dup_cluster"], serial)
+
+
+def test_incremental_update_drops_dup_cluster(raw_csv, tmp_path, run_clean):
+    head = tmp_path / "head.csv"
+    pd.read_csv(raw_csv, dtype=str).iloc[:1000].to_csv(head, index=False)
+    out = tmp_path / "clean.duckdb"
+    run_clean("--input", head, "--output", out, "--format", "duckdb", "--incremental", "--dedup")
+    assert "dup_cluster" in _columns(out)
+    run_clean("--input", raw_csv, "--output", out, "--format", "duckdb", "--incremental")
+    assert "dup_cluster" not in _columns(out)
@@ -0,0 +1,89 @@
+"""Figure cache keys change with everything that changes the figure."""
+import sys
+import time
+
+import matplotlib
+import numpy as np
+import pandas as pd
+
+from airbnb_analysis import figcache, plots
+from airbnb_analysis.data import dataset_fingerprint
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+
+
+def test_fingerprint_hashes_list_columns():
+    def stats(outliers):
+        return pd.DataFrame({"source": ["a", "b"], "outliers": [np.array([1.0]), np.array(outliers)]})
+
+    assert dataset_fingerprint(stats([2.0])) == dataset_fingerprint(stats([2.0]))
+    assert dataset_fingerprint(stats([2.0])) != dataset_fingerprint(stats([3.0]))
+
+
+def test_auto_theme_is_resolved_before_the_cache(monkeypatch):
+    figcache.clear()
+    terms = pd.DataFrame({"sentiment": ["positive", "negative"], "term": ["clean", "dirty"], "count": [3, 2]})
+    monkeypatch.setattr(plots, "resolve_theme", lambda theme: "dark")
+    dark = plots.plot_sentiment_wordclouds(terms)
+    monkeypatch.setattr(plots, "resolve_theme", lambda theme: "light")
+    light = plots.plot_sentiment_wordclouds(terms)
+    assert dark.get_facecolor() != light.get_facecolor()
+
+
+def test_key_includes_plot_source(monkeypatch):
+    key = figcache.figure_key(plots.plot_top_languages, (), {"top_n": 5})
+    monkeypatch.setattr(figcache, "source_hash", lambda module: "edited")
+    assert figcache.figure_key(plots.plot_top_languages, (), {"top_n": 5}) != key
+
+
+def test_key_includes_the_package_source(tmp_path, monkeypatch):
+    pkg = tmp_path / "figpkg"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("")
+    (pkg / "plots.py").write_text("")
+    (pkg / "cube.py").write_text("A = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    __import__("figpkg.plots")
+    before = figcache.source_hash("figpkg.plots")
+    (pkg / "cube.py").write_text("A = 2\n")
+    figcache.source_hash.cache_clear()
+    assert figcache.source_hash("figpkg.plots") != before
+    del sys.modules["figpkg.plots"], sys.modules["figpkg"]
+
+
+def test_key_covers_only_the_columns_read():
+    df = pd.DataFrame({"language_final": ["en", "es"], "message": ["a", "b"]})
+    key = figcache.figure_key(plots.plot_top_languages, (df,), {})
+    assert figcache.figure_key(plots.plot_top_languages, (df.assign(message=["c", "d"]),), {}) == key
+    assert figcache.figure_key(plots.plot_top_languages, (df.assign(language_final=["en", "pt"]),), {}) != key
+
+
+def test_closing_a_matplotlib_figure_keeps_the_cached_one():
+    figcache.clear()
+    terms = pd.DataFrame({"sentiment": ["positive", "negative"], "term": ["clean", "dirty"], "count": [3, 2]})
+    first = plots.plot_sentiment_wordclouds(terms, theme="light")
+    plt.close(first)
+    second = plots.plot_sentiment_wordclouds(terms, theme="light")
+    assert second is not first and plt.fignum_exists(second.number)
+    plt.close(second)
+
+
+def test_cache_is_skipped_when_hashing_costs_more_than_the_plot(monkeypatch):
+    figcache.clear()
+    calls = []
+
+    @figcache.cached_figure
+    def plot(df):
+        calls.append(1)
+        return {"rows": len(df)}
+
+    def slow_fingerprint(data, columns=None):
+        time.sleep(0.01)
+        return dataset_fingerprint(data, columns)
+
+    monkeypatch.setattr(figcache, "dataset_fingerprint", slow_fingerprint)
+    df = pd.DataFrame({"a": [1, 2]})
+    plot(df)
+    plot(df)
+    assert len(calls) == 2
@@ -0,0 +1,48 @@
+"""The inverted index answers like a scan, and never outlives the output it was built for."""
+import os
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from airbnb_analysis.data import load_clean
+from airbnb_analysis.index import ReviewIndex, index_path_for
+
+
+def test_lookup_matches_a_scan(raw_csv, tmp_path, run_clean):
+    out = tmp_path / "clean.parquet"
+    run_clean("--input", raw_csv, "--output", out, "--format", "parquet", "--index")
+    words = load_clean(str(out))["clean_message"].str.split(" ").map(set)
+    negative = (load_clean(str(out))["sentiment"] == "negative").to_numpy()
+    index = ReviewIndex(str(out))
+    try:
+        for terms in (["app"], ["refund", "support"]):
+            expected = np.flatnonzero(words.map(lambda w: all(t in w for t in terms)).to_numpy())
+            assert len(expected)
+            assert index.lookup(terms).tolist() == expected.tolist()
+        expected = np.flatnonzero(words.map(lambda w: "app" in w).to_numpy() & negative)
+        assert index.lookup(["app"], sentiments=["negative"]).tolist() == expected.tolist()
+    finally:
+        index.close()
+
+
+def test_rewrite_drops_the_index(raw_csv, tmp_path, run_clean):
+    out = tmp_path / "clean.parquet"
+    run_clean("--input", raw_csv, "--output", out, "--format", "parquet", "--index")
+    assert os.path.exists(index_path_for(str(out)))
+    run_clean("--input", raw_csv, "--output", out, "--format", "parquet")
+    assert not os.path.exists(index_path_for(str(out)))
+
+
+def test_incremental_update_drops_the_index(raw_csv, tmp_path, run_clean):
+    head = tmp_path / "head.csv"
+    pd.read_csv(raw_csv, dtype=str).iloc[:1000].to_csv(head, index=False)
+    out = tmp_path / "clean.duckdb"
+    run_clean("--input", head, "--output", out, "--format", "duckdb", "--incremental", "--index")
+    run_clean("--input", raw_csv, "--output", out, "--format", "duckdb", "--incremental")
+    con = duckdb.connect(str(out), read_only=True)
+    try:
+        tables = {r[0] for r in con.execute("SHOW TABLES").fetchall()}
+    finally:
+        con.close()
+    assert "term_index" not in tables
@@ -0,0 +1,43 @@
+"""parse_maybe_list keeps literal_eval's results, malformed inputs included."""
+import ast
+
+import duckdb
+import pandas as pd
+import pytest
+
+from airbnb_analysis.clean import SIMPLE_LIST_SQL, parse_maybe_list
+
+INPUTS = [
+    "['a', 'b']", '["it\'s"]', "  ['x']  ", "[]", "('a', 'b')", "['a','b',]", "[1, 2]", "[['n']]",
+    "['a\\'s']", "['tab\\there']", "[\n'a',\r\n'b'\n]", "[\t'a',\f'b']",
+    # Malformed: literal_eval raises, so the result is None
+    "['a\nb']", "['a\rb']", "['a\r\nb']", '["a\nb"]', "['a\x00']", "[\x0b'a']", "['a',\xa0'b']",
+    "['a'\u2028]", "[bad", "['a' 'b'", "['a',,'b']", "[,]", "'a'", "",
+]
+
+
+def literal_eval_list(x):
+    """parse_maybe_list's per-value result before it skipped literal_eval for simple lists."""
+    x_strip = x.strip()
+    if len(x_strip) >= 2 and x_strip[0] in "[(" and x_strip[-1] in ")]":
+        try:
+            v = ast.literal_eval(x_strip)
+            if isinstance(v, (list, tuple)):
+                return list(v)
+        except Exception:
+            return None
+    return None
+
+
+@pytest.mark.parametrize("text", INPUTS)
+def test_parse_maybe_list_matches_literal_eval(text):
+    assert parse_maybe_list(pd.Series([text], dtype=object))[0] == literal_eval_list(text)
+
+
+def test_sql_fast_path_only_takes_valid_lists():
+    con = duckdb.connect()
+    con.execute("CREATE TABLE t (x VARCHAR)")
+    con.executemany("INSERT INTO t VALUES (?)", [[x] for x in INPUTS if "\x00" not in x])
+    fast = [x for (x,) in con.execute(f"SELECT x FROM t WHERE {SIMPLE_LIST_SQL.format(t='x')}").fetchall()]
+    assert fast
+    assert all(literal_eval_list(x) is not None for x in fast)
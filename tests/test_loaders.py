@@ -0,0 +1,61 @@
+"""The loaders read every output layout alike, whatever characters its path has."""
+import pandas as pd
+import pytest
+
+from airbnb_analysis.boxstats import load_box_stats
+from airbnb_analysis.clean import CATEGORY_COLS
+from airbnb_analysis.cube import CUBE_DIMS, load_cube
+from airbnb_analysis.data import load_clean
+from airbnb_analysis.rollups import load_rollups
+from airbnb_analysis.store import ReviewStore
+
+
+def _load_all(path):
+    cube = load_cube(path).sort_values(CUBE_DIMS, ignore_index=True)
+    box = load_box_stats(path, "message_len_words", "score", approx=False)
+    return cube, load_rollups(path), box
+
+
+@pytest.fixture(scope="module")
+def outputs(raw_csv, tmp_path_factory):
+    """The same reviews as one Parquet file, a partitioned directory, a DuckDB file and a CSV file,
+    in a directory whose name needs SQL quoting."""
+    from airbnb_analysis import clean
+
+    root = tmp_path_factory.mktemp("it's")
+    paths = {"parquet": str(root / "clean.parquet"), "partitioned": str(root / "clean"),
+             "duckdb": str(root / "clean.duckdb"), "csv": str(root / "clean.csv")}
+    runs = [["--output", paths["parquet"], "--format", "parquet"],
+            ["--output", paths["partitioned"], "--format", "parquet", "--partition"],
+            ["--output", paths["duckdb"], "--format", "duckdb"],
+            ["--output", paths["csv"]]]
+    with pytest.MonkeyPatch.context() as mp:
+        for args in runs:
+            mp.setattr("sys.argv", ["clean.py", "--input", raw_csv, *args])
+            clean.main()
+    return paths
+
+
+@pytest.mark.parametrize("layout", ["partitioned", "duckdb"])
+def test_loaders_match_across_layouts(outputs, layout):
+    expected = _load_all(outputs["parquet"])
+    for got, want in zip(_load_all(outputs[layout]), expected):
+        pd.testing.assert_frame_equal(got, want, check_dtype=False)
+
+
+@pytest.mark.parametrize("layout", ["parquet", "partitioned", "duckdb"])
+def test_store_opens_every_layout(outputs, layout):
+    store = ReviewStore(outputs[layout])
+    try:
+        assert store.cube()["count"].sum() == 2000
+    finally:
+        store.close()
+
+
+@pytest.mark.parametrize("layout", ["partitioned", "duckdb", "csv"])
+def test_categoricals_match_across_layouts(outputs, layout):
+    expected, got = load_clean(outputs["parquet"]), load_clean(outputs[layout])
+    for col in CATEGORY_COLS:
+        assert got[col].dtype == expected[col].dtype
+        assert not got[col].dtype.ordered
+    assert isinstance(pd.concat([expected, got])["sentiment"].dtype, pd.CategoricalDtype)
@@ -0,0 +1,54 @@
+"""--partition outputs: --replace-partitions swaps only the re-cleaned partitions, and the
+loaders open only the partitions a filter can match."""
+import glob
+import os
+
+import pandas as pd
+
+from airbnb_analysis.data import load_clean, partition_files
+
+
+def _files(root):
+    """{relative path: bytes} of every Parquet file under root."""
+    out = {}
+    for f in glob.glob(os.path.join(root, "**", "*.parquet"), recursive=True):
+        with open(f, "rb") as fh:
+            out[os.path.relpath(os.path.dirname(f), root)] = fh.read()
+    return out
+
+
+def test_replace_partitions_keeps_the_other_partitions(raw_csv, tmp_path, run_clean):
+    out = tmp_path / "clean"
+    run_clean("--input", raw_csv, "--output", out, "--format", "parquet", "--partition")
+    before = _files(out)
+
+    df = pd.read_csv(raw_csv, dtype=str)
+    ds = pd.to_datetime(df["ds"])
+    month = df[(df["source"] == "App Store") & (ds.dt.year == 2023) & (ds.dt.month == 6)].copy()
+    month["message"] = "replaced review"
+    month.to_csv(tmp_path / "month.csv", index=False)
+    run_clean("--input", tmp_path / "month.csv", "--output", out, "--format", "parquet", "--partition",
+              "--replace-partitions")
+
+    after = _files(out)
+    replaced = os.path.join("source=App%20Store", "year=2023", "month=6")
+    assert set(after) == set(before)
+    assert {rel for rel in after if after[rel] != before[rel]} == {replaced}
+    reloaded = load_clean(str(out), sources=["App Store"], start="2023-06-01", end="2023-06-30")
+    assert len(reloaded) == len(month)
+    assert (reloaded["message"] == "replaced review").all()
+
+
+def test_filters_open_only_matching_partitions(raw_csv, tmp_path, run_clean):
+    out = tmp_path / "clean"
+    run_clean("--input", raw_csv, "--output", out, "--format", "parquet", "--partition")
+    files = partition_files(str(out), sources=["Trustpilot"], start="2023-03-15", end="2023-05-02")
+    dirs = {os.path.relpath(os.path.dirname(f), out) for f in files}
+    assert dirs == {os.path.join("source=Trustpilot", "year=2023", f"month={m}") for m in (3, 4, 5)}
+
+    everything = load_clean(str(out))
+    day = everything["ds"].dt.normalize()
+    keep = (everything["source"] == "Trustpilot") & (day >= "2023-03-15") & (day <= "2023-05-02")
+    pruned = load_clean(str(out), sources=["Trustpilot"], start="2023-03-15", end="2023-05-02")
+    # Categories are those of the rows loaded, so only the values are compared
+    pd.testing.assert_frame_equal(pruned, everything[keep].reset_index(drop=True), check_categorical=False)
@@ -0,0 +1,40 @@
+"""render.py draws charts from aggregates built in DuckDB, in a pool of worker processes."""
+import os
+
+import pandas as pd
+import pytest
+
+from airbnb_analysis.cube import build_cube, counts_by, load_cube
+from airbnb_analysis.data import load_clean
+from airbnb_analysis.dedup import drop_duplicates
+from airbnb_analysis.profiling import Profiler
+from airbnb_analysis.render import prepare_inputs, render_all
+
+
+def test_render_plotly_and_matplotlib_charts_in_workers(clean_parquet, tmp_path):
+    charts = ["plot_sentiment_distribution", "plot_sentiment_wordclouds"]
+    records = render_all(clean_parquet, str(tmp_path), ["html", "png"], workers=2, charts=charts)
+    by_chart = {r["chart"]: r for r in records}
+    assert set(by_chart) == set(charts)
+    # Plotly PNG export needs kaleido; HTML always works, and the matplotlib chart writes both
+    assert os.path.getsize(tmp_path / "sentiment_distribution.html") > 0
+    assert not by_chart["plot_sentiment_wordclouds"]["errors"]
+    assert os.path.getsize(tmp_path / "sentiment_wordclouds.png") > 0
+
+
+def test_inputs_are_not_built_from_the_rows(clean_parquet, monkeypatch):
+    monkeypatch.setattr("airbnb_analysis.render.load_clean", lambda *a, **k: pytest.fail("rows loaded"))
+    inputs = prepare_inputs(clean_parquet, ["plot_top_languages", "plot_sentiment_over_time",
+                                            "plot_review_length_vs_score", "plot_sentiment_wordclouds"], Profiler())
+    assert set(inputs) == {"cube", "rollups", "box_stats", "terms"}
+
+
+@pytest.mark.parametrize("duplicates", [True, False])
+def test_cube_matches_the_loaded_rows(clean_parquet, duplicates):
+    rows = load_clean(clean_parquet)
+    if not duplicates:
+        rows = drop_duplicates(rows)
+    expected = counts_by(build_cube(rows), "sentiment")
+    actual = counts_by(load_cube(clean_parquet, duplicates=duplicates), "sentiment")
+    pd.testing.assert_frame_equal(actual.astype({"sentiment": str, "count": "int64"}),
+                                  expected.astype({"sentiment": str, "count": "int64"}))
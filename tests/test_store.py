@@ -0,0 +1,68 @@
+"""ReviewStore's pre-aggregated answers match queries over the reviews themselves."""
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from airbnb_analysis import store as store_module
+from airbnb_analysis.clean import TERM_COUNTS_SQL
+from airbnb_analysis.store import ReviewStore, store_cache_path_for
+
+
+@pytest.fixture(scope="module")
+def store(clean_parquet):
+    s = ReviewStore(clean_parquet)
+    yield s
+    s.close()
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"sources": ["Google Play"]},
+    {"sentiments": ["negative"], "languages": ["en"]},
+    {"start": "2023-03-10", "end": "2023-11-20"},
+    {"sources": ["Trustpilot", "App Store"], "start": "2023-02-01", "end": "2023-02-14"},
+    {"duplicates": False},
+])
+def test_term_counts_match_a_scan(store, filters):
+    conds = []
+    if filters.get("sources"):
+        conds.append(f"source IN {tuple(filters['sources']) + ('',)}")
+    if filters.get("languages"):
+        conds.append(f"language_final IN {tuple(filters['languages']) + ('',)}")
+    if filters.get("sentiments"):
+        conds.append(f"sentiment IN {tuple(filters['sentiments']) + ('',)}")
+    if "start" in filters:
+        conds.append(f"CAST(ds AS DATE) BETWEEN '{filters['start']}' AND '{filters['end']}'")
+    if filters.get("duplicates") is False:
+        conds.append("NOT duplicate")
+    where = "WHERE " + " AND ".join(conds) if conds else ""
+    expected = store.con.execute(TERM_COUNTS_SQL.format(source=f"(SELECT * FROM reviews {where})")).df()
+    assert len(expected)
+    pd.testing.assert_frame_equal(store.term_counts(**filters), expected)
+
+
+def _term_counts(path, **filters):
+    s = ReviewStore(path)
+    try:
+        return s.term_counts(**filters)
+    finally:
+        s.close()
+
+
+def test_terms_tables_are_persisted_until_the_output_changes(clean_parquet, tmp_path, monkeypatch):
+    path = str(tmp_path / "clean.parquet")
+    shutil.copy(clean_parquet, path)
+    filters = {"sources": ["Google Play"], "start": "2023-03-10", "end": "2023-11-20"}
+    expected = _term_counts(path, **filters)
+    assert os.path.exists(store_cache_path_for(path))
+
+    # A new store reads the sidecar instead of tokenizing the reviews again
+    monkeypatch.setattr(store_module, "TERMS_SQL", "SELECT error('terms rebuilt') {table}")
+    pd.testing.assert_frame_equal(_term_counts(path, **filters), expected)
+
+    # Once the output is rewritten the sidecar no longer matches it
+    os.utime(path, ns=(0, 0))
+    with pytest.raises(Exception, match="terms rebuilt"):
+        _term_counts(path, **filters)
@@ -0,0 +1,83 @@
+"""clean_text (per value, in Python) and the batch/SQL cleaning give the same text."""
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from airbnb_analysis.clean import clean_text, clean_text_batch, text_stats_batch
+
+MULTILINGUAL = [
+    "Great stay!! 10/10, would book again :)",
+    "Fácil de usar, ótimo app. Très bien, señor café",
+    "ÅNGSTRÖM Straße ǅemal ﬁne Ａｂｃ",
+    "नमस्ते दुनिया, होस्ट बहुत अच्छे थे",
+    "बुकिंग रद्द गर्न सकिएन, पैसा फिर्ता भएको छैन",
+    "สวัสดีครับ ทุกคน ห้องพักสะอาดมาก",
+    "İstanbul'da harika bir ev, ıslak havlu yok",
+    "ΟΔΟΣ ΣΑΣ: πολύ καλό ΔΩΜΑΤΙΟ",
+    "Отличное жильё, хозяин ответил за 5 минут",
+    "日本語のテキスト、とても良い！ 한국어 리뷰입니다",
+    "١٢٣ عربي ممتاز שלום עולם",
+    "x² ½ Ⅻ ③ and_underscores don't",
+    "tabs\tnew\nlines nbsp em space",
+    "  leading,  double   and trailing spaces ",
+    "cafe\u0301 \u212b \u1100\u1161\u11a8 \u0958 a\u0323\u0307 a\u0307\u0323",
+    "mail me@mail.com or https://airbnb.com/help?x=1 please",
+    "🙂 emoji 👍🏽 only",
+    "",
+    None,
+]
+
+
+def test_clean_text_matches_batch():
+    batch = clean_text_batch(pd.Series(MULTILINGUAL, dtype=object))
+    assert batch.tolist() == [clean_text(m) for m in MULTILINGUAL]
+
+
+def test_text_stats_batch_matches_python():
+    stats = text_stats_batch(pd.Series(MULTILINGUAL, dtype=object))
+    assert stats["clean_message"].tolist() == [clean_text(m) for m in MULTILINGUAL]
+    assert stats["message_len_chars"].tolist() == [len(m or "") for m in MULTILINGUAL]
+    assert stats["message_len_words"].tolist() == [len((m or "").split()) for m in MULTILINGUAL]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("नमस्ते दुनिया", "नमस्ते दुनिया"),
+    ("สวัสดีครับ", "สวัสดีครับ"),
+    ("x² ½ Ⅻ", "x"),
+    ("İstanbul", "istanbul"),
+    ("ΟΔΟΣ", "οδοσ"),
+])
+def test_clean_text_keeps_marks_and_drops_numbers(text, expected):
+    assert clean_text(text) == expected
+
+
+STOPWORDS = {
+    "hi": {"और", "के", "है", "नहीं"},
+    "ne": {"र", "पनि", "गर्न", "छैन", "भएको", "क्‍ष"},
+    "en": {"the", "a", "and", "don't", "123"},
+}
+
+
+def test_stopwords_are_cleaned_like_the_text():
+    messages = pd.Series(["बुकिंग रद्द गर्न सकिएन, पैसा फिर्ता भएको छैन र क्‍ष पनि",
+                          "होस्ट और मेज़बान के साथ अनुभव अच्छा नहीं है",
+                          "The room and a view, don't book 123 times"], dtype=object)
+    language = pd.Series(["ne", "hi", "en"], dtype=object)
+    with pytest.warns(UserWarning, match=r"stopword\(s\) are empty once cleaned"):
+        stats = text_stats_batch(messages, language=language, stopwords=STOPWORDS)
+        expected = [clean_text(m, STOPWORDS[lang]) for m, lang in zip(messages, language)]
+    assert stats["clean_message"].tolist() == expected
+    assert expected == ["बुकिंग रद्द सकिएन पैसा फिर्ता", "होस्ट मेज़बान साथ अनुभव अच्छा", "room view book times"]
+
+
+def test_stopword_corpus_dir_does_not_depend_on_the_cwd(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {k: v for k, v in os.environ.items() if k != "AIRBNB_NLTK_DATA"}
+    env["PYTHONPATH"] = os.path.join(root, "src")
+    code = "from airbnb_analysis.stopwords import NLTK_DATA_DIR; print(NLTK_DATA_DIR)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env,
+                         capture_output=True, text=True, check=True).stdout.strip()
+    assert out == os.path.join(root, "data", "cache", "nltk_data")
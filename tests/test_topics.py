@@ -0,0 +1,33 @@
+"""The topic table holds every review's topics, and never outlives the output it was built for."""
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from airbnb_analysis.data import load_clean, load_topics
+from airbnb_analysis.topics import topic_counts, topics_path_for
+
+CLEAN_PY = os.path.join(os.path.dirname(__file__), "..", "src", "airbnb_analysis", "clean.py")
+
+
+def test_topic_counts_match_exploded_lists(raw_csv, tmp_path, run_clean):
+    out = tmp_path / "clean.parquet"
+    run_clean("--input", raw_csv, "--output", out, "--format", "parquet", "--topics")
+    reviews = load_clean(str(out), columns=["sentiment", "topics_parsed"])
+    exploded = reviews.assign(topic=reviews["topics_parsed"].map(
+        lambda v: list(dict.fromkeys(v)) if isinstance(v, (list, np.ndarray)) else []))
+    exploded = exploded.explode("topic").dropna(subset=["topic", "sentiment"])
+    expected = exploded.groupby(["topic", "sentiment"], observed=True).size()
+    counts = topic_counts(load_topics(str(out)), reviews, by=["sentiment"]).set_index(["topic", "sentiment"])
+    assert len(expected)
+    assert counts["count"].to_dict() == expected.to_dict()
+
+
+def test_rewrite_drops_the_topic_table(raw_csv, tmp_path):
+    # As a plain script too: the topic table is built from clean.py's list parsing
+    out = tmp_path / "clean.csv"
+    subprocess.run([sys.executable, CLEAN_PY, "--input", raw_csv, "--output", out, "--topics"], check=True)
+    assert os.path.exists(topics_path_for(str(out)))
+    subprocess.run([sys.executable, CLEAN_PY, "--input", raw_csv, "--output", out], check=True)
+    assert not os.path.exists(topics_path_for(str(out)))